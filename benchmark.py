@@ -0,0 +1,323 @@
+import asyncio
+import gc
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+# Agregar src/ al path para importar los módulos de la aplicación
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from attachment_cache import CacheAdjuntos
+from contact_sources import a_registros, limpiar_clientes_df, resumen_clientes
+from email_processor import EmailProcessor
+from send_engine import AdaptadorTransporteAsync, MotorEnvioAsync
+from transports import ServidorSMTPPrueba, TransporteSMTP
+from email_validation import validar_emails
+
+
+def generar_contactos(filas: int) -> pd.DataFrame:
+    """Genera un DataFrame de contactos sintético con la forma de CLIENTES.xlsx"""
+    return pd.DataFrame({
+        'Email': [f'  usuario{i}@empresa{i % 97}.com ' if i % 50 else 'sin-arroba' for i in range(filas)],
+        'Nombre': [f' Nombre {i} ' if i % 3 else None for i in range(filas)],
+        'Empresa': [f'Empresa {i % 97}' if i % 5 else None for i in range(filas)],
+        'Mensaje_Personal': ['Hope business is going well!' if i % 2 else None for i in range(filas)]
+    })
+
+
+def limpiar_clientes_iterrows(df: pd.DataFrame) -> dict:
+    """Implementación anterior de cargar_clientes (fila por fila), usada como referencia"""
+    clientes = []
+    for _, row in df.iterrows():
+        cliente = {
+            'email': str(row['Email']).strip(),
+            'nombre': str(row['Nombre']).strip() if pd.notna(row['Nombre']) else '',
+            'empresa': str(row['Empresa']).strip() if pd.notna(row['Empresa']) else '',
+            'mensaje_personal': str(row['Mensaje_Personal']).strip() if pd.notna(row['Mensaje_Personal']) else ''
+        }
+        if '@' in cliente['email']:
+            clientes.append(cliente)
+
+    return {
+        'clientes': clientes,
+        'total': len(clientes),
+        'total_con_nombre': len([c for c in clientes if c['nombre']]),
+        'total_sin_nombre': len([c for c in clientes if not c['nombre']])
+    }
+
+
+def limpiar_clientes_vectorizado(df: pd.DataFrame) -> dict:
+    """Implementación actual: limpieza por columnas + conteos con máscaras"""
+    return resumen_clientes(limpiar_clientes_df(df))
+
+
+def cronometrar(funcion, *args, repeticiones: int = 3) -> float:
+    """Mejor tiempo (segundos) de varias repeticiones"""
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(*args)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def benchmark_limpieza_clientes(filas: int = 100_000) -> float:
+    """Compara la limpieza fila por fila contra la vectorizada"""
+    print(f"\n🧹 LIMPIEZA DE CLIENTES ({filas:,} filas)")
+    print("-" * 50)
+
+    df = generar_contactos(filas)
+
+    # Ambas implementaciones deben producir exactamente lo mismo
+    esperado = limpiar_clientes_iterrows(df)
+    obtenido = limpiar_clientes_vectorizado(df)
+    assert esperado == obtenido, "La limpieza vectorizada no coincide con la original"
+
+    t_anterior = cronometrar(limpiar_clientes_iterrows, df, repeticiones=1)
+    t_actual = cronometrar(limpiar_clientes_vectorizado, df)
+    aceleracion = t_anterior / t_actual
+
+    print(f"   iterrows:     {t_anterior * 1000:10.1f} ms")
+    print(f"   vectorizado:  {t_actual * 1000:10.1f} ms")
+    print(f"   Aceleración:  {aceleracion:10.1f}x")
+    return aceleracion
+
+
+def validar_emails_uno_a_uno(emails: list) -> list:
+    """Validación anterior (re.match con patrón en texto, un email a la vez), como referencia"""
+    patron = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+    return [re.match(patron, email.strip().lower()) is not None for email in emails]
+
+
+def benchmark_validacion_emails(filas: int = 1_000_000) -> float:
+    """Validación por lote (máscaras + motivos) sobre una columna grande de emails"""
+    print(f"\n📬 VALIDACIÓN DE EMAILS ({filas:,} direcciones)")
+    print("-" * 50)
+
+    emails = generar_contactos(filas)['Email'].tolist()
+
+    esperado = validar_emails_uno_a_uno(emails)
+    resultado = validar_emails(emails)
+    assert esperado == resultado.validos.tolist(), "La validación por lote no coincide con la original"
+
+    t_anterior = cronometrar(validar_emails_uno_a_uno, emails, repeticiones=1)
+    t_actual = cronometrar(validar_emails, emails)
+
+    print(f"   uno a uno:    {t_anterior * 1000:10.1f} ms (solo máscara)")
+    print(f"   por lote:     {t_actual * 1000:10.1f} ms (normalizado + máscara + motivos)")
+    print(f"   Rechazados:   {resultado.total_invalidos:10,} {resultado.conteo_motivos()}")
+    return t_actual
+
+
+CAMPANA_PRUEBA = {
+    'nombre': 'Benchmark',
+    'asunto': 'Propuesta para {EMPRESA} - {NOMBRE}',
+    'contenido': (
+        "Hello {NOMBRE},\n\n"
+        "I hope this message finds you well. {MENSAJE_PERSONAL}\n\n"
+        "At {EMPRESA_REMITENTE} we have been helping companies like {EMPRESA} to streamline "
+        "their operations, reduce manual work and get better visibility over their pipeline. "
+        "I would love to share a short overview of what we have built and how it could fit "
+        "your team's current priorities.\n\n"
+        "Would you be available for a 20 minute call next week? If it is easier, just reply "
+        "with a couple of time slots that work for you and I will send an invitation.\n\n"
+        "Best regards,\n{REMITENTE_NOMBRE}\n{REMITENTE_EMAIL}"
+    )
+}
+CONFIG_PRUEBA = {'Tu_Nombre': 'Admin', 'Tu_Email': 'admin@empresa.com', 'Tu_Empresa': 'Sage'}
+
+
+def bytes_retenidos(construir) -> tuple:
+    """Construye una estructura y mide (con tracemalloc) los bytes que retiene"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        antes = tracemalloc.get_traced_memory()[0]
+        estructura = construir()
+        despues = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return estructura, despues - antes
+
+
+def benchmark_memoria_destinatarios(tamanos=(10_000, 100_000, 1_000_000)) -> dict:
+    """Bytes por destinatario: diccionarios con cuerpo renderizado vs registros compactos"""
+    print("\n🧠 MEMORIA POR DESTINATARIO")
+    print("-" * 50)
+    print(f"   {'destinatarios':>13} {'dict+cuerpo':>12} {'compacto':>10} {'reducción':>10}")
+
+    resultados = {}
+    for n in tamanos:
+        clientes = a_registros(limpiar_clientes_df(generar_contactos(n)))
+        processor = EmailProcessor()
+        processor.nombres.max_entradas = len(clientes)
+        for _ in processor.iter_correos(clientes, CAMPANA_PRUEBA, CONFIG_PRUEBA):
+            pass  # Calentar plantillas y nombres: ambas variantes los comparten
+
+        # Antes: un diccionario de 7 claves con asunto y contenido renderizados
+        anteriores, bytes_antes = bytes_retenidos(lambda: [
+            correo.a_dict() for correo in processor.iter_correos(clientes, CAMPANA_PRUEBA, CONFIG_PRUEBA)])
+        total = len(anteriores)
+        del anteriores
+
+        # Ahora: registro con __slots__ que referencia la plantilla compartida
+        compactos, bytes_despues = bytes_retenidos(lambda: processor.procesar_lista_clientes(
+            clientes, CAMPANA_PRUEBA, CONFIG_PRUEBA))
+        assert len(compactos) == total
+        del compactos
+
+        por_antes = bytes_antes / total
+        por_despues = bytes_despues / total
+        resultados[n] = (por_antes, por_despues)
+        print(f"   {n:>13,} {por_antes:>10.0f} B {por_despues:>8.0f} B {por_antes / por_despues:>9.1f}x")
+
+    return resultados
+
+
+def benchmark_transporte_smtp(mensajes: int = 300) -> float:
+    """Correos/segundo contra el servidor SMTP local: conexión por correo vs pool"""
+    print(f"\n📮 TRANSPORTE SMTP ({mensajes} correos, servidor local)")
+    print("-" * 50)
+
+    correo = {'email': 'destino@ejemplo.com', 'asunto': 'Prueba', 'contenido': 'Hola,\nmensaje de prueba'}
+
+    with ServidorSMTPPrueba() as servidor:
+        def conexion_por_correo():
+            for _ in range(mensajes):
+                transporte = TransporteSMTP(servidor.host, servidor.puerto, remitente='prueba@localhost',
+                                            seguridad=TransporteSMTP.SEGURIDAD_NINGUNA, conexiones=1)
+                transporte.enviar(correo)
+                transporte.cerrar()
+
+        def con_pool():
+            transporte = TransporteSMTP(servidor.host, servidor.puerto, remitente='prueba@localhost',
+                                        seguridad=TransporteSMTP.SEGURIDAD_NINGUNA, conexiones=2)
+            for _ in range(mensajes):
+                transporte.enviar(correo)
+            transporte.cerrar()
+
+        t_anterior = cronometrar(conexion_por_correo, repeticiones=1)
+        t_actual = cronometrar(con_pool, repeticiones=1)
+        assert servidor.mensajes_recibidos == 2 * mensajes
+
+    print(f"   conexión por correo: {mensajes / t_anterior:8.0f} correos/s")
+    print(f"   pool reutilizado:    {mensajes / t_actual:8.0f} correos/s")
+    return mensajes / t_actual
+
+
+def benchmark_envio_concurrente(mensajes: int = 80, latencia: float = 0.05) -> float:
+    """Correos/segundo con 1 vs 4 envíos en vuelo (servidor con latencia simulada)"""
+    print(f"\n🔀 MOTOR DE ENVÍO ASYNC ({mensajes} correos, latencia {latencia * 1000:.0f} ms)")
+    print("-" * 50)
+
+    correos = [{'email': f'destino{i}@ejemplo.com', 'asunto': 'Prueba', 'contenido': 'Hola'}
+               for i in range(mensajes)]
+    tasas = {}
+
+    with ServidorSMTPPrueba(latencia=latencia) as servidor:
+        for concurrencia in (1, 4):
+            transporte = TransporteSMTP(servidor.host, servidor.puerto, remitente='prueba@localhost',
+                                        seguridad=TransporteSMTP.SEGURIDAD_NINGUNA, conexiones=concurrencia)
+            transporte.conectar()
+            adaptador = AdaptadorTransporteAsync(transporte)
+            motor = MotorEnvioAsync(concurrencia=concurrencia)
+
+            async def enviar(correo):
+                await adaptador.enviar(correo)
+                return {'exitoso': True}
+
+            inicio = time.perf_counter()
+            motor.ejecutar_sync(correos, [{'cantidad': mensajes, 'pausa_despues': 0}], enviar)
+            tasas[concurrencia] = mensajes / (time.perf_counter() - inicio)
+            asyncio.run(adaptador.cerrar())
+            transporte.cerrar()
+
+    print(f"   1 en vuelo:  {tasas[1]:8.0f} correos/s")
+    print(f"   4 en vuelo:  {tasas[4]:8.0f} correos/s ({tasas[4] / tasas[1]:.1f}x)")
+    return tasas[4]
+
+
+def benchmark_cache_adjuntos(mensajes: int = 100, tamano_mb: int = 2) -> float:
+    """Armado de mensajes con un PDF adjunto: leer y codificar por correo vs caché"""
+    print(f"\n📎 CACHÉ DE ADJUNTOS ({mensajes} correos, adjunto de {tamano_mb} MB)")
+    print("-" * 50)
+
+    correo = {'email': 'destino@ejemplo.com', 'asunto': 'Prueba', 'contenido': 'Hola,\nmensaje de prueba'}
+    transporte = TransporteSMTP('localhost', remitente='prueba@localhost')
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, 'propuesta.pdf')
+        with open(ruta, 'wb') as f:
+            f.write(os.urandom(tamano_mb * 1024 * 1024))
+
+        def por_correo():
+            for _ in range(mensajes):
+                transporte.construir_mensaje(correo, [ruta])
+
+        def con_cache():
+            with CacheAdjuntos([ruta]) as cache:
+                for _ in range(mensajes):
+                    transporte.construir_mensaje(correo, cache)
+                return cache.estadisticas()
+
+        t_anterior = cronometrar(por_correo, repeticiones=1)
+        t_actual = cronometrar(con_cache, repeticiones=1)
+        estadisticas = con_cache()
+
+    print(f"   leer + codificar por correo: {mensajes / t_anterior:8.0f} correos/s")
+    print(f"   caché compartida:            {mensajes / t_actual:8.0f} correos/s "
+          f"({t_anterior / t_actual:.0f}x)")
+    print(f"   aciertos: {estadisticas['tasa_aciertos']:.0%}, "
+          f"{estadisticas['bytes_ahorrados'] / 1024 / 1024:.0f} MB sin releer")
+    return t_anterior / t_actual
+
+
+def benchmark_esqueleto_mensaje(mensajes: int = 2000) -> float:
+    """Microsegundos por mensaje SMTP: EmailMessage por correo vs esqueleto de la campaña"""
+    print(f"\n✉️ ESQUELETO MIME ({mensajes} correos)")
+    print("-" * 50)
+
+    processor = EmailProcessor()
+    correos = [correo.a_dict(con_plantilla=True) for correo in processor.iter_correos(
+        a_registros(limpiar_clientes_df(generar_contactos(mensajes))), CAMPANA_PRUEBA, CONFIG_PRUEBA)]
+    transporte = TransporteSMTP('localhost', remitente='prueba@localhost', nombre_remitente='Prueba')
+
+    def por_correo():
+        for correo in correos:
+            transporte.construir_mensaje(correo)[0].as_bytes()
+
+    def con_esqueleto():
+        for correo in correos:
+            transporte.constructor.construir(correo)
+
+    t_anterior = cronometrar(por_correo, repeticiones=1)
+    t_actual = cronometrar(con_esqueleto)
+
+    print(f"   EmailMessage por correo: {t_anterior / len(correos) * 1e6:8.1f} µs/correo")
+    print(f"   esqueleto de campaña:    {t_actual / len(correos) * 1e6:8.1f} µs/correo "
+          f"({t_anterior / t_actual:.0f}x)")
+    return t_actual / len(correos) * 1e6
+
+
+if __name__ == "__main__":
+    print("⏱️ BENCHMARKS EMAIL SENDER")
+    print("=" * 50)
+
+    aceleracion = benchmark_limpieza_clientes()
+    if aceleracion < 10:
+        print("❌ La limpieza vectorizada no alcanza 10x")
+        sys.exit(1)
+
+    benchmark_validacion_emails()
+    benchmark_memoria_destinatarios()
+    benchmark_transporte_smtp()
+    benchmark_envio_concurrente()
+    benchmark_cache_adjuntos()
+    benchmark_esqueleto_mensaje()
+
+    print("\n✅ Benchmarks completados")
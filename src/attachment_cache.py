@@ -0,0 +1,120 @@
+import email
+import mimetypes
+import os
+import threading
+from email.message import MIMEPart
+from email.policy import SMTP
+from typing import Dict, List, Optional
+
+
+class AdjuntoPreparado:
+    """Un adjunto leído y codificado una sola vez
+
+    'mime' es la parte MIME serializada (encabezados + base64 con CRLF),
+    lista para copiarse en cualquier mensaje sin volver a leer ni codificar
+    el archivo. Es lo único que queda en memoria durante la corrida: unas
+    1,37 veces el tamaño del archivo (base64 en líneas de 76 con CRLF; los
+    bytes leídos se sueltan al codificar). 'parte' (MIMEPart, para armar
+    un EmailMessage) se crea desde 'mime' solo si se pide, y es una segunda
+    copia de ese tamaño.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.nombre = os.path.basename(ruta)
+        tipo, _ = mimetypes.guess_type(ruta)
+        self.maintype, self.subtype = (tipo or 'application/octet-stream').split('/', 1)
+        self.tamano = os.path.getsize(ruta)
+
+        with open(ruta, 'rb') as f:
+            datos = f.read()
+        parte = MIMEPart()
+        parte.set_content(datos, self.maintype, self.subtype, filename=self.nombre)
+        self.mime = parte.as_bytes(policy=SMTP)
+        self._parte: Optional[MIMEPart] = None
+
+    @property
+    def parte(self) -> MIMEPart:
+        if self._parte is None:
+            self._parte = email.message_from_bytes(self.mime, _class=MIMEPart, policy=SMTP)
+        return self._parte
+
+    def cerrar(self):
+        """Suelta lo codificado (la corrida terminó)"""
+        self.mime = b''
+        self._parte = None
+
+
+class CacheAdjuntos:
+    """Adjuntos de una corrida, preparados una vez y compartidos por todos los correos
+
+    Se usa donde antes iba la lista de rutas (se puede iterar y medir igual).
+    Los transportes que arman el MIME (SMTP) toman las partes ya codificadas
+    con partes_mime(); cada uso después del primero es un acierto y cuenta
+    como lectura + codificación ahorrada.
+    """
+
+    def __init__(self, rutas: List[str]):
+        self.rutas = [ruta for ruta in rutas or [] if os.path.exists(ruta)]
+        self.adjuntos = [AdjuntoPreparado(ruta) for ruta in self.rutas]
+        self._lock = threading.Lock()
+        self.usos = 0
+        self.aciertos = 0
+        self.bytes_ahorrados = 0
+
+    def __iter__(self):
+        return iter(self.rutas)
+
+    def __len__(self) -> int:
+        return len(self.rutas)
+
+    def __bool__(self) -> bool:
+        return bool(self.rutas)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cerrar()
+
+    def partes_mime(self) -> List[MIMEPart]:
+        """Partes MIME compartidas para un mensaje (no modificarlas)"""
+        with self._lock:
+            for adjunto in self.adjuntos:
+                self.usos += 1
+                # El primer mensaje paga la lectura y codificación; los demás la reutilizan
+                if self.usos > len(self.adjuntos):
+                    self.aciertos += 1
+                    self.bytes_ahorrados += adjunto.tamano
+        return [adjunto.parte for adjunto in self.adjuntos]
+
+    def tasa_aciertos(self) -> float:
+        return self.aciertos / self.usos if self.usos else 0.0
+
+    def estadisticas(self) -> Dict:
+        return {
+            'archivos': len(self.adjuntos),
+            'bytes_archivos': sum(adjunto.tamano for adjunto in self.adjuntos),
+            'bytes_en_memoria': sum(len(adjunto.mime) for adjunto in self.adjuntos),
+            'usos': self.usos,
+            'aciertos': self.aciertos,
+            'tasa_aciertos': round(self.tasa_aciertos(), 4),
+            'bytes_ahorrados': self.bytes_ahorrados
+        }
+
+    def cerrar(self):
+        for adjunto in self.adjuntos:
+            adjunto.cerrar()
+
+
+# Función de prueba: python attachment_cache.py [carpeta_adjuntos]
+if __name__ == "__main__":
+    import sys
+
+    carpeta = sys.argv[1] if len(sys.argv) > 1 else "adjuntos"
+    rutas = [os.path.join(carpeta, nombre) for nombre in sorted(os.listdir(carpeta))] if os.path.isdir(carpeta) else []
+    with CacheAdjuntos([ruta for ruta in rutas if os.path.isfile(ruta)]) as cache:
+        for _ in range(100):
+            cache.partes_mime()
+        print(f"📎 {len(cache)} adjuntos preparados")
+        print(f"📊 {cache.estadisticas()}")
@@ -0,0 +1,170 @@
+import hashlib
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class CacheColumnar:
+    """Caché persistente en disco (.npz comprimido por columnas) de hojas Excel ya parseadas
+
+    Cada archivo de caché guarda el hash SHA-256 del Excel de origen; si el
+    Excel cambia, el hash no coincide y la hoja se vuelve a parsear. Las
+    columnas de texto se guardan como sus bytes UTF-8 concatenados más los
+    desplazamientos de cada valor (sin el relleno de ancho fijo de numpy).
+    """
+
+    VERSION = 2
+
+    # Códigos de tipo para columnas object (mezcla de textos, números y vacíos)
+    TIPO_NULO = 'n'
+    TIPO_TEXTO = 's'
+    TIPO_ENTERO = 'i'
+    TIPO_DECIMAL = 'f'
+    TIPO_BOOLEANO = 'b'
+
+    def __init__(self, cache_folder: str):
+        self.cache_folder = cache_folder
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def hash_archivo(ruta: str) -> str:
+        """Hash SHA-256 del contenido del archivo"""
+        h = hashlib.sha256()
+        with open(ruta, 'rb') as f:
+            for bloque in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(bloque)
+        return h.hexdigest()
+
+    def _ruta_cache(self, ruta: str, clave: str) -> str:
+        """Ruta del archivo .npz para un Excel y una hoja/variante"""
+        nombre = f"{os.path.basename(ruta)}.{clave}.npz"
+        return os.path.join(self.cache_folder, nombre)
+
+    def cargar(self, ruta: str, clave: str, hash_origen: str = None) -> Optional[pd.DataFrame]:
+        """Devuelve el DataFrame cacheado si corresponde al contenido actual del Excel"""
+        ruta_cache = self._ruta_cache(ruta, clave)
+        if not os.path.exists(ruta_cache):
+            self.misses += 1
+            return None
+
+        try:
+            hash_origen = hash_origen or self.hash_archivo(ruta)
+            with np.load(ruta_cache, allow_pickle=False) as datos:
+                if (int(datos['__version__']) != self.VERSION or
+                        str(datos['__hash__']) != hash_origen):
+                    self.misses += 1
+                    return None
+
+                columnas = [str(c) for c in datos['__columnas__']]
+                df = pd.DataFrame({
+                    columna: self._decodificar_columna(datos, i)
+                    for i, columna in enumerate(columnas)
+                }, columns=columnas)
+        except Exception as e:
+            print(f"⚠️ Caché columnar ilegible ({os.path.basename(ruta_cache)}): {e}")
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return df
+
+    def guardar(self, ruta: str, clave: str, df: pd.DataFrame, hash_origen: str = None) -> bool:
+        """Guarda el DataFrame en disco asociado al hash actual del Excel"""
+        try:
+            os.makedirs(self.cache_folder, exist_ok=True)
+
+            arrays: Dict[str, np.ndarray] = {
+                '__version__': np.array(self.VERSION),
+                '__hash__': np.array(hash_origen or self.hash_archivo(ruta)),
+                '__columnas__': np.array([str(c) for c in df.columns], dtype=str)
+            }
+            for i, columna in enumerate(df.columns):
+                arrays.update(self._codificar_columna(df[columna], i))
+
+            # Escritura atómica: archivo temporal + reemplazo
+            ruta_cache = self._ruta_cache(ruta, clave)
+            ruta_tmp = ruta_cache + '.tmp'
+            with open(ruta_tmp, 'wb') as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(ruta_tmp, ruta_cache)
+            return True
+
+        except Exception as e:
+            print(f"⚠️ No se pudo escribir la caché columnar: {e}")
+            return False
+
+    def limpiar(self):
+        """Elimina todos los archivos de caché"""
+        if not os.path.isdir(self.cache_folder):
+            return
+        for archivo in os.listdir(self.cache_folder):
+            if archivo.endswith('.npz'):
+                os.remove(os.path.join(self.cache_folder, archivo))
+
+    @staticmethod
+    def _codificar_textos(textos: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """(bytes UTF-8 concatenados, desplazamientos): el valor k va de desp[k] a desp[k+1]"""
+        codificados = [texto.encode('utf-8') for texto in textos]
+        desplazamientos = np.zeros(len(codificados) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in codificados], out=desplazamientos[1:])
+        return np.frombuffer(b''.join(codificados), dtype=np.uint8), desplazamientos
+
+    @staticmethod
+    def _decodificar_textos(datos: np.ndarray, desplazamientos: np.ndarray) -> List[str]:
+        contenido = datos.tobytes()
+        limites = desplazamientos.tolist()
+        return [contenido[inicio:fin].decode('utf-8') for inicio, fin in zip(limites, limites[1:])]
+
+    def _codificar_columna(self, serie: pd.Series, i: int) -> Dict[str, np.ndarray]:
+        """Columna numérica -> array nativo; columna object -> textos UTF-8 + desplazamientos + códigos de tipo"""
+        if serie.dtype.kind in 'iufbM':
+            return {f'v{i}': serie.to_numpy()}
+
+        textos = []
+        tipos = []
+        for valor in serie.tolist():
+            if valor is None or (isinstance(valor, float) and valor != valor):
+                textos.append('')
+                tipos.append(self.TIPO_NULO)
+            elif isinstance(valor, (bool, np.bool_)):
+                textos.append(str(bool(valor)))
+                tipos.append(self.TIPO_BOOLEANO)
+            elif isinstance(valor, (int, np.integer)):
+                textos.append(str(int(valor)))
+                tipos.append(self.TIPO_ENTERO)
+            elif isinstance(valor, (float, np.floating)):
+                textos.append(repr(float(valor)))
+                tipos.append(self.TIPO_DECIMAL)
+            else:
+                textos.append(str(valor))
+                tipos.append(self.TIPO_TEXTO)
+
+        valores, desplazamientos = self._codificar_textos(textos)
+        arrays = {f'v{i}': valores, f'o{i}': desplazamientos}
+        # Columnas solo de texto no necesitan códigos de tipo
+        if any(t != self.TIPO_TEXTO for t in tipos):
+            arrays[f't{i}'] = np.frombuffer(''.join(tipos).encode('ascii'), dtype=np.uint8)
+        return arrays
+
+    def _decodificar_columna(self, datos, i: int):
+        """Inverso de _codificar_columna"""
+        valores = datos[f'v{i}']
+        if f'o{i}' not in datos.files:
+            return valores
+
+        textos = self._decodificar_textos(valores, datos[f'o{i}'])
+        if f't{i}' not in datos.files:
+            return pd.Series(textos, dtype=object)
+
+        convertidores = {
+            self.TIPO_NULO: lambda _: np.nan,
+            self.TIPO_TEXTO: str,
+            self.TIPO_ENTERO: int,
+            self.TIPO_DECIMAL: float,
+            self.TIPO_BOOLEANO: lambda t: t == 'True'
+        }
+        return pd.Series([convertidores[tipo](texto)
+                          for texto, tipo in zip(textos, datos[f't{i}'].tobytes().decode('ascii'))], dtype=object)
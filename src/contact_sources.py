@@ -0,0 +1,277 @@
+import csv
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional
+
+import openpyxl
+import pandas as pd
+
+# Columnas de origen (encabezados de CLIENTES.xlsx) -> claves del diccionario de cliente
+COLUMNAS_EXCEL_CLIENTE = {
+    'Email': 'email',
+    'Nombre': 'nombre',
+    'Empresa': 'empresa',
+    'Mensaje_Personal': 'mensaje_personal'
+}
+COLUMNAS_CLIENTE = list(COLUMNAS_EXCEL_CLIENTE.values())
+
+
+# Alias en minúsculas ('email', 'mensaje_personal', ...) -> encabezado del Excel
+ALIAS_COLUMNAS = {
+    **{columna.lower(): columna for columna in COLUMNAS_EXCEL_CLIENTE},
+    **{clave: columna for columna, clave in COLUMNAS_EXCEL_CLIENTE.items()}
+}
+
+
+def normalizar_columnas(df: pd.DataFrame) -> pd.DataFrame:
+    """Renombra encabezados como 'email', 'EMAIL' o 'mensaje_personal' a los del Excel"""
+    renombres = {}
+    for columna in df.columns:
+        destino = ALIAS_COLUMNAS.get(str(columna).strip().lower())
+        if destino and destino not in df.columns and destino not in renombres.values():
+            renombres[columna] = destino
+    return df.rename(columns=renombres) if renombres else df
+
+
+def limpiar_clientes_df(df: pd.DataFrame) -> pd.DataFrame:
+    """Limpia un DataFrame de contactos con operaciones por columna (sin iterrows)
+
+    Devuelve un DataFrame con las columnas email/nombre/empresa/mensaje_personal,
+    textos recortados, vacíos en lugar de NaN y solo las filas con '@' en el email.
+    """
+    if 'Email' not in df.columns:
+        raise KeyError('Email')
+
+    limpio = pd.DataFrame(index=df.index)
+    for columna_excel, clave in COLUMNAS_EXCEL_CLIENTE.items():
+        if columna_excel in df.columns:
+            columna = df[columna_excel].fillna('')
+            # astype(str) es caro en columnas object: solo si hay valores no-texto
+            if pd.api.types.infer_dtype(columna, skipna=False) != 'string':
+                columna = columna.astype(str)
+            limpio[clave] = columna.str.strip()
+        else:
+            limpio[clave] = ''
+
+    # Solo conservar filas con email válido
+    mascara_email = limpio['email'].str.contains('@', regex=False)
+    return limpio[mascara_email].reset_index(drop=True)
+
+
+def a_registros(df: pd.DataFrame) -> List[Dict]:
+    """Equivalente a df.to_dict('records') pero más rápido para columnas de texto"""
+    claves = list(df.columns)
+    columnas = [df[clave].tolist() for clave in claves]
+    return [dict(zip(claves, fila)) for fila in zip(*columnas)]
+
+
+def resumen_clientes(df: pd.DataFrame) -> Dict:
+    """Arma el resultado de cargar_clientes a partir de un DataFrame ya limpio"""
+    total = len(df)
+    total_con_nombre = int((df['nombre'] != '').sum())
+
+    return {
+        'clientes': a_registros(df),
+        'total': total,
+        'total_con_nombre': total_con_nombre,
+        'total_sin_nombre': total - total_con_nombre
+    }
+
+
+class FuenteContactos(ABC):
+    """Fuente de contactos: entrega clientes limpios por lotes
+
+    Todas las fuentes producen el mismo esquema de cliente
+    (email, nombre, empresa, mensaje_personal) que ExcelManager.cargar_clientes.
+    Iterar directamente sobre la fuente entrega los clientes uno a uno.
+    """
+
+    tipo = 'base'
+    # El archivo cambia de mtime/hash cuando cambian los datos (permite cachear)
+    cacheable = True
+    # Los emails ya vienen únicos (no hace falta deduplicar en memoria)
+    deduplicado = False
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+
+    @abstractmethod
+    def iter_lotes_df(self, batch_size: int = 5000) -> Iterator[pd.DataFrame]:
+        """Lotes ya limpios como DataFrame (implementado por cada fuente)"""
+
+    def iter_clientes(self, batch_size: int = 5000) -> Iterator[List[Dict]]:
+        """Lotes de clientes limpios como listas de diccionarios"""
+        for lote in self.iter_lotes_df(batch_size):
+            yield a_registros(lote)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for lote in self.iter_clientes():
+            yield from lote
+
+    def cargar_df(self) -> pd.DataFrame:
+        """Toda la fuente como un único DataFrame limpio"""
+        lotes = list(self.iter_lotes_df())
+        if lotes:
+            return pd.concat(lotes, ignore_index=True)
+        return pd.DataFrame(columns=COLUMNAS_CLIENTE)
+
+    def cargar_clientes(self) -> Dict:
+        """Mismo formato de retorno que ExcelManager.cargar_clientes"""
+        try:
+            return resumen_clientes(self.cargar_df())
+        except Exception as e:
+            return {'error': f"Error cargando clientes ({self.tipo}): {str(e)}"}
+
+    @staticmethod
+    def _validar_batch_size(batch_size: int):
+        if batch_size < 1:
+            raise ValueError("batch_size debe ser >= 1")
+
+
+class FuenteExcel(FuenteContactos):
+    """Hoja 'Contactos' de un .xlsx leída con openpyxl en modo read_only"""
+
+    tipo = 'xlsx'
+
+    def __init__(self, ruta: str, hoja: str = 'Contactos'):
+        super().__init__(ruta)
+        self.hoja = hoja
+
+    def iter_lotes_df(self, batch_size: int = 5000) -> Iterator[pd.DataFrame]:
+        self._validar_batch_size(batch_size)
+
+        wb = openpyxl.load_workbook(self.ruta, read_only=True, data_only=True)
+        try:
+            filas = wb[self.hoja].iter_rows(values_only=True)
+
+            encabezado = next(filas, None)
+            if encabezado is None:
+                return
+            columnas = [str(nombre).strip() if nombre is not None else f'_col{i}'
+                        for i, nombre in enumerate(encabezado)]
+            if 'Email' not in columnas:
+                raise KeyError('Email')
+
+            lote = []
+            for fila in filas:
+                lote.append(fila)
+                if len(lote) >= batch_size:
+                    df = limpiar_clientes_df(self._lote_a_df(lote, columnas))
+                    lote = []
+                    if len(df):
+                        yield df
+
+            if lote:
+                df = limpiar_clientes_df(self._lote_a_df(lote, columnas))
+                if len(df):
+                    yield df
+        finally:
+            wb.close()
+
+    @staticmethod
+    def _lote_a_df(filas: List[tuple], columnas: List[str]) -> pd.DataFrame:
+        """Convierte filas crudas de openpyxl en DataFrame (rellenando filas cortas)"""
+        ancho = len(columnas)
+        filas = [fila[:ancho] + (None,) * (ancho - len(fila)) for fila in filas]
+        return pd.DataFrame.from_records(filas, columns=columnas)
+
+
+class FuenteCSV(FuenteContactos):
+    """Exportación CSV del CRM leída por bloques con pandas (chunksize)"""
+
+    tipo = 'csv'
+
+    def __init__(self, ruta: str, separador: str = None, encoding: str = 'utf-8-sig'):
+        super().__init__(ruta)
+        self.separador = separador
+        self.encoding = encoding
+
+    def iter_lotes_df(self, batch_size: int = 50000) -> Iterator[pd.DataFrame]:
+        self._validar_batch_size(batch_size)
+
+        bloques = pd.read_csv(self.ruta, sep=self.separador or self._detectar_separador(),
+                              dtype=str, keep_default_na=False,
+                              encoding=self.encoding, chunksize=batch_size)
+        with bloques:
+            for bloque in bloques:
+                df = limpiar_clientes_df(normalizar_columnas(bloque))
+                if len(df):
+                    yield df
+
+    def _detectar_separador(self) -> str:
+        """Detecta ',', ';', tabulador o '|' mirando solo el inicio del archivo"""
+        with open(self.ruta, 'r', encoding=self.encoding, newline='') as f:
+            muestra = f.read(64 * 1024)
+        try:
+            return csv.Sniffer().sniff(muestra, delimiters=',;\t|').delimiter
+        except csv.Error:
+            return ','
+
+
+class FuenteJSONL(FuenteContactos):
+    """Un objeto JSON por línea, con claves como las del Excel o en minúsculas"""
+
+    tipo = 'jsonl'
+
+    def __init__(self, ruta: str, encoding: str = 'utf-8'):
+        super().__init__(ruta)
+        self.encoding = encoding
+
+    def iter_lotes_df(self, batch_size: int = 50000) -> Iterator[pd.DataFrame]:
+        self._validar_batch_size(batch_size)
+
+        with open(self.ruta, 'r', encoding=self.encoding) as f:
+            lote = []
+            for numero, linea in enumerate(f, 1):
+                linea = linea.strip()
+                if not linea:
+                    continue
+                try:
+                    registro = json.loads(linea)
+                except json.JSONDecodeError as e:
+                    print(f"⚠️ Línea {numero} inválida en {os.path.basename(self.ruta)}: {e}")
+                    continue
+                if not isinstance(registro, dict):
+                    continue
+                registro = {ALIAS_COLUMNAS.get(str(k).strip().lower(), k): v for k, v in registro.items()}
+
+                lote.append(registro)
+                if len(lote) >= batch_size:
+                    df = self._limpiar_lote(lote)
+                    lote = []
+                    if len(df):
+                        yield df
+
+            if lote:
+                df = self._limpiar_lote(lote)
+                if len(df):
+                    yield df
+
+    @staticmethod
+    def _limpiar_lote(registros: List[Dict]) -> pd.DataFrame:
+        df = pd.DataFrame.from_records(registros)
+        if 'Email' not in df.columns:
+            # Lote sin ningún email: no hay clientes válidos
+            return pd.DataFrame(columns=COLUMNAS_CLIENTE)
+        return limpiar_clientes_df(df)
+
+
+FUENTES_POR_EXTENSION = {
+    '.xlsx': FuenteExcel,
+    '.xlsm': FuenteExcel,
+    '.csv': FuenteCSV,
+    '.txt': FuenteCSV,
+    '.jsonl': FuenteJSONL,
+    '.ndjson': FuenteJSONL
+}
+
+
+def crear_fuente(ruta: str) -> Optional[FuenteContactos]:
+    """Crea la fuente adecuada según la extensión del archivo (None si no se reconoce)"""
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension in ('.db', '.sqlite'):
+        from contact_store import FuenteSQLite
+        return FuenteSQLite(ruta)
+    clase = FUENTES_POR_EXTENSION.get(extension)
+    return clase(ruta) if clase else None
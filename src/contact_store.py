@@ -0,0 +1,253 @@
+import os
+import sqlite3
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+from contact_sources import COLUMNAS_CLIENTE, FuenteContactos, crear_fuente
+
+
+class ContactStore:
+    """Base SQLite local con los contactos importados desde CLIENTES.xlsx (o CSV/JSONL)
+
+    El email normalizado (sin espacios, en minúsculas) es UNIQUE, así que la
+    deduplicación ocurre al importar. Hay índices por empresa y dominio para
+    seleccionar segmentos, y columnas de estado y último envío por contacto.
+    """
+
+    ESTADO_ACTIVO = 'activo'
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS contactos (
+            id INTEGER PRIMARY KEY,
+            email TEXT NOT NULL,
+            email_normalizado TEXT NOT NULL,
+            dominio TEXT NOT NULL,
+            nombre TEXT NOT NULL DEFAULT '',
+            empresa TEXT NOT NULL DEFAULT '',
+            mensaje_personal TEXT NOT NULL DEFAULT '',
+            estado TEXT NOT NULL DEFAULT 'activo',
+            ultimo_envio TEXT,
+            ultima_campana TEXT,
+            creado TEXT NOT NULL,
+            actualizado TEXT NOT NULL
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_contactos_email ON contactos(email_normalizado);
+        CREATE INDEX IF NOT EXISTS ix_contactos_empresa ON contactos(empresa);
+        CREATE INDEX IF NOT EXISTS ix_contactos_dominio ON contactos(dominio);
+        CREATE INDEX IF NOT EXISTS ix_contactos_estado_envio ON contactos(estado, ultimo_envio);
+    """
+
+    def __init__(self, db_path: str = os.path.join("data", "contactos.db")):
+        self.db_path = db_path
+        carpeta = os.path.dirname(db_path)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.ESQUEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cerrar()
+
+    def cerrar(self):
+        """Cerrar la conexión"""
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def normalizar_email(email: str) -> str:
+        return email.strip().lower()
+
+    def importar(self, origen, batch_size: int = 5000) -> Dict:
+        """Importa contactos desde una ruta (xlsx/csv/jsonl) o una FuenteContactos
+
+        Los emails ya existentes se actualizan (nombre, empresa, mensaje) sin
+        tocar su estado ni su último envío.
+        """
+        fuente = crear_fuente(origen) if isinstance(origen, str) else origen
+        if fuente is None:
+            return {'error': f"Formato de contactos no soportado: {origen}"}
+
+        antes = self.contar(estado=None)
+        leidos = 0
+        ahora = datetime.now().isoformat(timespec='seconds')
+
+        try:
+            with self.conn:
+                for lote in fuente.iter_clientes(batch_size):
+                    leidos += len(lote)
+                    self.conn.executemany("""
+                        INSERT INTO contactos (email, email_normalizado, dominio, nombre, empresa,
+                                               mensaje_personal, creado, actualizado)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(email_normalizado) DO UPDATE SET
+                            email = excluded.email,
+                            nombre = excluded.nombre,
+                            empresa = excluded.empresa,
+                            mensaje_personal = excluded.mensaje_personal,
+                            actualizado = excluded.actualizado
+                    """, (self._fila_contacto(cliente, ahora) for cliente in lote))
+        except Exception as e:
+            return {'error': f"Error importando contactos: {str(e)}"}
+
+        total = self.contar(estado=None)
+        return {
+            'leidos': leidos,
+            'nuevos': total - antes,
+            'actualizados_o_duplicados': leidos - (total - antes),
+            'total': total
+        }
+
+    def _fila_contacto(self, cliente: Dict, ahora: str) -> tuple:
+        email_normalizado = self.normalizar_email(cliente['email'])
+        return (
+            cliente['email'].strip(),
+            email_normalizado,
+            email_normalizado.rsplit('@', 1)[-1],
+            cliente.get('nombre', ''),
+            cliente.get('empresa', ''),
+            cliente.get('mensaje_personal', ''),
+            ahora,
+            ahora
+        )
+
+    def _filtros(self, empresa: str = None, dominio: str = None, estado: Optional[str] = ESTADO_ACTIVO,
+                 solo_no_enviados: bool = False, no_enviados_desde: datetime = None):
+        """Cláusula WHERE (siempre sobre columnas indexadas) y sus parámetros"""
+        condiciones = []
+        parametros: List = []
+
+        if estado is not None:
+            condiciones.append("estado = ?")
+            parametros.append(estado)
+        if empresa is not None:
+            condiciones.append("empresa = ?")
+            parametros.append(empresa)
+        if dominio is not None:
+            condiciones.append("dominio = ?")
+            parametros.append(dominio.strip().lower())
+        if solo_no_enviados:
+            condiciones.append("ultimo_envio IS NULL")
+        elif no_enviados_desde is not None:
+            condiciones.append("(ultimo_envio IS NULL OR ultimo_envio < ?)")
+            parametros.append(no_enviados_desde.isoformat(timespec='seconds'))
+
+        where = (" WHERE " + " AND ".join(condiciones)) if condiciones else ""
+        return where, parametros
+
+    def contar(self, **filtros) -> int:
+        """Cantidad de contactos que cumplen los filtros de seleccionar()"""
+        where, parametros = self._filtros(**filtros)
+        return self.conn.execute(f"SELECT COUNT(*) FROM contactos{where}", parametros).fetchone()[0]
+
+    def seleccionar(self, limite: int = None, batch_size: int = 5000, **filtros) -> Iterator[List[Dict]]:
+        """Lotes de clientes (mismo esquema que cargar_clientes) según filtros indexados
+
+        Filtros: empresa, dominio, estado (None = todos), solo_no_enviados,
+        no_enviados_desde (datetime).
+        """
+        where, parametros = self._filtros(**filtros)
+        sql = f"SELECT {', '.join(COLUMNAS_CLIENTE)} FROM contactos{where} ORDER BY id"
+        if limite is not None:
+            sql += " LIMIT ?"
+            parametros.append(int(limite))
+
+        cursor = self.conn.execute(sql, parametros)
+        try:
+            while True:
+                filas = cursor.fetchmany(batch_size)
+                if not filas:
+                    break
+                yield [dict(fila) for fila in filas]
+        finally:
+            cursor.close()
+
+    def como_fuente(self, **filtros) -> 'FuenteSQLite':
+        """Fuente de contactos sobre esta base, utilizable por ExcelManager y EmailProcessor"""
+        return FuenteSQLite(self.db_path, store=self, **filtros)
+
+    def marcar_enviados(self, emails: Iterable[str], campana_id=None, fecha: datetime = None) -> int:
+        """Registra el último envío de una lista de emails"""
+        fecha_txt = (fecha or datetime.now()).isoformat(timespec='seconds')
+        campana_txt = None if campana_id is None else str(campana_id)
+        with self.conn:
+            cursor = self.conn.executemany(
+                "UPDATE contactos SET ultimo_envio = ?, ultima_campana = ?, actualizado = ? "
+                "WHERE email_normalizado = ?",
+                ((fecha_txt, campana_txt, fecha_txt, self.normalizar_email(e)) for e in emails)
+            )
+        return cursor.rowcount
+
+    def marcar_estado(self, emails: Iterable[str], estado: str) -> int:
+        """Cambia el estado (p. ej. 'rebotado', 'baja') de una lista de emails"""
+        ahora = datetime.now().isoformat(timespec='seconds')
+        with self.conn:
+            cursor = self.conn.executemany(
+                "UPDATE contactos SET estado = ?, actualizado = ? WHERE email_normalizado = ?",
+                ((estado, ahora, self.normalizar_email(e)) for e in emails)
+            )
+        return cursor.rowcount
+
+    def obtener_resumen(self) -> str:
+        """Resumen legible de la base de contactos"""
+        total = self.contar(estado=None)
+        activos = self.contar()
+        sin_envio = self.contar(solo_no_enviados=True)
+        empresas = self.conn.execute("SELECT COUNT(DISTINCT empresa) FROM contactos").fetchone()[0]
+        dominios = self.conn.execute("SELECT COUNT(DISTINCT dominio) FROM contactos").fetchone()[0]
+
+        resumen = "🗄️ BASE DE CONTACTOS:\n"
+        resumen += "=" * 30 + "\n"
+        resumen += f"📁 Archivo: {self.db_path}\n"
+        resumen += f"👥 Total contactos: {total}\n"
+        resumen += f"   ├─ Activos: {activos}\n"
+        resumen += f"   └─ Activos sin envíos: {sin_envio}\n"
+        resumen += f"🏢 Empresas: {empresas}\n"
+        resumen += f"🌐 Dominios: {dominios}\n"
+        return resumen
+
+
+class FuenteSQLite(FuenteContactos):
+    """Contactos seleccionados desde ContactStore (ya deduplicados por índice UNIQUE)"""
+
+    tipo = 'sqlite'
+    cacheable = False
+    deduplicado = True
+
+    def __init__(self, ruta: str, store: ContactStore = None, **filtros):
+        super().__init__(ruta)
+        self._store = store
+        self.filtros = filtros
+
+    @property
+    def store(self) -> ContactStore:
+        if self._store is None:
+            self._store = ContactStore(self.ruta)
+        return self._store
+
+    def iter_clientes(self, batch_size: int = 5000) -> Iterator[List[Dict]]:
+        return self.store.seleccionar(batch_size=batch_size, **self.filtros)
+
+    def iter_lotes_df(self, batch_size: int = 5000) -> Iterator[pd.DataFrame]:
+        for lote in self.iter_clientes(batch_size):
+            yield pd.DataFrame(lote, columns=COLUMNAS_CLIENTE)
+
+
+# Función de prueba / importación manual
+if __name__ == "__main__":
+    print("🧪 Importando CLIENTES.xlsx a la base de contactos...")
+
+    with ContactStore() as store:
+        resultado = store.importar(os.path.join("data", "CLIENTES.xlsx"))
+        print(f"📥 Resultado: {resultado}")
+        print(store.obtener_resumen())
@@ -1,132 +1,277 @@
-import re
-from typing import Dict, List, Optional
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from email_validation import PATRON_EMAIL, validar_emails
+from name_extraction import ExtractorNombres
+from template_engine import CachePlantillas, PlantillaCompilada
 
 class EmailProcessor:
     """Procesa y personaliza el contenido de los correos"""
     
-    def __init__(self):
-        pass
+    # Clientes validados de una vez con validar_emails
+    TAMANO_BLOQUE_VALIDACION = 5000
+    
+    def __init__(self, archivo_cache_nombres: Optional[str] = None, lista_supresion=None,
+                 historial_envios=None, solo_no_enviados: bool = False):
+        # Plantillas (asunto/contenido) compiladas una vez por contenido
+        self.plantillas = CachePlantillas()
+        # Nombres derivados del email, memoizados por parte local
+        self.nombres = ExtractorNombres(archivo_cache=archivo_cache_nombres)
+        # Bajas, rebotes y lista negra (ListaSupresion); None = sin filtro
+        self.lista_supresion = lista_supresion
+        # Historial de envíos (HistorialEnvios); con solo_no_enviados se excluyen
+        # los contactos que ya recibieron la campaña activa
+        self.historial_envios = historial_envios
+        self.solo_no_enviados = solo_no_enviados
     
     def extraer_nombre_de_email(self, email: str) -> str:
         """Extrae un nombre del email si no se proporciona nombre manual"""
-        try:
-            # Obtener la parte antes del @
-            parte_local = email.split('@')[0]
-            
-            # Separar por puntos, guiones o números
-            partes = re.split(r'[._\-0-9]+', parte_local)
-            
-            # Tomar las primeras 2 partes y capitalizar
-            nombre_partes = []
-            for parte in partes[:2]:
-                if len(parte) > 1:  # Ignorar partes muy cortas
-                    nombre_partes.append(parte.capitalize())
-            
-            if nombre_partes:
-                return ' '.join(nombre_partes)
-            else:
-                # Si no se puede extraer, usar la parte completa
-                return parte_local.capitalize()
-                
-        except Exception:
-            return "Friend"  # Fallback seguro
+        return self.nombres.extraer(email)
     
-    def personalizar_contenido(self, plantilla: str, cliente: Dict, config: Dict) -> str:
-        """Personaliza el contenido del email con los datos del cliente"""
-        
-        # Obtener nombre (manual o extraído)
+    def compilar_plantilla(self, texto: str) -> PlantillaCompilada:
+        """Compila (o recupera de la caché) una plantilla de asunto o contenido"""
+        return self.plantillas.obtener(str(texto))
+    
+    def _variables_remitente(self, config: Dict) -> Dict[str, str]:
+        """Variables que dependen solo de la configuración (iguales para todos)"""
+        return {
+            'REMITENTE_NOMBRE': str(config.get('Tu_Nombre', 'Admin')),
+            'REMITENTE_EMAIL': str(config.get('Tu_Email', '')),
+            'EMPRESA_REMITENTE': str(config.get('Tu_Empresa', ''))
+        }
+    
+    def _nombre_cliente(self, cliente: Dict) -> str:
+        """Nombre manual o, si no hay, extraído del email"""
         if cliente.get('nombre') and cliente['nombre'].strip():
-            nombre = cliente['nombre'].strip()
-        else:
-            nombre = self.extraer_nombre_de_email(cliente['email'])
-        
-        # Preparar variables de reemplazo
+            return cliente['nombre'].strip()
+        return self.extraer_nombre_de_email(cliente['email'])
+    
+    def _variables_cliente(self, cliente: Dict, nombre: str, variables_remitente: Dict[str, str]) -> Dict[str, str]:
+        """Variables completas para un destinatario"""
         variables = {
             'NOMBRE': nombre,
-            'EMPRESA': cliente.get('empresa', ''),
-            'MENSAJE_PERSONAL': cliente.get('mensaje_personal', ''),
-            'REMITENTE_NOMBRE': config.get('Tu_Nombre', 'Admin'),
-            'REMITENTE_EMAIL': config.get('Tu_Email', ''),
-            'EMPRESA_REMITENTE': config.get('Tu_Empresa', '')
+            'EMPRESA': str(cliente.get('empresa', '')),
+            'MENSAJE_PERSONAL': str(cliente.get('mensaje_personal', ''))
         }
+        variables.update(variables_remitente)
+        return variables
+    
+    def personalizar_contenido(self, plantilla: str, cliente: Dict, config: Dict) -> str:
+        """Personaliza el contenido del email con los datos del cliente"""
         
-        # Reemplazar variables en el contenido
-        contenido_personalizado = plantilla
-        for variable, valor in variables.items():
-            marcador = '{' + variable + '}'
-            contenido_personalizado = contenido_personalizado.replace(marcador, str(valor))
-        
-        return contenido_personalizado
+        compilada = self.compilar_plantilla(plantilla)
+        variables = self._variables_cliente(cliente, self._nombre_cliente(cliente),
+                                            self._variables_remitente(config))
+        return compilada.render(variables)
     
     def validar_email(self, email: str) -> bool:
-        """Valida que un email tenga formato correcto"""
-        patron = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return re.match(patron, email.strip()) is not None
+        """Valida que un email tenga formato correcto (para listas usar validar_emails)"""
+        return PATRON_EMAIL.fullmatch(email.strip()) is not None
     
-    def procesar_lista_clientes(self, clientes: List[Dict], campana: Dict, config: Dict) -> List[Dict]:
-        """Procesa toda la lista de clientes y genera los correos personalizados"""
+    def procesar_lista_clientes(self, clientes: Iterable[Dict], campana: Dict, config: Dict) -> List['CorreoProcesado']:
+        """Procesa toda la lista de clientes y genera los correos personalizados
         
-        correos_procesados = []
+        Acepta cualquier iterable de clientes: la lista de cargar_clientes o una
+        FuenteContactos (xlsx, csv, jsonl, sqlite) que se recorre en streaming.
+        Si la fuente ya garantiza emails únicos (ContactStore), se omite el
+        control de duplicados en memoria.
+        """
+        return list(self.iter_correos(clientes, campana, config))
+    
+    def procesar_lista_clientes_lazy(self, clientes: Iterable[Dict], campana: Dict, config: Dict) -> 'CorreosLazy':
+        """Versión perezosa de procesar_lista_clientes: nada se renderiza hasta iterar
+        
+        'clientes' debe poder recorrerse más de una vez (lista o FuenteContactos).
+        """
+        return CorreosLazy(self, clientes, campana, config)
+    
+    def _campana_a_filtrar(self, campana: Optional[Dict]):
+        """ID de la campaña cuyos envíos previos hay que excluir (None = no filtrar)"""
+        if not (self.solo_no_enviados and self.historial_envios is not None and campana):
+            return None
+        return campana.get('id')
+    
+    def _iter_clientes_validos(self, clientes: Iterable[Dict], silencioso: bool = False,
+                               conteo: Dict[str, int] = None,
+                               campana_id=None) -> Iterator[Tuple[int, Dict, str]]:
+        """Valida, filtra suprimidos y deduplica sin renderizar: entrega
+        (posición, cliente, email normalizado)
+        
+        Los emails se normalizan y validan por bloques con validar_emails (por
+        columnas) en lugar de una expresión regular por cliente; la lista de
+        supresión se consulta una vez por bloque.
+        Con 'campana_id' se excluyen además los que ya recibieron esa campaña
+        según el historial de envíos.
+        Si se pasa 'conteo', acumula ahí los clientes 'invalidos', 'suprimidos'
+        (y 'suprimidos_por_motivo'), 'ya_enviados' y 'duplicados'.
+        """
+        deduplicar = not getattr(clientes, 'deduplicado', False)
         emails_vistos = set()  # Para detectar duplicados
         
-        for i, cliente in enumerate(clientes):
-            try:
-                email = cliente.get('email', '').strip().lower()
+        iterador = iter(clientes)
+        inicio = 0
+        while True:
+            bloque = list(islice(iterador, self.TAMANO_BLOQUE_VALIDACION))
+            if not bloque:
+                break
+            
+            crudos = [cliente.get('email', '') if isinstance(cliente, dict) else None
+                      for cliente in bloque]
+            validacion = validar_emails(crudos)
+            
+            suprimidos = {}
+            if self.lista_supresion is not None:
+                suprimidos = self.lista_supresion.buscar(validacion.emails[validacion.validos].tolist())
+            
+            ya_enviados = set()
+            if campana_id is not None:
+                ya_enviados = self.historial_envios.ya_enviados(
+                    campana_id, validacion.emails[validacion.validos].tolist())
+            
+            for desplazamiento, (cliente, email, valido, motivo) in enumerate(
+                    zip(bloque, validacion.emails.tolist(), validacion.validos.tolist(),
+                        validacion.motivos.tolist())):
+                i = inicio + desplazamiento
                 
                 # Validar email
-                if not self.validar_email(email):
-                    print(f"⚠️  Email inválido saltado: {email}")
+                if not valido:
+                    if conteo is not None:
+                        conteo['invalidos'] += 1
+                    if not silencioso:
+                        if isinstance(cliente, dict):
+                            print(f"⚠️  Email inválido saltado: {email} ({motivo})")
+                        else:
+                            print(f"❌ Error procesando cliente {i+1}: registro sin datos de cliente")
                     continue
                 
-                # Detectar duplicados
-                if email in emails_vistos:
-                    print(f"⚠️  Email duplicado saltado: {email}")
+                # Excluir bajas, rebotes y lista negra
+                motivo_supresion = suprimidos.get(email)
+                if motivo_supresion is not None:
+                    if conteo is not None:
+                        conteo['suprimidos'] += 1
+                        por_motivo = conteo['suprimidos_por_motivo']
+                        por_motivo[motivo_supresion] = por_motivo.get(motivo_supresion, 0) + 1
+                    if not silencioso:
+                        print(f"🚫 Email suprimido saltado: {email} ({motivo_supresion})")
                     continue
-                emails_vistos.add(email)
                 
-                # Personalizar contenido
-                contenido_personalizado = self.personalizar_contenido(
-                    campana['contenido'], 
-                    cliente, 
-                    config
-                )
+                # Excluir los que ya recibieron esta campaña (sin aviso por fila:
+                # al re-ejecutar una campaña grande serían casi todos)
+                if email in ya_enviados:
+                    if conteo is not None:
+                        conteo['ya_enviados'] += 1
+                    continue
                 
-                # Obtener nombre final
-                if cliente.get('nombre') and cliente['nombre'].strip():
-                    nombre_final = cliente['nombre'].strip()
-                else:
-                    nombre_final = self.extraer_nombre_de_email(email)
+                # Detectar duplicados
+                if deduplicar:
+                    if email in emails_vistos:
+                        if conteo is not None:
+                            conteo['duplicados'] += 1
+                        if not silencioso:
+                            print(f"⚠️  Email duplicado saltado: {email}")
+                        continue
+                    emails_vistos.add(email)
                 
-                correo_procesado = {
-                    'indice': i + 1,
-                    'email': email,
-                    'nombre': nombre_final,
-                    'empresa': cliente.get('empresa', ''),
-                    'asunto': campana['asunto'],
-                    'contenido': contenido_personalizado,
-                    'estado': 'pendiente'
-                }
+                yield i, cliente, email
+            
+            inicio += len(bloque)
+    
+    def contar_correos_validos(self, clientes: Iterable[Dict]) -> int:
+        """Cuántos correos generaría la lista (validación + duplicados, sin renderizar)"""
+        return sum(1 for _ in self._iter_clientes_validos(clientes, silencioso=True))
+    
+    def contar_clientes(self, clientes: Iterable[Dict], campana: Dict = None) -> Dict[str, int]:
+        """Conteos de la lista en una pasada sin renderizar
+        
+        total: clientes leídos; validos: con email válido; unicos: correos que se
+        enviarían; invalidos, suprimidos y duplicados: clientes descartados por
+        cada motivo (suprimidos_por_motivo: baja, rebote, lista_negra).
+        Con 'campana' y solo_no_enviados, ya_enviados cuenta los que ya la recibieron.
+        """
+        conteo = {'invalidos': 0, 'suprimidos': 0, 'suprimidos_por_motivo': {},
+                  'ya_enviados': 0, 'duplicados': 0}
+        unicos = sum(1 for _ in self._iter_clientes_validos(clientes, silencioso=True, conteo=conteo,
+                                                            campana_id=self._campana_a_filtrar(campana)))
+        descartados_validos = conteo['suprimidos'] + conteo['ya_enviados'] + conteo['duplicados']
+        return {
+            'total': unicos + conteo['invalidos'] + descartados_validos,
+            'validos': unicos + descartados_validos,
+            'unicos': unicos,
+            'invalidos': conteo['invalidos'],
+            'suprimidos': conteo['suprimidos'],
+            'suprimidos_por_motivo': conteo['suprimidos_por_motivo'],
+            'ya_enviados': conteo['ya_enviados'],
+            'duplicados': conteo['duplicados']
+        }
+    
+    @staticmethod
+    def _detalle_supresion(conteos: Dict) -> str:
+        """' (baja: 3, rebote: 1)' o '' si no hubo suprimidos"""
+        por_motivo = conteos.get('suprimidos_por_motivo') or {}
+        if not por_motivo:
+            return ''
+        return ' (' + ', '.join(f"{motivo}: {cantidad}" for motivo, cantidad in sorted(por_motivo.items())) + ')'
+    
+    def primeros_correos(self, clientes: Iterable[Dict], campana: Dict, config: Dict, limite: int = 3) -> List['CorreoProcesado']:
+        """Los primeros 'limite' correos válidos y sin duplicar (se detiene al tenerlos)"""
+        return list(islice(self.iter_correos(clientes, campana, config), limite))
+    
+    def iter_correos(self, clientes: Iterable[Dict], campana: Dict, config: Dict) -> Iterator['CorreoProcesado']:
+        """Genera los correos uno a uno, bajo demanda
+        
+        Cada correo es un registro compacto (CorreoProcesado) que referencia la
+        plantilla compartida de la campaña; asunto y contenido se renderizan
+        recién al leerlos (al enviar o mostrar la vista previa).
+        """
+        
+        # Compilar asunto y contenido una sola vez para toda la lista
+        plantilla = PlantillaCorreo(self.compilar_plantilla(campana['asunto']),
+                                    self.compilar_plantilla(campana['contenido']),
+                                    self._variables_remitente(config),
+                                    campana.get('id'))
+        
+        for i, cliente, email in self._iter_clientes_validos(clientes,
+                                                             campana_id=self._campana_a_filtrar(campana)):
+            try:
+                # Obtener nombre final (una sola vez por cliente)
+                nombre_final = self._nombre_cliente(cliente)
                 
-                correos_procesados.append(correo_procesado)
+                correo_procesado = CorreoProcesado(
+                    i + 1,
+                    email,
+                    nombre_final,
+                    str(cliente.get('empresa', '')),
+                    str(cliente.get('mensaje_personal', '')),
+                    plantilla
+                )
                 
             except Exception as e:
                 print(f"❌ Error procesando cliente {i+1}: {str(e)}")
                 continue
+            
+            yield correo_procesado
         
-        return correos_procesados
+        # Persistir los nombres nuevos (si hay caché en disco)
+        self.nombres.guardar()
     
     def obtener_vista_previa(self, clientes: List[Dict], campana: Dict, config: Dict, limite: int = 3) -> str:
-        """Genera una vista previa de los primeros correos"""
+        """Genera una vista previa de los primeros correos
         
-        correos = self.procesar_lista_clientes(clientes, campana, config)
+        Solo se personalizan los correos mostrados; los conteos del resumen
+        salen de una pasada aparte sin renderizar.
+        """
+        
+        correos = self.primeros_correos(clientes, campana, config, limite)
         
         if not correos:
             return "❌ No hay correos válidos para procesar"
         
-        vista_previa = f"📧 VISTA PREVIA DE CORREOS (Primeros {min(limite, len(correos))} de {len(correos)}):\n"
+        conteos = self.contar_clientes(clientes, campana)
+        
+        vista_previa = f"📧 VISTA PREVIA DE CORREOS (Primeros {len(correos)} de {conteos['unicos']}):\n"
         vista_previa += "=" * 60 + "\n"
         
-        for i, correo in enumerate(correos[:limite]):
+        for i, correo in enumerate(correos):
             vista_previa += f"\n📩 CORREO #{correo['indice']}:\n"
             vista_previa += f"Para: {correo['email']}\n"
             vista_previa += f"Nombre: {correo['nombre']}\n"
@@ -141,16 +286,159 @@ class EmailProcessor:
                     vista_previa += f"  {linea.strip()}\n"
             vista_previa += "  ...\n"
             
-            if i < min(limite, len(correos)) - 1:
+            if i < len(correos) - 1:
                 vista_previa += "-" * 40 + "\n"
         
         vista_previa += f"\n📊 RESUMEN:\n"
-        vista_previa += f"   ├─ Total correos válidos: {len(correos)}\n"
-        vista_previa += f"   ├─ Emails únicos: {len(set(c['email'] for c in correos))}\n"
+        vista_previa += f"   ├─ Total correos válidos: {conteos['validos']}\n"
+        vista_previa += f"   ├─ Emails únicos: {conteos['unicos']}\n"
+        vista_previa += f"   ├─ Emails inválidos: {conteos['invalidos']}\n"
+        vista_previa += f"   ├─ Duplicados: {conteos['duplicados']}\n"
+        vista_previa += f"   ├─ Suprimidos: {conteos['suprimidos']}{self._detalle_supresion(conteos)}\n"
+        if self._campana_a_filtrar(campana) is not None:
+            vista_previa += f"   ├─ Ya recibieron la campaña: {conteos['ya_enviados']}\n"
         vista_previa += f"   └─ Campaña: {campana['nombre']}\n"
         
         return vista_previa
 
+class PlantillaCorreo:
+    """Asunto y contenido compilados de una campaña + variables del remitente
+    
+    Una sola instancia compartida por todos los correos de la lista.
+    """
+    
+    __slots__ = ('asunto', 'contenido', 'variables_remitente', 'campana_id')
+    
+    def __init__(self, asunto: PlantillaCompilada, contenido: PlantillaCompilada,
+                 variables_remitente: Dict[str, str], campana_id=None):
+        self.asunto = asunto
+        self.contenido = contenido
+        self.variables_remitente = variables_remitente
+        self.campana_id = campana_id
+
+
+class CorreoProcesado:
+    """Correo de un destinatario sin el cuerpo renderizado (registro compacto)
+    
+    Se accede como el diccionario de antes (correo['asunto'], correo.get('nombre'))
+    con las mismas claves: indice, email, nombre, empresa, asunto, contenido y
+    estado (más campana_id, para el historial de envíos). Asunto y contenido
+    se renderizan en cada lectura; al enviar conviene usar a_dict() para
+    renderizarlos una sola vez.
+    """
+    
+    __slots__ = ('indice', 'email', 'nombre', 'empresa', 'mensaje_personal', 'plantilla', 'estado')
+    
+    CLAVES = ('indice', 'email', 'nombre', 'empresa', 'asunto', 'contenido', 'estado', 'campana_id')
+    
+    def __init__(self, indice: int, email: str, nombre: str, empresa: str,
+                 mensaje_personal: str, plantilla: PlantillaCorreo, estado: str = 'pendiente'):
+        self.indice = indice
+        self.email = email
+        self.nombre = nombre
+        self.empresa = empresa
+        self.mensaje_personal = mensaje_personal
+        self.plantilla = plantilla
+        self.estado = estado
+    
+    def variables(self) -> Dict[str, str]:
+        """Variables de la plantilla para este destinatario"""
+        variables = {
+            'NOMBRE': self.nombre,
+            'EMPRESA': self.empresa,
+            'MENSAJE_PERSONAL': self.mensaje_personal
+        }
+        variables.update(self.plantilla.variables_remitente)
+        return variables
+    
+    @property
+    def campana_id(self):
+        return self.plantilla.campana_id
+    
+    @property
+    def asunto(self) -> str:
+        return self.plantilla.asunto.render(self.variables())
+    
+    @property
+    def contenido(self) -> str:
+        return self.plantilla.contenido.render(self.variables())
+    
+    def a_dict(self, con_plantilla: bool = False) -> Dict:
+        """Correo completo como diccionario, renderizando asunto y contenido una vez
+        
+        con_plantilla agrega 'plantilla' y 'variables' (para que el transporte
+        arme el mensaje sobre el esqueleto de la campaña).
+        """
+        variables = self.variables()
+        correo = {
+            'indice': self.indice,
+            'email': self.email,
+            'nombre': self.nombre,
+            'empresa': self.empresa,
+            'asunto': self.plantilla.asunto.render(variables),
+            'contenido': self.plantilla.contenido.render(variables),
+            'estado': self.estado,
+            'campana_id': self.plantilla.campana_id
+        }
+        if con_plantilla:
+            correo['plantilla'] = self.plantilla
+            correo['variables'] = variables
+        return correo
+    
+    # Acceso estilo diccionario (compatibilidad con el formato anterior)
+    def __getitem__(self, clave: str):
+        if clave not in self.CLAVES:
+            raise KeyError(clave)
+        return getattr(self, clave)
+    
+    def __setitem__(self, clave: str, valor):
+        if clave != 'estado':
+            raise KeyError(f"Solo se puede modificar 'estado', no '{clave}'")
+        self.estado = valor
+    
+    def __contains__(self, clave) -> bool:
+        return clave in self.CLAVES
+    
+    def get(self, clave: str, defecto=None):
+        return getattr(self, clave) if clave in self.CLAVES else defecto
+    
+    def keys(self):
+        return self.CLAVES
+    
+    def __repr__(self) -> str:
+        return f"CorreoProcesado(#{self.indice} {self.email!r})"
+
+
+class CorreosLazy:
+    """Correos procesados bajo demanda (validar, deduplicar y renderizar al iterar)
+    
+    Se puede recorrer varias veces; len() hace una pasada sin renderizar
+    (validación, supresión y duplicados) y queda memorizado.
+    """
+    
+    def __init__(self, procesador: EmailProcessor, clientes: Iterable[Dict], campana: Dict, config: Dict):
+        self.procesador = procesador
+        self.clientes = clientes
+        self.campana = campana
+        self.config = config
+        self._conteos: Optional[Dict] = None
+    
+    def __iter__(self) -> Iterator[CorreoProcesado]:
+        return self.procesador.iter_correos(self.clientes, self.campana, self.config)
+    
+    @property
+    def conteos(self) -> Dict:
+        """Conteos de contar_clientes (inválidos, suprimidos, duplicados...), memorizados"""
+        if self._conteos is None:
+            self._conteos = self.procesador.contar_clientes(self.clientes, self.campana)
+        return self._conteos
+    
+    def __len__(self) -> int:
+        return self.conteos['unicos']
+    
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
 # Función de prueba
 if __name__ == "__main__":
     print("🧪 Probando EmailProcessor...")
@@ -1,30 +1,58 @@
-import win32com.client
-import pythoncom
+import asyncio
 import time
 import os
-from typing import List, Dict, Optional, Callable
+from typing import List, Dict, Optional, Callable, Iterable, Iterator
 import logging
 from datetime import datetime, timedelta
 import math
-import random
 import json
 import csv
 
+from attachment_cache import CacheAdjuntos
+from rate_limiter import ControlTasaAdaptativo, LimitadorTasa
+from retry_policy import ProgramadorReintentos, es_error_transitorio
+from send_engine import AdaptadorTransporteAsync, ControlEnvio, MotorEnvioAsync, TransporteAsync
+from send_journal import CORRIDA_COMPLETADA, CORRIDA_DETENIDA, ESTADO_REINTENTO
+from transports import TransporteCorreo, TransporteOutlook, crear_transporte
+
 class SmartEmailSender:
     """EmailSender INTELIGENTE que LEE configuración del EXCEL - PARTE 1"""
     
-    def __init__(self):
+    def __init__(self, historial_envios=None, transporte: TransporteCorreo = None, diario_envios=None,
+                 libro_cuotas=None, contact_store=None):
         self.outlook = None
         self.conectado = False
+        # Cuenta con la que se envía (la informa el transporte al conectar)
+        self.cuenta = None
+        # HistorialEnvios: cada envío exitoso queda registrado por (campaña, email)
+        self.historial_envios = historial_envios
+        # DiarioEnvios: plan y estado de cada destinatario en disco (reanudar tras un corte)
+        self.diario_envios = diario_envios
+        # ContactStore de la fuente de contactos (si es SQLite): último envío por contacto
+        self.contact_store = contact_store
+        # LibroCuotas: enviados por cuenta y día, compartido entre ejecuciones y procesos
+        self.libro_cuotas = libro_cuotas
+        # Motor del envío en curso (MotorEnvioAsync), para poder cancelarlo
+        self.motor = None
+        # Control AIMD del envío en curso (ritmo actual en control_tasa.tasa)
+        self.control_tasa = None
         self.logger = self._configurar_logger()
         
+        # Transporte de envío: Outlook por defecto, o SMTP (ver transports.crear_transporte)
+        self.transporte = transporte or TransporteOutlook(logger=self.logger)
+        if getattr(self.transporte, 'logger', None) is None:
+            self.transporte.logger = self.logger
+        
         # ⭐ CONFIGURACIÓN POR DEFECTO (si Excel no está disponible)
         self.config_default = {
             'MAX_CORREOS_DIARIOS': 400,
             'HORAS_TRABAJO': 8,
             'CORREOS_POR_LOTE': 50,
             'MINUTOS_ENTRE_LOTES': 6,
-            'EMPEZAR_INMEDIATAMENTE': True
+            'EMPEZAR_INMEDIATAMENTE': True,
+            'ENVIOS_SIMULTANEOS': 4,  # Máximo de correos en vuelo (limitado por el transporte)
+            'REINTENTOS_MAX': 3,  # Reintentos de fallos transitorios dentro del mismo envío (0 = sin reintentos)
+            'RITMO_ADAPTATIVO': True  # Bajar el ritmo si el servidor limita o se vuelve lento (AIMD)
         }
         
         # Variables actuales (se cargan del Excel)
@@ -33,9 +61,9 @@ class SmartEmailSender:
         
         # LÍMITES ANTI-SPAM DINÁMICOS
         self.LIMITE_RAPIDO = 25  # Base mínima
-        self.PAUSA_CORTA = 30    # 30 segundos entre correos normales
         self.PAUSA_LARGA = self.config_actual['MINUTOS_ENTRE_LOTES'] * 60  # En segundos
-        self.PAUSA_ALEATORIA = (15, 60)  # Variación aleatoria
+        self.JITTER_RITMO = 0.25  # Variación aleatoria (± fracción del intervalo entre correos)
+        self.ESPERA_REINTENTO = 30  # Segundos antes del primer reintento (se duplica en cada uno)
         
         # Para reportes
         self.reportes_folder = "reportes"
@@ -64,7 +92,10 @@ class SmartEmailSender:
                 'Horas_Para_Enviar_Todo': 'HORAS_TRABAJO', 
                 'Correos_Por_Lote': 'CORREOS_POR_LOTE',
                 'Minutos_Entre_Lotes': 'MINUTOS_ENTRE_LOTES',
-                'Empezar_Inmediatamente': 'EMPEZAR_INMEDIATAMENTE'
+                'Empezar_Inmediatamente': 'EMPEZAR_INMEDIATAMENTE',
+                'Envios_Simultaneos': 'ENVIOS_SIMULTANEOS',
+                'Reintentos_Max': 'REINTENTOS_MAX',
+                'Ritmo_Adaptativo': 'RITMO_ADAPTATIVO'
             }
             
             # Cargar valores del Excel
@@ -74,7 +105,7 @@ class SmartEmailSender:
                     valor_excel = config_data[campo_excel]
                     
                     # Procesar según tipo
-                    if campo_interno == 'EMPEZAR_INMEDIATAMENTE':
+                    if campo_interno in ('EMPEZAR_INMEDIATAMENTE', 'RITMO_ADAPTATIVO'):
                         # Convertir SÍ/NO a boolean
                         nuevo_valor = str(valor_excel).upper() in ['SÍ', 'SI', 'YES', 'TRUE', '1']
                     else:
@@ -98,6 +129,12 @@ class SmartEmailSender:
                     elif campo_interno == 'MINUTOS_ENTRE_LOTES' and not (1 <= nuevo_valor <= 60):
                         print(f"⚠️ {campo_excel} fuera de rango (1-60): {nuevo_valor}")
                         continue
+                    elif campo_interno == 'ENVIOS_SIMULTANEOS' and not (1 <= nuevo_valor <= 20):
+                        print(f"⚠️ {campo_excel} fuera de rango (1-20): {nuevo_valor}")
+                        continue
+                    elif campo_interno == 'REINTENTOS_MAX' and not (0 <= nuevo_valor <= 10):
+                        print(f"⚠️ {campo_excel} fuera de rango (0-10): {nuevo_valor}")
+                        continue
                     
                     # Aplicar cambio
                     valor_anterior = self.config_actual[campo_interno]
@@ -106,6 +143,10 @@ class SmartEmailSender:
                     if valor_anterior != nuevo_valor:
                         cambios.append(f"   • {campo_excel}: {valor_anterior} → {nuevo_valor}")
             
+            # Transporte (Outlook / SMTP) si el Excel lo indica
+            if 'Transporte' in config_data:
+                self.configurar_transporte(config_data)
+            
             # Recalcular valores derivados
             self.CORREOS_POR_HORA = self.config_actual['MAX_CORREOS_DIARIOS'] // self.config_actual['HORAS_TRABAJO']
             self.PAUSA_LARGA = self.config_actual['MINUTOS_ENTRE_LOTES'] * 60
@@ -138,6 +179,9 @@ class SmartEmailSender:
         print(f"   📦 Correos por lote: {self.config_actual['CORREOS_POR_LOTE']}")
         print(f"   ⏳ Minutos entre lotes: {self.config_actual['MINUTOS_ENTRE_LOTES']}")
         print(f"   🚀 Empezar inmediatamente: {self.config_actual['EMPEZAR_INMEDIATAMENTE']}")
+        print(f"   🔀 Envíos simultáneos: {self.config_actual['ENVIOS_SIMULTANEOS']}")
+        print(f"   🔁 Reintentos (fallos transitorios): {self.config_actual['REINTENTOS_MAX']}")
+        print(f"   📉 Ritmo adaptativo: {self.config_actual['RITMO_ADAPTATIVO']}")
         print(f"   🛡️ Límite rápido: {self.LIMITE_RAPIDO}")
         print(f"   📁 Reportes: {self.reportes_folder}")
         
@@ -158,38 +202,44 @@ class SmartEmailSender:
             
         return logger
     
-    def conectar_outlook(self) -> Dict:
-        """Conectar con Outlook"""
+    def configurar_transporte(self, config_data: Dict) -> bool:
+        """Cambia de transporte si la configuración pide otro (o cambia el servidor SMTP)"""
+        nuevo = crear_transporte(config_data, logger=self.logger)
+        if nuevo.firma() == self.transporte.firma():
+            return False
+        
+        self.usar_transporte(nuevo)
+        print(f"🔌 Transporte configurado: {nuevo.describir()}")
+        return True
+    
+    def usar_transporte(self, transporte: TransporteCorreo):
+        """Reemplaza el transporte (cierra el anterior; hay que volver a conectar)"""
         try:
-            self.logger.info("🔄 Conectando con Outlook...")
-            pythoncom.CoInitialize()
-            
-            try:
-                self.outlook = win32com.client.GetActiveObject("Outlook.Application")
-                self.logger.info("✅ Conectado a instancia existente")
-            except:
-                self.outlook = win32com.client.Dispatch("Outlook.Application")
-                self.logger.info("✅ Nueva instancia creada")
-            
-            namespace = self.outlook.GetNamespace("MAPI")
-            inbox = namespace.GetDefaultFolder(6)
-            
-            accounts = namespace.Accounts
-            if accounts.Count == 0:
-                raise Exception("No hay cuentas configuradas en Outlook")
-            
-            cuenta_principal = accounts.Item(1)
-            email_cuenta = getattr(cuenta_principal, 'SmtpAddress', cuenta_principal.DisplayName)
+            self.transporte.cerrar()
+        except Exception:
+            pass
+        if getattr(transporte, 'logger', None) is None:
+            transporte.logger = self.logger
+        self.transporte = transporte
+        self.outlook = None
+        self.conectado = False
+    
+    def conectar(self) -> Dict:
+        """Conectar con el transporte configurado (Outlook o SMTP)"""
+        try:
+            self.logger.info(f"🔄 Conectando ({self.transporte.tipo})...")
+            conexion = self.transporte.conectar()
             
-            self.conectado = True
-            self.logger.info(f"✅ Conectado - Cuenta: {email_cuenta}")
+            self.conectado = conexion['exitoso']
+            self.outlook = getattr(self.transporte, 'outlook', None)
             
-            return {
-                'exitoso': True,
-                'mensaje': f'Conectado a Outlook correctamente',
-                'cuenta': email_cuenta,
-                'total_cuentas': accounts.Count
-            }
+            if self.conectado:
+                self.cuenta = conexion.get('cuenta') or None
+                self.logger.info(f"✅ Conectado - Cuenta: {conexion.get('cuenta', '')}")
+            else:
+                self.logger.error(f"❌ Error conexión: {conexion['mensaje']}")
+                conexion.setdefault('sugerencia', self._obtener_sugerencia_error(conexion['mensaje']))
+            return conexion
             
         except Exception as e:
             self.conectado = False
@@ -202,6 +252,10 @@ class SmartEmailSender:
                 'sugerencia': self._obtener_sugerencia_error(error_msg)
             }
     
+    def conectar_outlook(self) -> Dict:
+        """Conectar (nombre histórico: usa el transporte configurado, Outlook por defecto)"""
+        return self.conectar()
+    
     def _obtener_sugerencia_error(self, error_msg: str) -> str:
         """Sugerencias según el error"""
         error_lower = error_msg.lower()
@@ -214,9 +268,31 @@ class SmartEmailSender:
             return "Configura una cuenta en Outlook"
         elif "access denied" in error_lower:
             return "Ejecuta como administrador"
+        elif "pywin32" in error_lower:
+            return "Usa Transporte = SMTP en CONFIGURACION.xlsx o instala pywin32 en Windows"
+        elif "authentication" in error_lower or "535" in error_lower:
+            return "Revisa SMTP_Usuario / SMTP_Password (o EMAIL_SMTP_PASSWORD)"
+        elif "connection refused" in error_lower or "timed out" in error_lower:
+            return "Revisa SMTP_Servidor, SMTP_Puerto y SMTP_Seguridad"
         else:
             return "Verifica que Outlook esté instalado y funcionando"
     
+    def _cuenta_cuota(self) -> str:
+        """Cuenta de envío con la que se lleva la cuota diaria"""
+        cuenta = (self.cuenta or getattr(self.transporte, 'remitente', None)
+                  or getattr(self.transporte, 'cuenta', None) or self.transporte.tipo)
+        return cuenta.strip().lower()
+    
+    def disponibles_hoy(self) -> Optional[int]:
+        """Correos que la cuenta aún puede enviar hoy según el libro de cuotas (None sin libro)"""
+        if self.libro_cuotas is None:
+            return None
+        try:
+            return self.libro_cuotas.disponibles(self._cuenta_cuota(), self.config_actual['MAX_CORREOS_DIARIOS'])
+        except Exception as e:
+            self.logger.warning(f"⚠️ No se pudo leer la cuota diaria: {e}")
+            return None
+    
     def calcular_estrategia_envio(self, total_correos: int, config_excel: Dict = None) -> Dict:
         """⭐ CALCULAR ESTRATEGIA usando configuración del EXCEL"""
         
@@ -249,6 +325,21 @@ class SmartEmailSender:
             estrategia['total_correos'] = total_correos
             estrategia['advertencia'] = f'Limitado a {self.config_actual["MAX_CORREOS_DIARIOS"]} correos'
         
+        # CUOTA DE HOY: lo ya enviado por la cuenta (en esta u otras ejecuciones) se descuenta
+        disponibles = self.disponibles_hoy()
+        if disponibles is not None:
+            max_diarios = self.config_actual['MAX_CORREOS_DIARIOS']
+            estrategia['cuota'] = {'cuenta': self._cuenta_cuota(), 'enviados_hoy': max_diarios - disponibles,
+                                   'disponibles': disponibles}
+            print(f"📅 Cuota de hoy ({estrategia['cuota']['cuenta']}): {max_diarios - disponibles} enviados, "
+                  f"{disponibles} disponibles")
+            if total_correos > disponibles:
+                print(f"⚠️ ADVERTENCIA: hoy solo quedan {disponibles} envíos para esta cuenta")
+                total_correos = disponibles
+                estrategia['total_correos'] = total_correos
+                estrategia['advertencia'] = (f'Cuota diaria: quedan {disponibles} de {max_diarios} correos hoy'
+                                             if disponibles else f'Cuota diaria agotada ({max_diarios} correos)')
+        
         if total_correos <= 2:
             # MODO INMEDIATO: Muy pocos correos
             estrategia.update({
@@ -260,14 +351,15 @@ class SmartEmailSender:
             })
             
         elif total_correos <= self.LIMITE_RAPIDO:
-            # MODO RÁPIDO: Hasta el límite rápido con pausas cortas
-            tiempo_total = total_correos * self.PAUSA_CORTA
+            # MODO RÁPIDO: Un solo lote al ritmo de CORREOS_POR_HORA
+            intervalo = round(self.crear_limitador('RÁPIDO').intervalo)
+            tiempo_total = (total_correos - 1) * intervalo
             estrategia.update({
                 'modo': 'RÁPIDO',
-                'descripcion': f'Envío con pausas cortas de {self.PAUSA_CORTA}s',
+                'descripcion': f'Envío a {self.tasa_por_hora():g} correos/hora (~{intervalo}s entre correos)',
                 'tiempo_estimado': f'{tiempo_total // 60}m {tiempo_total % 60}s',
                 'lotes': [{'cantidad': total_correos, 'pausa_despues': 0}],
-                'pausas': {'entre_correos': self.PAUSA_CORTA, 'entre_lotes': 0}
+                'pausas': {'entre_correos': intervalo, 'entre_lotes': 0}
             })
             
         else:
@@ -293,10 +385,9 @@ class SmartEmailSender:
                 
                 correos_restantes -= cantidad_lote
             
-            # Tiempo estimado usando configuración
-            tiempo_envios = total_correos * 15  # 15 seg promedio por envío
-            tiempo_pausas = (lotes_necesarios - 1) * self.PAUSA_LARGA
-            tiempo_total = tiempo_envios + tiempo_pausas
+            # Tiempo estimado: el limitador mantiene CORREOS_POR_HORA contando las pausas entre lotes
+            intervalo = round(self.crear_limitador('DISTRIBUIDO').intervalo)
+            tiempo_total = max(0, round(total_correos * 3600 / self.tasa_por_hora()) - self.PAUSA_LARGA)
             
             horas = tiempo_total // 3600
             minutos = (tiempo_total % 3600) // 60
@@ -313,7 +404,7 @@ class SmartEmailSender:
                 'tiempo_estimado': f'{horas}h {minutos}m' if horas > 0 else f'{minutos}m',
                 'lotes': lotes,
                 'pausas': {
-                    'entre_correos': random.randint(*self.PAUSA_ALEATORIA),
+                    'entre_correos': intervalo,
                     'entre_lotes': self.PAUSA_LARGA
                 }
             })
@@ -363,7 +454,7 @@ class SmartEmailSender:
                 resumen += f"\n"
             
             resumen += f"\n⏱️ PAUSAS:\n"
-            resumen += f"   • Entre correos: {estrategia['pausas']['entre_correos']}s (aleatorio)\n"
+            resumen += f"   • Entre correos: ~{estrategia['pausas']['entre_correos']}s (±{int(self.JITTER_RITMO * 100)}% aleatorio)\n"
             resumen += f"   • Entre lotes: {estrategia['pausas']['entre_lotes'] // 60}m (Excel)\n"
         
         resumen += f"\n🛡️ PROTECCIÓN ANTI-SPAM ACTIVADA\n"
@@ -755,7 +846,20 @@ class SmartEmailSender:
 
     def probar_conexion(self) -> str:
         """⭐ Probar conexión con Outlook MEJORADO con configuración"""
-        conexion = self.conectar_outlook()
+        conexion = self.conectar()
+        
+        if conexion['exitoso'] and self.transporte.tipo != 'outlook':
+            reporte = f"✅ CONEXIÓN {self.transporte.tipo.upper()} EXITOSA\n"
+            reporte += "="*50 + "\n"
+            reporte += f"🔌 Transporte: {self.transporte.describir()}\n"
+            reporte += f"📧 Remitente: {conexion.get('cuenta', '')}\n"
+            reporte += f"\n🎯 Estado: LISTO PARA ENVIAR\n"
+            reporte += f"\n⚙️ CONFIGURACIÓN ACTUAL:\n"
+            reporte += f"📈 Max correos diarios: {self.config_actual['MAX_CORREOS_DIARIOS']}\n"
+            reporte += f"📦 Correos por lote: {self.config_actual['CORREOS_POR_LOTE']}\n"
+            reporte += f"⏳ Minutos entre lotes: {self.config_actual['MINUTOS_ENTRE_LOTES']}\n"
+            reporte += f"📁 Reportes: {self.reportes_folder}/\n"
+            return reporte
         
         if conexion['exitoso']:
             try:
@@ -812,161 +916,122 @@ class SmartEmailSender:
             
             return reporte
 
-# FUNCIÓN DE PRUEBA COMPLETA CON CONFIGURACIÓN EXCEL
-if __name__ == "__main__":
-    print("🧪 PROBANDO SMART EMAIL SENDER CON CONFIGURACIÓN EXCEL")
-    print("=" * 65)
-    
-    sender = SmartEmailSender()
-    
-    # ⭐ PRUEBA CON CONFIGURACIÓN EXCEL SIMULADA
-    print("\n🔧 PROBANDO CONFIGURACIÓN EXCEL...")
-    
-    config_excel_test = {
-        'config': {
-            'Total_Correos_Por_Dia': 300,
-            'Horas_Para_Enviar_Todo': 6,
-            'Correos_Por_Lote': 30,
-            'Minutos_Entre_Lotes': 8,
-            'Empezar_Inmediatamente': 'SÍ'
-        },
-        'valida': True
-    }
-    
-    print("📊 Configuración Excel de prueba:")
-    for key, value in config_excel_test['config'].items():
-        print(f"   {key}: {value}")
-    
-    # Cargar configuración
-    sender.cargar_configuracion_excel(config_excel_test)
+    # CONTINUACIÓN DE SmartEmailSender - PARTE 2
     
-    # Pruebas de estrategia con configuración Excel
-    casos_prueba = [2, 10, 25, 50, 100, 300]
+    def _validar_correo(self, correo_data: Dict):
+        """Valida los datos mínimos del correo (lanza ValueError)"""
+        if not correo_data.get('email'):
+            raise ValueError("Email del destinatario requerido")
+        if not correo_data.get('asunto'):
+            raise ValueError("Asunto del correo requerido")
+        if not correo_data.get('contenido'):
+            raise ValueError("Contenido del correo requerido")
     
-    for caso in casos_prueba:
-        print(f"\n📊 CASO: {caso} correos (CON configuración Excel)")
-        print("-" * 50)
+    def _resultado_exitoso(self, correo_data: Dict, adjuntos_agregados: int) -> Dict:
+        timestamp = datetime.now().strftime('%H:%M:%S')
+        nombre = correo_data.get('nombre', 'Sin nombre')
         
-        estrategia = sender.calcular_estrategia_envio(caso, config_excel_test)
-        print(sender.mostrar_estrategia(estrategia))
-    
-    # Listar reportes disponibles
-    print(f"\n" + "="*65)
-    sender.listar_reportes_disponibles()
-    
-    print("\n✅ Pruebas completadas")
-    print("\n💡 NUEVAS FUNCIONES CON CONFIGURACIÓN EXCEL:")
-    print("   📊 sender.envio_inteligente(..., config_excel) - Envío con Excel")
-    print("   🔄 sender.reintentar_fallidos_simple(..., config_excel) - Reintento con Excel")
-    print("   📋 sender.obtener_configuracion_de_reporte() - Ver config de reporte")
-    print("   ⚙️ sender.aplicar_configuracion_desde_reporte() - Aplicar config previa")
-    print("   📊 sender.comparar_configuraciones_reportes() - Comparar configs")
-    print("   📄 sender.mostrar_configuracion_actual() - Ver config actual")
-    
-    print(f"\n🎯 INTEGRACIÓN CON GUI:")
-    print("   En gui.py cambiar:")
-    print("   resultados = sender.envio_inteligente(correos, adjuntos, callback, detener)")
-    print("   POR:")
-    print("   config = excel_mgr.cargar_configuracion()")
-    print("   resultados = sender.envio_inteligente(correos, adjuntos, callback, detener, config)")
+        self.logger.info(f"✅ ENVIADO: {correo_data['email']} - {nombre}")
+        
+        return {
+            'exitoso': True,
+            'timestamp': timestamp,
+            'email': correo_data['email'],
+            'nombre': nombre,
+            'empresa': correo_data.get('empresa', ''),
+            'adjuntos_agregados': adjuntos_agregados
+        }
     
-    input("\nPresiona Enter para cerrar...")# CONTINUACIÓN DE SmartEmailSender - PARTE 2
+    def _resultado_fallido(self, correo_data: Dict, error: Exception) -> Dict:
+        error_msg = str(error)
+        self.logger.error(f"❌ Error enviando a {correo_data.get('email', 'desconocido')}: {error_msg}")
+        
+        return {
+            'exitoso': False,
+            'error': error_msg,
+            'transitorio': es_error_transitorio(error),
+            'email': correo_data.get('email', 'desconocido'),
+            'nombre': correo_data.get('nombre', 'Sin nombre'),
+            'empresa': correo_data.get('empresa', '')
+        }
     
     def enviar_correo(self, correo_data: Dict, adjuntos: List[str] = None) -> Dict:
-        """Enviar correo individual"""
+        """Enviar correo individual (por el transporte configurado)"""
         if not self.conectado:
             return {
                 'exitoso': False,
-                'error': 'No hay conexión con Outlook'
+                'error': f'No hay conexión ({self.transporte.describir()})'
             }
         
+        # Registro compacto (CorreoProcesado): renderizar asunto y contenido una vez
+        if hasattr(correo_data, 'a_dict'):
+            correo_data = correo_data.a_dict(con_plantilla=True)
+        
         try:
-            pythoncom.CoInitialize()
-            
-            # Validar datos
-            if not correo_data.get('email'):
-                raise ValueError("Email del destinatario requerido")
-            if not correo_data.get('asunto'):
-                raise ValueError("Asunto del correo requerido")
-            if not correo_data.get('contenido'):
-                raise ValueError("Contenido del correo requerido")
-            
-            # Crear correo
-            mail = self.outlook.CreateItem(0)
-            mail.To = correo_data['email'].strip()
-            mail.Subject = correo_data['asunto'].strip()
-            
-            # Configurar contenido
-            contenido = correo_data['contenido']
-            if '\n' in contenido and '<br>' not in contenido.lower():
-                contenido_html = contenido.replace('\n', '<br>')
-                mail.HTMLBody = f"""
-                <html>
-                <body style="font-family: Arial, sans-serif; font-size: 12pt;">
-                {contenido_html}
-                </body>
-                </html>
-                """
-            else:
-                if '<html>' in contenido.lower():
-                    mail.HTMLBody = contenido
-                else:
-                    mail.Body = contenido
-            
-            # Agregar adjuntos
-            adjuntos_agregados = 0
-            if adjuntos:
-                for ruta_adjunto in adjuntos:
-                    if os.path.exists(ruta_adjunto):
-                        try:
-                            mail.Attachments.Add(ruta_adjunto)
-                            adjuntos_agregados += 1
-                            self.logger.info(f"📎 Adjunto: {os.path.basename(ruta_adjunto)}")
-                        except Exception as attach_error:
-                            self.logger.warning(f"⚠️ No se pudo adjuntar {ruta_adjunto}: {attach_error}")
+            self.transporte.iniciar_hilo()
+            self._validar_correo(correo_data)
             
             # ENVIAR
             self.logger.info(f"📤 Enviando a {correo_data['email']}...")
-            mail.Send()
-            
-            timestamp = datetime.now().strftime('%H:%M:%S')
-            nombre = correo_data.get('nombre', 'Sin nombre')
-            
-            self.logger.info(f"✅ ENVIADO: {correo_data['email']} - {nombre}")
-            
-            return {
-                'exitoso': True,
-                'timestamp': timestamp,
-                'email': correo_data['email'],
-                'nombre': nombre,
-                'empresa': correo_data.get('empresa', ''),
-                'adjuntos_agregados': adjuntos_agregados
-            }
+            adjuntos_agregados = self.transporte.enviar(correo_data, adjuntos)
+            return self._resultado_exitoso(correo_data, adjuntos_agregados)
             
         except Exception as e:
-            error_msg = str(e)
-            self.logger.error(f"❌ Error enviando a {correo_data.get('email', 'desconocido')}: {error_msg}")
-            
+            return self._resultado_fallido(correo_data, e)
+        finally:
+            self.transporte.finalizar_hilo()
+    
+    async def enviar_correo_async(self, correo_data: Dict, adjuntos: List[str] = None,
+                                  transporte_async: TransporteAsync = None) -> Dict:
+        """enviar_correo() como corrutina, sobre un transporte asíncrono (MotorEnvioAsync)"""
+        if not self.conectado:
             return {
                 'exitoso': False,
-                'error': error_msg,
-                'email': correo_data.get('email', 'desconocido'),
-                'nombre': correo_data.get('nombre', 'Sin nombre'),
-                'empresa': correo_data.get('empresa', '')
+                'error': f'No hay conexión ({self.transporte.describir()})'
             }
-        finally:
-            try:
-                pythoncom.CoUninitialize()
-            except:
-                pass
+        
+        if hasattr(correo_data, 'a_dict'):
+            correo_data = correo_data.a_dict(con_plantilla=True)
+        
+        try:
+            self._validar_correo(correo_data)
+            
+            self.logger.info(f"📤 Enviando a {correo_data['email']}...")
+            adjuntos_agregados = await transporte_async.enviar(correo_data, adjuntos)
+            return self._resultado_exitoso(correo_data, adjuntos_agregados)
+            
+        except Exception as e:
+            return self._resultado_fallido(correo_data, e)
+    
+    def _iterar_correos(self, correos: Iterable[Dict]) -> Iterator[Dict]:
+        """Recorre los correos (lista o generados bajo demanda) guardando el
+        asunto y contenido del primero para los reintentos"""
+        for i, correo in enumerate(correos):
+            if i == 0:
+                self.ultimo_asunto = correo.get('asunto', '')
+                self.ultimo_contenido = correo.get('contenido', '')
+            yield correo
     
-    def envio_inteligente(self, correos: List[Dict], adjuntos: List[str], 
+    def envio_inteligente(self, correos: Iterable[Dict], adjuntos: List[str], 
                          callback_progreso: Callable = None, 
                          detener_callback: Callable = None,
-                         config_excel: Dict = None) -> Dict:  # ⭐ NUEVO PARÁMETRO
-        """⭐ ENVÍO INTELIGENTE usando configuración del EXCEL + REPORTES"""
+                         config_excel: Dict = None,  # ⭐ NUEVO PARÁMETRO
+                         control: ControlEnvio = None,
+                         run_id: str = None) -> Dict:
+        """⭐ ENVÍO INTELIGENTE usando configuración del EXCEL + REPORTES
         
-        pythoncom.CoInitialize()
+        'correos' puede ser una lista o un iterable con len() que genere los
+        correos bajo demanda (EmailProcessor.procesar_lista_clientes_lazy):
+        cada correo se renderiza justo antes de enviarse.
+        
+        'control' (ControlEnvio) permite detener, pausar y reanudar desde otro
+        hilo sin esperar a que venza ninguna pausa.
+        
+        Con diario de envíos, 'run_id' reanuda esa corrida desde el primer
+        destinatario no enviado ('correos' puede ser None).
+        """
+        
+        self.transporte.iniciar_hilo()
         
         # ⭐ CARGAR CONFIGURACIÓN EXCEL AL INICIO
         if config_excel:
@@ -976,17 +1041,53 @@ if __name__ == "__main__":
         else:
             print("⚠️ Sin configuración Excel - usando valores por defecto")
         
-        # ⭐ GUARDAR PARA REINTENTOS
-        if correos:
-            self.ultimo_asunto = correos[0].get('asunto', '')
-            self.ultimo_contenido = correos[0].get('contenido', '')
+        # Conectar si el transporte cambió con la configuración (o aún no se conectó)
+        if not self.conectado:
+            conexion = self.conectar()
+            if not conexion['exitoso']:
+                self.transporte.finalizar_hilo()
+                return {'error': f"Sin conexión: {conexion['mensaje']}"}
+        
+        # Verificar adjuntos (antes de registrar la corrida: sin ellos no hay nada que reanudar)
+        if adjuntos:
+            adjuntos_faltantes = [adj for adj in adjuntos if not os.path.exists(adj)]
+            if adjuntos_faltantes:
+                error_msg = f"Adjuntos faltantes: {adjuntos_faltantes}"
+                self.logger.error(f"❌ {error_msg}")
+                self.transporte.finalizar_hilo()
+                return {'error': error_msg}
+        
+        # Diario de envíos: el plan y cada transición quedan en disco al momento
+        corrida = None
+        if self.diario_envios is not None:
+            corrida = self._preparar_corrida(correos, run_id, adjuntos, config_excel)
+            if 'error' in corrida:
+                self.transporte.finalizar_hilo()
+                return {'error': corrida['error']}
+            correos = corrida['correos']
+        elif run_id:
+            self.transporte.finalizar_hilo()
+            return {'error': 'No hay diario de envíos para reanudar'}
+        
+        # ⭐ GUARDAR PARA REINTENTOS (al consumir el primer correo)
+        total_correos = len(correos)
+        iterador = self._iterar_correos(correos)
         
         # ⭐ Calcular estrategia con configuración Excel
-        estrategia = self.calcular_estrategia_envio(len(correos), config_excel)
+        estrategia = self.calcular_estrategia_envio(total_correos, config_excel)
+        
+        # Cuota de la cuenta agotada por envíos anteriores de hoy: la corrida queda para mañana
+        if total_correos and estrategia.get('cuota', {}).get('disponibles') == 0:
+            self.logger.warning(f"🛑 {estrategia['advertencia']} - {estrategia['cuota']['cuenta']}")
+            if corrida:
+                self._finalizar_corrida(corrida, False)
+            self.transporte.finalizar_hilo()
+            return {'error': f"{estrategia['advertencia']} para {estrategia['cuota']['cuenta']}. "
+                             f"Intenta de nuevo mañana"}
         
         self.logger.info("🎯 ENVÍO INTELIGENTE CON CONFIGURACIÓN EXCEL")
         self.logger.info("=" * 60)
-        self.logger.info(f"📊 Total correos: {len(correos)}")
+        self.logger.info(f"📊 Total correos: {total_correos}")
         self.logger.info(f"🚀 Modo: {estrategia['modo']}")
         self.logger.info(f"📝 {estrategia['descripcion']}")
         self.logger.info(f"⏰ Tiempo estimado: {estrategia['tiempo_estimado']}")
@@ -999,6 +1100,7 @@ if __name__ == "__main__":
         self.logger.info(f"   Minutos entre lotes: {config_usada.get('MINUTOS_ENTRE_LOTES')}")
         
         resultados = {
+            'run_id': corrida['run_id'] if corrida else None,
             'exitosos': [],
             'fallidos': [],
             'total_procesados': 0,
@@ -1008,109 +1110,33 @@ if __name__ == "__main__":
         }
         
         try:
-            # Verificar adjuntos
             if adjuntos:
-                adjuntos_faltantes = [adj for adj in adjuntos if not os.path.exists(adj)]
-                if adjuntos_faltantes:
-                    error_msg = f"Adjuntos faltantes: {adjuntos_faltantes}"
-                    self.logger.error(f"❌ {error_msg}")
-                    return {'error': error_msg}
-                
                 self.logger.info(f"📎 {len(adjuntos)} adjuntos verificados")
-            
-            # PROCESAR SEGÚN ESTRATEGIA (usando configuración Excel)
-            correo_actual = 0
-            
-            if estrategia['modo'] == 'INMEDIATO':
-                # Envío inmediato
-                self.logger.info("🚀 MODO INMEDIATO - Sin pausas")
-                
-                for i, correo in enumerate(correos):
-                    if detener_callback and detener_callback():
-                        break
-                    
-                    if callback_progreso:
-                        progreso = ((i + 1) / len(correos)) * 100
-                        callback_progreso(progreso, f"Enviando {i+1}/{len(correos)} - {correo.get('nombre', 'Sin nombre')}")
-                    
-                    resultado = self.enviar_correo(correo, adjuntos)
-                    self._procesar_resultado(resultado, resultados)
-                    
-                    # Solo pausa mínima
-                    if i < len(correos) - 1:
-                        time.sleep(5)
-            
-            elif estrategia['modo'] == 'RÁPIDO':
-                # Envío rápido con pausas cortas
-                self.logger.info(f"⚡ MODO RÁPIDO - Pausas de {estrategia['pausas']['entre_correos']}s")
                 
-                for i, correo in enumerate(correos):
-                    if detener_callback and detener_callback():
-                        break
-                    
-                    if callback_progreso:
-                        progreso = ((i + 1) / len(correos)) * 100
-                        callback_progreso(progreso, f"Enviando {i+1}/{len(correos)} - {correo.get('nombre', 'Sin nombre')}")
-                    
-                    resultado = self.enviar_correo(correo, adjuntos)
-                    self._procesar_resultado(resultado, resultados)
-                    
-                    # Pausa corta entre correos
-                    if i < len(correos) - 1:
-                        self._pausa_inteligente(estrategia['pausas']['entre_correos'], 
-                                              f"Pausa rápida", callback_progreso, detener_callback)
+                # Cada adjunto se lee y codifica una vez para toda la corrida
+                adjuntos = CacheAdjuntos(adjuntos)
             
-            else:  # MODO DISTRIBUIDO con configuración Excel
-                self.logger.info(f"📦 MODO DISTRIBUIDO - {len(estrategia['lotes'])} lotes (Excel: {config_usada.get('CORREOS_POR_LOTE')} por lote)")
-                
-                for num_lote, lote in enumerate(estrategia['lotes']):
-                    if detener_callback and detener_callback():
-                        break
-                    
-                    self.logger.info(f"📦 LOTE {lote['numero']}/{len(estrategia['lotes'])}: {lote['cantidad']} correos")
-                    
-                    # Procesar correos del lote
-                    fin_lote = min(correo_actual + lote['cantidad'], len(correos))
-                    
-                    for i in range(correo_actual, fin_lote):
-                        if detener_callback and detener_callback():
-                            break
-                        
-                        correo = correos[i]
-                        
-                        if callback_progreso:
-                            progreso = ((i + 1) / len(correos)) * 100
-                            lote_info = f"Lote {lote['numero']}/{len(estrategia['lotes'])}"
-                            callback_progreso(progreso, f"{lote_info} - {correo.get('nombre', 'Sin nombre')} ({i+1}/{len(correos)})")
-                        
-                        resultado = self.enviar_correo(correo, adjuntos)
-                        self._procesar_resultado(resultado, resultados)
-                        
-                        # Pausa aleatoria entre correos del mismo lote
-                        if i < fin_lote - 1:
-                            pausa = random.randint(*self.PAUSA_ALEATORIA)
-                            self._pausa_inteligente(pausa, f"Entre correos", callback_progreso, detener_callback)
-                    
-                    correo_actual = fin_lote
-                    
-                    # Pausa larga entre lotes (usando configuración Excel)
-                    if lote['pausa_despues'] > 0 and not (detener_callback and detener_callback()):
-                        minutos_pausa = config_usada.get('MINUTOS_ENTRE_LOTES', 6)
-                        self.logger.info(f"⏳ Pausa entre lotes: {minutos_pausa} minutos (según Excel)")
-                        
-                        siguiente_lote = num_lote + 2  # +2 porque empezamos desde 1
-                        if siguiente_lote <= len(estrategia['lotes']):
-                            mensaje_pausa = f"Pausa {minutos_pausa}m (Excel) - Siguiente: Lote {siguiente_lote}"
-                        else:
-                            mensaje_pausa = f"Pausa final de {minutos_pausa}m"
-                        
-                        self._pausa_inteligente(lote['pausa_despues'], mensaje_pausa, callback_progreso, detener_callback)
+            # PROCESAR SEGÚN ESTRATEGIA (usando configuración Excel)
+            resultados['motor'] = self._ejecutar_estrategia(iterador, total_correos, estrategia, adjuntos,
+                                                             resultados, callback_progreso, detener_callback,
+                                                             control, corrida)
+            
+            if corrida:
+                # Completa: se empezaron todos y ninguno quedó esperando su reintento
+                completa = (resultados['motor']['iniciados'] >= total_correos and
+                            not self.diario_envios.conteo_estados(corrida['run_id']).get(ESTADO_REINTENTO))
+                self._finalizar_corrida(corrida, completa)
+            
+            if isinstance(adjuntos, CacheAdjuntos):
+                resultados['adjuntos'] = adjuntos.estadisticas()
+                self.logger.info(f"📎 Caché de adjuntos: {resultados['adjuntos']['tasa_aciertos']:.0%} aciertos, "
+                                 f"{resultados['adjuntos']['bytes_ahorrados'] / 1024 / 1024:.1f} MB sin releer")
         
         finally:
-            try:
-                pythoncom.CoUninitialize()
-            except:
-                pass
+            if isinstance(adjuntos, CacheAdjuntos):
+                self.transporte.liberar_adjuntos(adjuntos)
+                adjuntos.cerrar()
+            self.transporte.finalizar_hilo()
         
         # Finalizar
         resultados['fin'] = datetime.now()
@@ -1130,39 +1156,285 @@ if __name__ == "__main__":
         
         return resultados
     
-    def _procesar_resultado(self, resultado: Dict, resultados: Dict):
+    def _ejecutar_estrategia(self, iterador: Iterator[Dict], total_correos: int, estrategia: Dict,
+                             adjuntos: List[str], resultados: Dict,
+                             callback_progreso: Callable = None, detener_callback: Callable = None,
+                             control: ControlEnvio = None, corrida: Dict = None) -> Dict:
+        """Envía según la estrategia con MotorEnvioAsync (varios correos en vuelo)
+        
+        Los lotes y pausas entre lotes son los de la estrategia; el ritmo entre
+        correos lo marca el LimitadorTasa (CORREOS_POR_HORA exactos).
+        """
+        modo = estrategia['modo']
+        lotes = estrategia['lotes']
+        config_usada = estrategia.get('config_usada', {})
+        minutos_pausa = config_usada.get('MINUTOS_ENTRE_LOTES', 6)
+        
+        limitador = self.crear_limitador(modo)
+        
+        if modo == 'INMEDIATO':
+            self.logger.info("🚀 MODO INMEDIATO - Sin pausas")
+            descripcion_espera = None
+        elif modo == 'RÁPIDO':
+            self.logger.info(f"⚡ MODO RÁPIDO - {self.tasa_por_hora():g} correos/hora (~{limitador.intervalo:.0f}s entre correos)")
+            descripcion_espera = "Pausa rápida"
+        else:
+            self.logger.info(f"📦 MODO DISTRIBUIDO - {len(lotes)} lotes (Excel: {config_usada.get('CORREOS_POR_LOTE')} por lote)")
+            descripcion_espera = "Entre correos"
+            
+            lotes = []
+            for num_lote, lote in enumerate(estrategia['lotes']):
+                siguiente_lote = num_lote + 2  # +2 porque empezamos desde 1
+                if siguiente_lote <= len(estrategia['lotes']):
+                    descripcion_pausa = f"Pausa {minutos_pausa}m (Excel) - Siguiente: Lote {siguiente_lote}"
+                else:
+                    descripcion_pausa = f"Pausa final de {minutos_pausa}m"
+                lotes.append(dict(lote, descripcion_pausa=descripcion_pausa))
+        
+        concurrencia = min(self.config_actual.get('ENVIOS_SIMULTANEOS', 1), self.transporte.max_simultaneos())
+        self.logger.info(f"🔀 Envíos simultáneos: {concurrencia}")
+        
+        transporte_async = AdaptadorTransporteAsync(self.transporte, hilos=concurrencia)
+        self.motor = MotorEnvioAsync(concurrencia=concurrencia, logger=self.logger, control=control)
+        
+        # Ritmo adaptativo: baja si el servidor limita o se vuelve lento, sube al recuperarse
+        self.control_tasa = None
+        if self.config_actual.get('RITMO_ADAPTATIVO') and modo != 'INMEDIATO':
+            def al_ajustar(anterior: float, tasa: float, motivo: Optional[str]):
+                if motivo:
+                    self.logger.warning(f"📉 Ritmo {anterior:.0f} → {tasa:.0f} correos/h ({motivo})")
+                    if callback_progreso:
+                        callback_progreso(None, f"📉 Ritmo reducido a {tasa:.0f}/h ({motivo})")
+            
+            self.control_tasa = ControlTasaAdaptativo(limitador, al_ajustar=al_ajustar)
+        
+        # Cuota diaria persistente: cada envío reserva su lugar antes de salir
+        cuota = None
+        if self.libro_cuotas is not None:
+            cuota = self.libro_cuotas.cuota(self._cuenta_cuota(), self.config_actual['MAX_CORREOS_DIARIOS'])
+        
+        def ritmo() -> str:
+            return f" · {self.control_tasa.tasa:.0f}/h" if self.control_tasa else ""
+        
+        # Fallos transitorios (timeouts, servidor ocupado, 4xx): se reintentan en este mismo envío
+        reintentos = None
+        if self.config_actual.get('REINTENTOS_MAX', 0) > 0:
+            reintentos = ProgramadorReintentos(max_intentos=self.config_actual['REINTENTOS_MAX'],
+                                               espera_base=self.ESPERA_REINTENTO)
+        
+        # Posición en el diario de cada correo en vuelo, y los que esperan un reintento
+        posiciones = {}
+        en_reintento = set()
+        
+        def al_iniciar(indice: int, correo: Dict, num_lote: int):
+            if corrida:
+                posiciones[id(correo)] = corrida['correos'].posicion(indice)
+                self._registrar_en_diario(corrida, posiciones[id(correo)])
+            if modo == 'DISTRIBUIDO' and indice == sum(lote['cantidad'] for lote in lotes[:num_lote]):
+                self.logger.info(f"📦 LOTE {lotes[num_lote]['numero']}/{len(lotes)}: {lotes[num_lote]['cantidad']} correos")
+            if callback_progreso:
+                progreso = ((indice + 1) / total_correos) * 100
+                if modo == 'DISTRIBUIDO':
+                    lote_info = f"Lote {lotes[num_lote]['numero']}/{len(lotes)}"
+                    callback_progreso(progreso, f"{lote_info} - {correo.get('nombre', 'Sin nombre')} ({indice+1}/{total_correos}){ritmo()}")
+                else:
+                    callback_progreso(progreso, f"Enviando {indice+1}/{total_correos} - {correo.get('nombre', 'Sin nombre')}{ritmo()}")
+        
+        def al_pausar(restante: Optional[float], descripcion: str):
+            if callback_progreso and restante is None:
+                callback_progreso(None, descripcion)
+            elif callback_progreso:
+                minutos, segs = divmod(math.ceil(restante), 60)
+                tiempo_texto = f"{minutos}m {segs}s" if minutos > 0 else f"{segs}s"
+                callback_progreso(None, f"{descripcion} - Restante: {tiempo_texto}")
+        
+        def al_reintento(resultado: Dict, correo: Dict, intento: int, espera: float):
+            self.logger.warning(f"🔁 Reintento {intento}/{reintentos.max_intentos} en {espera:.0f}s: "
+                                f"{resultado['email']} - {resultado['error']}")
+            if callback_progreso:
+                callback_progreso(None, f"🔁 Reintento {intento} de {resultado['email']} en {espera:.0f}s")
+            if corrida:
+                # No se entregó: si la corrida se corta durante la espera, al reanudar se reenvía
+                en_reintento.add(id(correo))
+                self._registrar_en_diario(corrida, posiciones[id(correo)], resultado, reintento=True)
+        
+        def al_resultado(resultado: Dict, correo: Dict):
+            if corrida:
+                # Un reintento que no llegó a salir (detenido o límite diario) queda para reanudar
+                pendiente = id(correo) in en_reintento and not resultado['exitoso']
+                en_reintento.discard(id(correo))
+                self._registrar_en_diario(corrida, posiciones.pop(id(correo)), resultado, reintento=pendiente)
+            self._procesar_resultado(resultado, resultados, correo)
+        
+        async def enviar(correo):
+            if id(correo) in en_reintento:
+                en_reintento.discard(id(correo))
+                self._registrar_en_diario(corrida, posiciones[id(correo)])
+            return await self.enviar_correo_async(correo, adjuntos, transporte_async)
+        
+        async def ejecutar():
+            try:
+                estadisticas = await self.motor.ejecutar(
+                    iterador, lotes, enviar,
+                    limitador=limitador,
+                    descripcion_espera=descripcion_espera,
+                    al_iniciar=al_iniciar,
+                    al_resultado=al_resultado,
+                    al_pausar=al_pausar,
+                    detener_callback=detener_callback,
+                    reintentos=reintentos,
+                    al_reintento=al_reintento,
+                    adaptativo=self.control_tasa,
+                    cuota=cuota
+                )
+                estadisticas['ritmo'] = limitador.estadisticas()
+                if reintentos is not None:
+                    estadisticas['reintentos'] = reintentos.estadisticas()
+                if self.control_tasa is not None:
+                    estadisticas['adaptativo'] = self.control_tasa.estadisticas()
+                if cuota is not None:
+                    estadisticas['cuota'] = cuota.estadisticas()
+                return estadisticas
+            finally:
+                await transporte_async.cerrar()
+        
+        return asyncio.run(ejecutar())
+    
+    def tasa_por_hora(self) -> float:
+        """Correos por hora sin redondear (CORREOS_POR_HORA es 0 con menos correos que horas)"""
+        return self.config_actual['MAX_CORREOS_DIARIOS'] / self.config_actual['HORAS_TRABAJO']
+    
+    def crear_limitador(self, modo: str) -> LimitadorTasa:
+        """Limitador de ritmo para el modo de envío, según config_actual
+        
+        INMEDIATO envía sin esperas (ráfaga); RÁPIDO y DISTRIBUIDO van a
+        CORREOS_POR_HORA (DISTRIBUIDO compensa las pausas entre lotes). Con
+        libro de cuotas el máximo diario lo controla el libro (solo cuenta los
+        envíos exitosos, de todas las ejecuciones), no el limitador.
+        """
+        extra = {'max_diarios': None} if self.libro_cuotas is not None else {}
+        return LimitadorTasa.desde_config(
+            self.config_actual,
+            correos_por_hora=self.tasa_por_hora(),
+            compensar_pausas=(modo == 'DISTRIBUIDO'),
+            capacidad=2 if modo == 'INMEDIATO' else 1,
+            jitter=self.JITTER_RITMO,
+            **extra
+        )
+    
+    def detener_envio(self):
+        """Detiene el envío en curso (se puede llamar desde otro hilo)"""
+        if self.motor is not None:
+            self.motor.control.detener()
+    
+    def pausar_envio(self):
+        """Pausa el envío en curso: no se inician más correos hasta reanudar"""
+        if self.motor is not None:
+            self.motor.control.pausar()
+    
+    def reanudar_envio(self):
+        """Reanuda el envío pausado desde el mismo correo"""
+        if self.motor is not None:
+            self.motor.control.reanudar()
+    
+    def _procesar_resultado(self, resultado: Dict, resultados: Dict, correo: Dict = None):
         """Procesar resultado individual"""
         if resultado['exitoso']:
             resultados['exitosos'].append(resultado)
             self.logger.info(f"✅ ÉXITO: {resultado['email']}")
+            self._registrar_en_historial(resultado, correo)
+            self._registrar_en_contactos(resultado, correo)
         else:
             resultados['fallidos'].append(resultado)
             self.logger.error(f"❌ FALLO: {resultado['email']} - {resultado['error']}")
         
         resultados['total_procesados'] += 1
     
-    def _pausa_inteligente(self, segundos: int, descripcion: str, 
-                          callback_progreso: Callable, detener_callback: Callable):
-        """Pausa inteligente con actualizaciones"""
-        
-        for segundo in range(segundos):
-            if detener_callback and detener_callback():
-                break
-            
-            # Actualizar progreso cada 10 segundos
-            if segundo % 10 == 0 and callback_progreso:
-                tiempo_restante = segundos - segundo
-                minutos = tiempo_restante // 60
-                segs = tiempo_restante % 60
-                
-                if minutos > 0:
-                    tiempo_texto = f"{minutos}m {segs}s"
-                else:
-                    tiempo_texto = f"{segs}s"
-                
-                callback_progreso(None, f"{descripcion} - Restante: {tiempo_texto}")
-            
-            time.sleep(1)
+    def _preparar_corrida(self, correos: Iterable[Dict], run_id: str, adjuntos: List[str],
+                          config_excel: Dict = None) -> Dict:
+        """Corrida del diario: nueva (guarda el plan completo) o reanudada desde su cursor"""
+        if run_id:
+            reanudacion = self.diario_envios.reanudar(run_id)
+            if 'error' in reanudacion:
+                return reanudacion
+            corrida = reanudacion['corrida']
+            self.logger.info(f"♻️ Reanudando corrida {run_id} desde {corrida['cursor']}/{corrida['total']}")
+            if reanudacion['inciertos']:
+                self.logger.warning(f"❔ {reanudacion['inciertos']} correos estaban en vuelo al cortarse: no se reenvían")
+            return {'run_id': run_id, 'desde': corrida['cursor'], 'correos': reanudacion['correos'],
+                    'inciertos': reanudacion['inciertos']}
+        
+        # La contraseña SMTP no se guarda en el diario
+        config = dict((config_excel or {}).get('config', {}))
+        datos = {
+            'adjuntos': list(adjuntos or []),
+            'config': {clave: valor for clave, valor in config.items() if 'password' not in str(clave).lower()}
+        }
+        run_id = self.diario_envios.iniciar_corrida(correos, datos=datos)
+        self.logger.info(f"📒 Corrida {run_id} registrada en el diario")
+        return {'run_id': run_id, 'desde': 0, 'correos': self.diario_envios.correos_pendientes(run_id),
+                'inciertos': 0}
+    
+    def _registrar_en_diario(self, corrida: Dict, posicion: int, resultado: Dict = None,
+                             reintento: bool = False):
+        """Inicio (sin resultado), reintento pendiente o resultado de un envío en el diario"""
+        try:
+            if resultado is None:
+                self.diario_envios.registrar_inicio(corrida['run_id'], posicion)
+            elif reintento:
+                self.diario_envios.registrar_reintento(corrida['run_id'], posicion, resultado.get('error'))
+            else:
+                self.diario_envios.registrar_resultado(corrida['run_id'], posicion,
+                                                       resultado['exitoso'], resultado.get('error'))
+        except Exception as e:
+            self.logger.warning(f"⚠️ No se pudo escribir en el diario ({corrida['run_id']}): {e}")
+    
+    def _finalizar_corrida(self, corrida: Dict, completa: bool):
+        estado = CORRIDA_COMPLETADA if completa else CORRIDA_DETENIDA
+        try:
+            self.diario_envios.finalizar_corrida(corrida['run_id'], estado)
+            self.logger.info(f"📒 Corrida {corrida['run_id']}: {estado}")
+        except Exception as e:
+            self.logger.warning(f"⚠️ No se pudo cerrar la corrida {corrida['run_id']}: {e}")
+    
+    def reanudar_corrida(self, run_id: str, callback_progreso: Callable = None,
+                         detener_callback: Callable = None, config_excel: Dict = None,
+                         control: ControlEnvio = None) -> Dict:
+        """Reanuda una corrida del diario con los adjuntos guardados al iniciarla
+        
+        Sin config_excel se usa la guardada en el diario (sin la contraseña SMTP).
+        """
+        if self.diario_envios is None:
+            return {'error': 'No hay diario de envíos para reanudar'}
+        corrida = self.diario_envios.obtener_corrida(run_id)
+        if corrida is None:
+            return {'error': f"No existe la corrida {run_id}"}
+        
+        datos = corrida['datos']
+        if config_excel is None and datos.get('config'):
+            config_excel = {'config': datos['config'], 'valida': True}
+        return self.envio_inteligente(None, datos.get('adjuntos', []), callback_progreso, detener_callback,
+                                      config_excel, control=control, run_id=run_id)
+    
+    def _registrar_en_historial(self, resultado: Dict, correo: Dict = None):
+        """Registra el envío exitoso en el historial (si hay historial y campaña)"""
+        campana_id = correo.get('campana_id') if correo is not None else None
+        if self.historial_envios is None or campana_id is None:
+            return
+        try:
+            self.historial_envios.registrar(campana_id, resultado['email'])
+        except Exception as e:
+            self.logger.warning(f"⚠️ No se pudo registrar en el historial: {resultado['email']} - {e}")
+    
+    def _registrar_en_contactos(self, resultado: Dict, correo: Dict = None):
+        """Marca el último envío del contacto en la base SQLite (solo_no_enviados / no_enviados_desde)"""
+        if self.contact_store is None:
+            return
+        campana_id = correo.get('campana_id') if correo is not None else None
+        try:
+            self.contact_store.marcar_enviados([resultado['email']], campana_id)
+        except Exception as e:
+            self.logger.warning(f"⚠️ No se pudo marcar el envío en la base de contactos: {resultado['email']} - {e}")
     
     def _log_resumen_final(self, resultados: Dict):
         """Log del resumen final con configuración Excel"""
@@ -1396,4 +1668,64 @@ if __name__ == "__main__":
         reporte += "4. Ejecuta el envío nuevamente\n"
         reporte += "5. El sistema usará automáticamente la nueva configuración\n"
 
-        return reporte    
\ No newline at end of file
+        return reporte
+
+# FUNCIÓN DE PRUEBA COMPLETA CON CONFIGURACIÓN EXCEL
+if __name__ == "__main__":
+    print("🧪 PROBANDO SMART EMAIL SENDER CON CONFIGURACIÓN EXCEL")
+    print("=" * 65)
+    
+    sender = SmartEmailSender()
+    
+    # ⭐ PRUEBA CON CONFIGURACIÓN EXCEL SIMULADA
+    print("\n🔧 PROBANDO CONFIGURACIÓN EXCEL...")
+    
+    config_excel_test = {
+        'config': {
+            'Total_Correos_Por_Dia': 300,
+            'Horas_Para_Enviar_Todo': 6,
+            'Correos_Por_Lote': 30,
+            'Minutos_Entre_Lotes': 8,
+            'Empezar_Inmediatamente': 'SÍ'
+        },
+        'valida': True
+    }
+    
+    print("📊 Configuración Excel de prueba:")
+    for key, value in config_excel_test['config'].items():
+        print(f"   {key}: {value}")
+    
+    # Cargar configuración
+    sender.cargar_configuracion_excel(config_excel_test)
+    
+    # Pruebas de estrategia con configuración Excel
+    casos_prueba = [2, 10, 25, 50, 100, 300]
+    
+    for caso in casos_prueba:
+        print(f"\n📊 CASO: {caso} correos (CON configuración Excel)")
+        print("-" * 50)
+        
+        estrategia = sender.calcular_estrategia_envio(caso, config_excel_test)
+        print(sender.mostrar_estrategia(estrategia))
+    
+    # Listar reportes disponibles
+    print(f"\n" + "="*65)
+    sender.listar_reportes_disponibles()
+    
+    print("\n✅ Pruebas completadas")
+    print("\n💡 NUEVAS FUNCIONES CON CONFIGURACIÓN EXCEL:")
+    print("   📊 sender.envio_inteligente(..., config_excel) - Envío con Excel")
+    print("   🔄 sender.reintentar_fallidos_simple(..., config_excel) - Reintento con Excel")
+    print("   📋 sender.obtener_configuracion_de_reporte() - Ver config de reporte")
+    print("   ⚙️ sender.aplicar_configuracion_desde_reporte() - Aplicar config previa")
+    print("   📊 sender.comparar_configuraciones_reportes() - Comparar configs")
+    print("   📄 sender.mostrar_configuracion_actual() - Ver config actual")
+    
+    print(f"\n🎯 INTEGRACIÓN CON GUI:")
+    print("   En gui.py cambiar:")
+    print("   resultados = sender.envio_inteligente(correos, adjuntos, callback, detener)")
+    print("   POR:")
+    print("   config = excel_mgr.cargar_configuracion()")
+    print("   resultados = sender.envio_inteligente(correos, adjuntos, callback, detener, config)")
+    
+    input("\nPresiona Enter para cerrar...")
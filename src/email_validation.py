@@ -0,0 +1,149 @@
+import re
+from typing import Dict, Iterable, List, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+# Mismo formato que EmailProcessor.validar_email; además acepta TLD en punycode
+# (xn--...) para dominios internacionales ya convertidos a IDNA
+PATRON_EMAIL = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.(?:[a-zA-Z]{2,}|xn--[a-zA-Z0-9-]+)')
+
+# Códigos de motivo por dirección
+MOTIVO_OK = 'ok'
+MOTIVO_VACIO = 'vacio'
+MOTIVO_SIN_ARROBA = 'sin_arroba'
+MOTIVO_VARIAS_ARROBAS = 'varias_arrobas'
+MOTIVO_DOMINIO_INVALIDO = 'dominio_idna'
+MOTIVO_FORMATO = 'formato'
+
+DESCRIPCION_MOTIVOS = {
+    MOTIVO_OK: 'Válido',
+    MOTIVO_VACIO: 'Email vacío',
+    MOTIVO_SIN_ARROBA: 'Falta la @',
+    MOTIVO_VARIAS_ARROBAS: 'Más de una @',
+    MOTIVO_DOMINIO_INVALIDO: 'Dominio internacional no convertible a IDNA',
+    MOTIVO_FORMATO: 'Formato inválido'
+}
+
+
+class ResultadoValidacion(NamedTuple):
+    """Resultado de validar una columna de emails (alineado con la entrada)"""
+    originales: pd.Series
+    emails: pd.Series         # normalizados (sin espacios, minúsculas, dominio IDNA)
+    validos: np.ndarray       # máscara booleana
+    motivos: pd.Series        # código de motivo por fila (MOTIVO_*)
+
+    @property
+    def total_validos(self) -> int:
+        return int(self.validos.sum())
+
+    @property
+    def total_invalidos(self) -> int:
+        return len(self.validos) - self.total_validos
+
+    def conteo_motivos(self) -> Dict[str, int]:
+        """Cantidad de rechazos por motivo"""
+        return {motivo: int(cantidad)
+                for motivo, cantidad in self.motivos[~self.validos].value_counts().items()}
+
+    def rechazados(self) -> pd.DataFrame:
+        """Filas rechazadas (posición, email original, normalizado y motivo) para reportar"""
+        invalidos = ~self.validos
+        motivos = self.motivos[invalidos]
+        return pd.DataFrame({
+            'fila': np.flatnonzero(invalidos),
+            'email_original': self.originales[invalidos].to_numpy(),
+            'email': self.emails[invalidos].to_numpy(),
+            'motivo': motivos.to_numpy(),
+            'descripcion': motivos.map(DESCRIPCION_MOTIVOS).to_numpy()
+        })
+
+
+def _a_texto(emails: Iterable) -> List[str]:
+    """Columna de emails como lista de textos (valores no-texto -> '')"""
+    valores = emails.tolist() if isinstance(emails, pd.Series) else list(emails)
+    return [valor if type(valor) is str else '' for valor in valores]
+
+
+def _dominio_idna(email: str) -> str:
+    """Convierte el dominio a IDNA (punycode); se deja igual si no es convertible"""
+    local, arroba, dominio = email.rpartition('@')
+    if not arroba or dominio.isascii():
+        return email
+    try:
+        return f"{local}@{dominio.encode('idna').decode('ascii')}"
+    except UnicodeError:
+        return email
+
+
+def _normalizar(textos: List[str]) -> List[str]:
+    normalizados = [texto.strip().lower() for texto in textos]
+    # Solo los (pocos) emails con caracteres no ASCII pasan por el códec idna
+    return [email if email.isascii() else _dominio_idna(email) for email in normalizados]
+
+
+def _motivo_rechazo(email: str) -> str:
+    """Código de motivo de un email que no pasó el patrón"""
+    if not email:
+        return MOTIVO_VACIO
+    arrobas = email.count('@')
+    if arrobas == 0:
+        return MOTIVO_SIN_ARROBA
+    if arrobas > 1:
+        return MOTIVO_VARIAS_ARROBAS
+    if not email.isascii():
+        return MOTIVO_DOMINIO_INVALIDO
+    return MOTIVO_FORMATO
+
+
+def normalizar_emails(emails: Iterable) -> pd.Series:
+    """strip + minúsculas + dominio en IDNA para toda una columna
+
+    Los dominios no convertibles a IDNA se devuelven sin convertir (los
+    detecta validar_emails).
+    """
+    return pd.Series(_normalizar(_a_texto(emails)), dtype=object)
+
+
+def validar_emails(emails: Iterable) -> ResultadoValidacion:
+    """Normaliza y valida una columna completa de emails de una vez
+
+    Un único recorrido con la expresión regular precompilada arma la
+    máscara de válidos; el motivo solo se calcula para los rechazados.
+    """
+    originales = _a_texto(emails)
+    normalizados = _normalizar(originales)
+
+    coincide = PATRON_EMAIL.fullmatch
+    validos = np.fromiter((coincide(email) is not None for email in normalizados),
+                          dtype=bool, count=len(normalizados))
+
+    motivos = [MOTIVO_OK] * len(normalizados)
+    for posicion in np.flatnonzero(~validos).tolist():
+        motivos[posicion] = _motivo_rechazo(normalizados[posicion])
+
+    return ResultadoValidacion(pd.Series(originales, dtype=object),
+                               pd.Series(normalizados, dtype=object),
+                               validos,
+                               pd.Series(motivos, dtype=object))
+
+
+# Función de prueba
+if __name__ == "__main__":
+    muestra = [
+        '  Juan.Perez@Empresa.com ',
+        'maria@münchen.de',
+        'sin-arroba.com',
+        'a@@b.com',
+        '',
+        None,
+        'usuario@dominio',
+        'ok@sub.dominio.co'
+    ]
+
+    resultado = validar_emails(muestra)
+    print(f"✅ Válidos: {resultado.total_validos} | ❌ Inválidos: {resultado.total_invalidos}")
+    for original, email, motivo in zip(resultado.originales, resultado.emails, resultado.motivos):
+        print(f"   {original!r:30} -> {email!r:30} [{motivo}]")
+    print(f"\n📊 Rechazos por motivo: {resultado.conteo_motivos()}")
+    print(resultado.rechazados())
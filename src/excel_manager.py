@@ -1,29 +1,194 @@
 import pandas as pd
 import os
-from typing import Dict, List, Optional
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Callable, Dict, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+from cache_columnar import CacheColumnar
+from contact_sources import FuenteContactos, FuenteExcel, crear_fuente, resumen_clientes
+
+class DatosExcel(NamedTuple):
+    """Foto inmutable de los tres archivos cargados juntos por cargar_todo()
+    
+    Los diccionarios internos se comparten con la caché de ExcelManager:
+    se deben tratar como solo lectura.
+    """
+    campanas: Dict
+    clientes: Dict
+    config: Dict
+    tiempos: Mapping[str, float]   # segundos por archivo
+    tiempo_total: float            # segundos de pared de toda la carga
+    
+    @property
+    def hay_errores(self) -> bool:
+        return any('error' in datos for datos in (self.campanas, self.clientes, self.config))
+
+
+def _cargar_en_proceso(data_folder: str, ruta_fuente: str, metodo: str) -> Tuple[Dict, float]:
+    """Carga un archivo en un proceso separado (usado por cargar_todo con procesos)"""
+    inicio = time.perf_counter()
+    resultado = getattr(ExcelManager(data_folder, fuente_clientes=ruta_fuente), metodo)()
+    return resultado, time.perf_counter() - inicio
+
 
 class ExcelManager:
     """Gestor para leer y validar archivos Excel - CORREGIDO"""
     
-    def __init__(self, data_folder: str = "data"):
+    def __init__(self, data_folder: str = "data", usar_cache_disco: bool = True,
+                 fuente_clientes: Optional[str] = None):
         self.data_folder = data_folder
         self.campanas_file = os.path.join(data_folder, "CAMPAÑAS.xlsx")
         self.clientes_file = os.path.join(data_folder, "CLIENTES.xlsx")
         self.config_file = os.path.join(data_folder, "CONFIGURACION.xlsx")
+        
+        # Fuente de contactos: CLIENTES.xlsx por defecto, o CSV/JSONL del CRM
+        self.fuente_clientes = self._resolver_fuente_clientes(fuente_clientes)
+        
+        # Caché de lecturas: clave -> (firma del archivo, resultado parseado)
+        self._cache: Dict[str, Tuple[Tuple, Dict]] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cache_lock = threading.Lock()
+        
+        # Caché columnar persistente entre sesiones (data/.cache/*.npz)
+        self.cache_disco = CacheColumnar(os.path.join(data_folder, ".cache")) if usar_cache_disco else None
+    
+    def _firma_archivo(self, ruta: str) -> Optional[Tuple[str, int, int]]:
+        """Firma (ruta, mtime_ns, tamaño) usada para detectar cambios en el archivo"""
+        try:
+            stat = os.stat(ruta)
+        except OSError:
+            return None
+        return (os.path.abspath(ruta), stat.st_mtime_ns, stat.st_size)
+    
+    def _cargar_con_cache(self, clave: str, ruta: str, cargador: Callable[[], Dict]) -> Dict:
+        """Devuelve el resultado cacheado si el archivo no cambió; si no, lo vuelve a leer"""
+        firma = self._firma_archivo(ruta)
+        
+        with self._cache_lock:
+            if firma is not None and clave in self._cache:
+                firma_cacheada, resultado = self._cache[clave]
+                if firma_cacheada == firma:
+                    self.cache_hits += 1
+                    return resultado
+            self.cache_misses += 1
+        
+        resultado = cargador()
+        self._guardar_en_cache(clave, firma, resultado)
+        return resultado
+    
+    def _guardar_en_cache(self, clave: str, firma: Optional[Tuple], resultado: Dict):
+        """Solo se cachean lecturas correctas de archivos existentes"""
+        with self._cache_lock:
+            if firma is not None and 'error' not in resultado:
+                self._cache[clave] = (firma, resultado)
+            else:
+                self._cache.pop(clave, None)
+    
+    def invalidar_cache(self, clave: Optional[str] = None):
+        """Invalida la caché completa o solo una entrada ('campanas', 'clientes', 'config')"""
+        with self._cache_lock:
+            if clave is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(clave, None)
+    
+    def estadisticas_cache(self) -> Dict:
+        """Contadores de aciertos/fallos de la caché"""
+        total = self.cache_hits + self.cache_misses
+        return {
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'entradas': len(self._cache),
+            'ratio_aciertos': (self.cache_hits / total) if total > 0 else 0.0,
+            'disco_hits': self.cache_disco.hits if self.cache_disco else 0,
+            'disco_misses': self.cache_disco.misses if self.cache_disco else 0
+        }
+    
+    def _leer_hoja(self, ruta: str, hoja: str, parser: Callable[[], pd.DataFrame] = None) -> pd.DataFrame:
+        """Lee una hoja usando la caché columnar en disco si el contenido no cambió"""
+        if parser is None:
+            parser = lambda: pd.read_excel(ruta, sheet_name=hoja)
+        
+        if self.cache_disco is None:
+            return parser()
+        
+        hash_origen = CacheColumnar.hash_archivo(ruta)
+        df = self.cache_disco.cargar(ruta, hoja, hash_origen)
+        if df is None:
+            df = parser()
+            self.cache_disco.guardar(ruta, hoja, df, hash_origen)
+        return df
+    
+    def cargar_todo(self, usar_procesos: bool = False) -> DatosExcel:
+        """Carga campañas, clientes y configuración en paralelo
+        
+        La latencia pasa a ser la del archivo más lento en lugar de la suma.
+        Con usar_procesos=True cada archivo se parsea en otro proceso (evita el
+        GIL en archivos muy grandes); el resultado igual queda en la caché local.
+        """
+        tareas = {
+            'campanas': (self.campanas_file, 'cargar_campanas'),
+            'clientes': (self.fuente_clientes.ruta, 'cargar_clientes'),
+            'config': (self.config_file, 'cargar_configuracion')
+        }
+        resultados = {}
+        tiempos = {}
+        inicio = time.perf_counter()
+        
+        # Una fuente con filtros en memoria (p. ej. ContactStore) no se puede recrear en otro proceso
+        if usar_procesos and not self.fuente_clientes.cacheable:
+            usar_procesos = False
+        
+        if usar_procesos:
+            firmas = {clave: self._firma_archivo(ruta) for clave, (ruta, _) in tareas.items()}
+            with ProcessPoolExecutor(max_workers=len(tareas)) as pool:
+                futuros = {
+                    clave: pool.submit(_cargar_en_proceso, self.data_folder, self.fuente_clientes.ruta, metodo)
+                    for clave, (_, metodo) in tareas.items()
+                }
+                for clave, futuro in futuros.items():
+                    resultados[clave], tiempos[clave] = futuro.result()
+                    if clave != 'clientes' or self.fuente_clientes.cacheable:
+                        self._guardar_en_cache(clave, firmas[clave], resultados[clave])
+        else:
+            def cronometrar(metodo: str) -> Tuple[Dict, float]:
+                t0 = time.perf_counter()
+                resultado = getattr(self, metodo)()
+                return resultado, time.perf_counter() - t0
+            
+            with ThreadPoolExecutor(max_workers=len(tareas)) as pool:
+                futuros = {clave: pool.submit(cronometrar, metodo) for clave, (_, metodo) in tareas.items()}
+                for clave, futuro in futuros.items():
+                    resultados[clave], tiempos[clave] = futuro.result()
+        
+        return DatosExcel(
+            campanas=resultados['campanas'],
+            clientes=resultados['clientes'],
+            config=resultados['config'],
+            tiempos=MappingProxyType(tiempos),
+            tiempo_total=time.perf_counter() - inicio
+        )
     
     def verificar_archivos(self) -> Dict[str, bool]:
         """Verifica que todos los archivos Excel existan"""
         archivos = {
             'CAMPAÑAS.xlsx': os.path.exists(self.campanas_file),
-            'CLIENTES.xlsx': os.path.exists(self.clientes_file),
+            os.path.basename(self.fuente_clientes.ruta): os.path.exists(self.fuente_clientes.ruta),
             'CONFIGURACION.xlsx': os.path.exists(self.config_file)
         }
         return archivos
     
     def cargar_campanas(self) -> Dict:
-        """Carga las campañas desde Excel - CORREGIDO PARA LEER ACTIVA CORRECTAMENTE"""
+        """Carga las campañas desde Excel (cacheado mientras el archivo no cambie)"""
+        return self._cargar_con_cache('campanas', self.campanas_file, self._leer_campanas)
+    
+    def _leer_campanas(self) -> Dict:
+        """Lee las campañas desde Excel - CORREGIDO PARA LEER ACTIVA CORRECTAMENTE"""
         try:
-            df = pd.read_excel(self.campanas_file, sheet_name='Campañas')
+            df = self._leer_hoja(self.campanas_file, 'Campañas')
             
             print(f"🔍 DEBUG: Total campañas encontradas: {len(df)}")
             
@@ -74,37 +239,66 @@ class ExcelManager:
             return {'error': f"Error cargando campañas: {str(e)}"}
     
     def cargar_clientes(self) -> Dict:
-        """Carga la lista de clientes desde Excel"""
+        """Carga la lista de clientes (cacheado mientras el archivo no cambie)"""
+        if not self.fuente_clientes.cacheable:
+            return self._leer_clientes()
+        return self._cargar_con_cache('clientes', self.fuente_clientes.ruta, self._leer_clientes)
+    
+    def _leer_clientes(self) -> Dict:
+        """Lee la lista de clientes de la fuente configurada (xlsx, csv o jsonl)"""
         try:
-            df = pd.read_excel(self.clientes_file, sheet_name='Contactos')
-            
-            # Limpiar datos
-            clientes = []
-            for _, row in df.iterrows():
-                cliente = {
-                    'email': str(row['Email']).strip(),
-                    'nombre': str(row['Nombre']).strip() if pd.notna(row['Nombre']) else '',
-                    'empresa': str(row['Empresa']).strip() if pd.notna(row['Empresa']) else '',
-                    'mensaje_personal': str(row['Mensaje_Personal']).strip() if pd.notna(row['Mensaje_Personal']) else ''
-                }
-                
-                # Solo agregar si tiene email válido
-                if '@' in cliente['email']:
-                    clientes.append(cliente)
-            
-            return {
-                'clientes': clientes,
-                'total': len(clientes),
-                'total_con_nombre': len([c for c in clientes if c['nombre']]),
-                'total_sin_nombre': len([c for c in clientes if not c['nombre']])
-            }
+            fuente = self.fuente_clientes
+            if fuente.cacheable:
+                df = self._leer_hoja(fuente.ruta, 'clientes.limpio', fuente.cargar_df)
+            else:
+                df = fuente.cargar_df()
+            return resumen_clientes(df)
         except Exception as e:
             return {'error': f"Error cargando clientes: {str(e)}"}
     
+    def iter_clientes(self, batch_size: int = 5000) -> Iterator[List[Dict]]:
+        """Recorre la fuente de clientes en modo streaming y entrega lotes de clientes limpios
+        
+        Para .xlsx usa openpyxl en modo read_only; para CSV/JSONL lee por bloques.
+        La memoria se mantiene acotada al tamaño del lote.
+        """
+        return self.fuente_clientes.iter_clientes(batch_size)
+    
+    def usar_fuente_clientes(self, fuente):
+        """Cambia la fuente de contactos (ruta a .xlsx/.csv/.jsonl/.db o un FuenteContactos)"""
+        if isinstance(fuente, str):
+            ruta = fuente
+            fuente = crear_fuente(ruta)
+            if fuente is None:
+                raise ValueError(f"Formato de contactos no soportado: {ruta}")
+        
+        self.fuente_clientes = fuente
+        self.invalidar_cache('clientes')
+    
+    def _resolver_fuente_clientes(self, ruta: Optional[str]) -> FuenteContactos:
+        """Fuente explícita, o CLIENTES.xlsx, o CLIENTES.csv/.jsonl si no hay xlsx"""
+        if ruta:
+            fuente = crear_fuente(ruta)
+            if fuente is None:
+                raise ValueError(f"Formato de contactos no soportado: {ruta}")
+            return fuente
+        
+        if not os.path.exists(self.clientes_file):
+            for extension in ('.csv', '.jsonl'):
+                alternativa = os.path.join(self.data_folder, f"CLIENTES{extension}")
+                if os.path.exists(alternativa):
+                    return crear_fuente(alternativa)
+        
+        return FuenteExcel(self.clientes_file)
+    
     def cargar_configuracion(self) -> Dict:
-        """Carga la configuración desde Excel"""
+        """Carga la configuración desde Excel (cacheado mientras el archivo no cambie)"""
+        return self._cargar_con_cache('config', self.config_file, self._leer_configuracion)
+    
+    def _leer_configuracion(self) -> Dict:
+        """Lee la configuración desde Excel"""
         try:
-            df = pd.read_excel(self.config_file, sheet_name='Config')
+            df = self._leer_hoja(self.config_file, 'Config')
             
             # Convertir a diccionario
             config = {}
@@ -142,10 +336,9 @@ class ExcelManager:
             resumen += f"{estado} {archivo}\n"
         
         if all(archivos.values()):
-            # Cargar datos
-            campanas = self.cargar_campanas()
-            clientes = self.cargar_clientes()
-            config = self.cargar_configuracion()
+            # Cargar datos (los tres archivos en paralelo)
+            datos = self.cargar_todo()
+            campanas, clientes, config = datos.campanas, datos.clientes, datos.config
             
             resumen += "\n📋 RESUMEN DE DATOS:\n"
             resumen += "-" * 20 + "\n"
@@ -169,6 +362,9 @@ class ExcelManager:
                 resumen += f"   ├─ Email: {cfg.get('Tu_Email', 'No configurado')}\n"
                 resumen += f"   ├─ Total correos: {cfg.get('Total_Correos_Por_Dia', 'No configurado')}\n"
                 resumen += f"   └─ Duración: {cfg.get('Horas_Para_Enviar_Todo', 'No configurado')} horas\n"
+            
+            resumen += f"⏱️  Carga: {datos.tiempo_total:.2f}s ("
+            resumen += ", ".join(f"{clave} {seg:.2f}s" for clave, seg in datos.tiempos.items()) + ")\n"
         
         return resumen
 
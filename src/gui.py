@@ -22,6 +22,7 @@ class EmailSenderInteligenteGUI:
         
         # Variables
         self.enviando = False
+        self.control_envio = None  # ControlEnvio del envío en curso (detener / pausar / reanudar)
         self.correos_procesados = []
         self.estrategia_actual = None
         
@@ -201,7 +202,50 @@ class EmailSenderInteligenteGUI:
         # EmailProcessor
         try:
             from email_processor import EmailProcessor
-            self.email_processor = EmailProcessor()
+            data_folder = self.excel_mgr.data_folder if self.excel_mgr else "data"
+            
+            # Bajas, rebotes y lista negra: se excluyen antes de cada envío
+            try:
+                from suppression_list import ListaSupresion
+                lista_supresion = ListaSupresion(os.path.join(data_folder, "supresion.db"))
+                print(f"✅ Lista de supresión OK ({lista_supresion.contar()} emails)")
+            except Exception as e:
+                print(f"⚠️ Lista de supresión no disponible: {e}")
+                lista_supresion = None
+            
+            # Historial de envíos: re-ejecutar una campaña solo envía a contactos nuevos
+            try:
+                from sent_history import HistorialEnvios
+                self.historial_envios = HistorialEnvios(os.path.join(data_folder, "historial_envios.db"))
+                print(f"✅ Historial de envíos OK ({self.historial_envios.contar()} registros)")
+            except Exception as e:
+                print(f"⚠️ Historial de envíos no disponible: {e}")
+                self.historial_envios = None
+            
+            # Diario de envíos: una corrida cortada se reanuda sin reenviar nada
+            try:
+                from send_journal import DiarioEnvios
+                self.diario_envios = DiarioEnvios(os.path.join(data_folder, "diario_envios.db"))
+                print("✅ Diario de envíos OK")
+            except Exception as e:
+                print(f"⚠️ Diario de envíos no disponible: {e}")
+                self.diario_envios = None
+            
+            # Cuota diaria por cuenta: cuenta lo enviado hoy en todas las ejecuciones
+            try:
+                from quota_ledger import LibroCuotas
+                self.libro_cuotas = LibroCuotas(os.path.join(data_folder, "cuotas_diarias.db"))
+                print("✅ Cuotas diarias OK")
+            except Exception as e:
+                print(f"⚠️ Cuotas diarias no disponibles: {e}")
+                self.libro_cuotas = None
+            
+            # Nombres derivados de emails reutilizados entre ejecuciones
+            self.email_processor = EmailProcessor(
+                archivo_cache_nombres=os.path.join(data_folder, ".cache", "nombres.json"),
+                lista_supresion=lista_supresion,
+                historial_envios=self.historial_envios,
+                solo_no_enviados=self.historial_envios is not None)
             print("✅ EmailProcessor OK")
         except Exception as e:
             print(f"❌ EmailProcessor: {e}")
@@ -209,8 +253,16 @@ class EmailSenderInteligenteGUI:
         
         # EmailSender - CORREGIDO PARA USAR email_sender
         try:
-            from email_sender import EmailSender
-            self.email_sender = EmailSender()
+            from email_sender import SmartEmailSender
+            self.email_sender = SmartEmailSender(historial_envios=getattr(self, 'historial_envios', None),
+                                                 diario_envios=getattr(self, 'diario_envios', None),
+                                                 libro_cuotas=getattr(self, 'libro_cuotas', None))
+            
+            # Transporte (Outlook o SMTP) según CONFIGURACION.xlsx
+            if self.excel_mgr:
+                config = self.excel_mgr.cargar_configuracion()
+                if 'error' not in config:
+                    self.email_sender.configurar_transporte(config['config'])
             print("✅ EmailSender OK")
         except Exception as e:
             print(f"❌ EmailSender error: {e}")
@@ -296,6 +348,10 @@ class EmailSenderInteligenteGUI:
                     }
             
             def enviar_correo(self, correo_data, adjuntos=None):
+                # Registro compacto (CorreoProcesado): renderizar una sola vez
+                if hasattr(correo_data, 'a_dict'):
+                    correo_data = correo_data.a_dict()
+                
                 try:
                     import win32com.client
                     import pythoncom
@@ -728,8 +784,8 @@ class EmailSenderInteligenteGUI:
         buttons_container.grid(row=3, column=0, columnspan=2, sticky='ew', pady=(25, 0))
         
         # Grid para botones con espaciado proporcional
-        for i in range(5):
-            buttons_container.columnconfigure(i, weight=1, minsize=180)
+        for i in range(6):
+            buttons_container.columnconfigure(i, weight=1, minsize=150)
         
         # Botones con estilos específicos
         self.btn_actualizar = ttk.Button(buttons_container, 
@@ -756,12 +812,19 @@ class EmailSenderInteligenteGUI:
                                     style='Primary.TButton')
         self.btn_enviar.grid(row=0, column=3, padx=8, pady=15, sticky='ew')
         
+        self.btn_pausar = ttk.Button(buttons_container, 
+                                    text="⏸️ PAUSAR", 
+                                    state="disabled", 
+                                    command=self.pausar_reanudar_envio,
+                                    style='Secondary.TButton')
+        self.btn_pausar.grid(row=0, column=4, padx=8, pady=15, sticky='ew')
+        
         self.btn_detener = ttk.Button(buttons_container, 
                                      text="⏹️ DETENER", 
                                      state="disabled", 
                                      command=self.detener_envio,
                                      style='Danger.TButton')
-        self.btn_detener.grid(row=0, column=4, padx=8, pady=15, sticky='ew')
+        self.btn_detener.grid(row=0, column=5, padx=8, pady=15, sticky='ew')
     
     def crear_progreso_profesional(self):
         """Barra de progreso estilo Apple"""
@@ -828,6 +891,9 @@ class EmailSenderInteligenteGUI:
         try:
             # Estado archivos
             self.log_mensaje("📊 Leyendo Excel...")
+            fuente = getattr(self.excel_mgr, 'fuente_clientes', None)
+            if fuente:
+                self.log_mensaje(f"👥 Fuente de contactos: {os.path.basename(fuente.ruta)} ({fuente.tipo})")
             resumen = self.excel_mgr.obtener_resumen()
             
             self.text_archivos.config(state='normal')
@@ -885,9 +951,8 @@ class EmailSenderInteligenteGUI:
             if not all([self.excel_mgr, self.email_processor]):
                 return
             
-            campanas = self.excel_mgr.cargar_campanas()
-            clientes = self.excel_mgr.cargar_clientes()
-            config = self.excel_mgr.cargar_configuracion()
+            datos = self.excel_mgr.cargar_todo()
+            campanas, clientes, config = datos.campanas, datos.clientes, datos.config
             
             if 'error' in campanas or 'error' in clientes or 'error' in config:
                 return
@@ -976,9 +1041,8 @@ class EmailSenderInteligenteGUI:
                 self.text_preview.insert(1.0, "❌ Managers no disponibles")
                 return
             
-            campanas = self.excel_mgr.cargar_campanas()
-            clientes = self.excel_mgr.cargar_clientes()
-            config = self.excel_mgr.cargar_configuracion()
+            datos = self.excel_mgr.cargar_todo()
+            campanas, clientes, config = datos.campanas, datos.clientes, datos.config
             
             self.text_preview.delete(1.0, tk.END)
             
@@ -1025,47 +1089,54 @@ class EmailSenderInteligenteGUI:
                 messagebox.showerror("Error", "Managers no disponibles")
                 return
             
-            campanas = self.excel_mgr.cargar_campanas()
-            clientes = self.excel_mgr.cargar_clientes()
-            config = self.excel_mgr.cargar_configuracion()
+            datos = self.excel_mgr.cargar_todo()
+            campanas, clientes, config = datos.campanas, datos.clientes, datos.config
             
             if 'error' in campanas or 'error' in clientes or 'error' in config or not campanas['activa']:
                 messagebox.showerror("Error", "Datos incompletos")
                 return
             
-            correos = self.email_processor.procesar_lista_clientes(clientes['clientes'], campanas['activa'], config['config'])
+            # Solo se personalizan los 5 mostrados; los conteos van en una pasada aparte
+            correos = self.email_processor.primeros_correos(clientes['clientes'], campanas['activa'], config['config'], 5)
             
             if not correos:
                 messagebox.showwarning("Sin correos", "No hay correos válidos")
                 return
             
+            conteos = self.email_processor.contar_clientes(clientes['clientes'], campanas['activa'])
+            total = conteos['unicos']
+            
             # Ventana
             ventana = tk.Toplevel(self.root)
-            ventana.title(f"Vista Previa - {len(correos)} correos")
+            ventana.title(f"Vista Previa - {total} correos")
             ventana.geometry("900x600")
             ventana.configure(bg=self.colors['bg'])
             
             frame = tk.Frame(ventana, bg=self.colors['bg'], padx=15, pady=15)
             frame.pack(fill=tk.BOTH, expand=True)
             
-            tk.Label(frame, text=f"📧 {len(correos)} correos listos", 
+            tk.Label(frame, text=f"📧 {total} correos listos", 
                     font=('Arial', 14, 'bold'), bg=self.colors['bg'], fg=self.colors['purple_primary']).pack(pady=(0,15))
             
             text_widget = scrolledtext.ScrolledText(frame, font=('Consolas', 9), 
                                                    bg=self.colors['bg_input'], fg=self.colors['text_primary'])
             text_widget.pack(fill=tk.BOTH, expand=True)
             
-            contenido = f"VISTA PREVIA COMPLETA\nTotal: {len(correos)} correos\n" + "="*50 + "\n\n"
+            contenido = f"VISTA PREVIA COMPLETA\nTotal: {total} correos\n"
+            contenido += (f"Inválidos: {conteos['invalidos']} | Duplicados: {conteos['duplicados']} | "
+                          f"Suprimidos: {conteos['suprimidos']}"
+                          f"{self.email_processor._detalle_supresion(conteos)} | "
+                          f"Ya recibieron la campaña: {conteos['ya_enviados']}\n") + "="*50 + "\n\n"
             
-            for i, correo in enumerate(correos[:5]):
+            for i, correo in enumerate(correos):
                 contenido += f"📩 CORREO #{correo['indice']}:\n"
                 contenido += f"   Para: {correo['email']}\n"
                 contenido += f"   Nombre: {correo['nombre']}\n"
                 contenido += f"   Asunto: {correo['asunto']}\n"
                 contenido += f"   Contenido: {correo['contenido'][:100]}...\n\n"
             
-            if len(correos) > 5:
-                contenido += f"... y {len(correos) - 5} correos más\n"
+            if total > len(correos):
+                contenido += f"... y {total - len(correos)} correos más\n"
             
             text_widget.insert(1.0, contenido)
             
@@ -1107,9 +1178,8 @@ class EmailSenderInteligenteGUI:
         try:
             # Cargar datos
             self.log_mensaje("📊 Cargando datos...")
-            campanas = self.excel_mgr.cargar_campanas()
-            clientes = self.excel_mgr.cargar_clientes()
-            config = self.excel_mgr.cargar_configuracion()
+            datos = self.excel_mgr.cargar_todo()
+            campanas, clientes, config = datos.campanas, datos.clientes, datos.config
             
             if 'error' in campanas or 'error' in clientes or 'error' in config:
                 self.log_mensaje("❌ Error en Excel")
@@ -1121,15 +1191,25 @@ class EmailSenderInteligenteGUI:
                 messagebox.showerror("Error", "Sin campaña activa")
                 return
             
-            # Procesar correos
+            # Corrida anterior de esta campaña sin terminar: reanudar desde donde quedó
+            if self._ofrecer_reanudacion(campanas['activa'], config):
+                return
+            
+            # Procesar correos (bajo demanda: cada uno se personaliza al enviarlo)
             self.log_mensaje("📧 Procesando correos...")
-            correos = self.email_processor.procesar_lista_clientes(clientes['clientes'], campanas['activa'], config['config'])
+            correos = self.email_processor.procesar_lista_clientes_lazy(clientes['clientes'], campanas['activa'], config['config'])
             
             if not correos:
                 self.log_mensaje("❌ Sin correos válidos")
                 messagebox.showerror("Error", "Sin correos válidos")
                 return
             
+            if correos.conteos['suprimidos']:
+                self.log_mensaje(f"🚫 {correos.conteos['suprimidos']} suprimidos"
+                                 f"{self.email_processor._detalle_supresion(correos.conteos)}")
+            if correos.conteos['ya_enviados']:
+                self.log_mensaje(f"📜 {correos.conteos['ya_enviados']} ya recibieron esta campaña (omitidos)")
+            
             # Adjuntos
             adjuntos = []
             if self.file_mgr:
@@ -1138,7 +1218,11 @@ class EmailSenderInteligenteGUI:
             
             # CALCULAR ESTRATEGIA
             total_correos = len(correos)
-            if hasattr(self.email_sender, 'calcular_estrategia_envio'):
+            if hasattr(self.email_sender, 'cargar_configuracion_excel'):
+                estrategia = self.email_sender.calcular_estrategia_envio(total_correos, config)
+                modo = estrategia.get('modo', 'AUTOMÁTICO')
+                descripcion = estrategia.get('descripcion', 'Envío automático')
+            elif hasattr(self.email_sender, 'calcular_estrategia_envio'):
                 estrategia = self.email_sender.calcular_estrategia_envio(total_correos)
                 modo = estrategia.get('modo', 'AUTOMÁTICO')
                 descripcion = estrategia.get('descripcion', 'Envío automático')
@@ -1154,12 +1238,23 @@ class EmailSenderInteligenteGUI:
                     modo = "DISTRIBUIDO"
                     descripcion = "Pausas largas"
             
+            # Cuota de la cuenta agotada por envíos anteriores de hoy
+            cuota = estrategia.get('cuota') if hasattr(self.email_sender, 'calcular_estrategia_envio') else None
+            if cuota and cuota['disponibles'] == 0:
+                self.log_mensaje(f"🛑 Cuota diaria agotada para {cuota['cuenta']} ({cuota['enviados_hoy']} enviados hoy)")
+                messagebox.showwarning("Cuota diaria agotada",
+                                       f"{cuota['cuenta']} ya envió {cuota['enviados_hoy']} correos hoy.\n\n"
+                                       f"Intenta de nuevo mañana o ajusta Total_Correos_Por_Dia.")
+                return
+            aviso_cuota = f"⚠️ {estrategia['advertencia']}\n" if cuota and estrategia.get('advertencia') else ""
+            
             # Confirmar con estrategia
             self.log_mensaje(f"✅ {total_correos} correos listos - Modo: {modo}")
             respuesta = messagebox.askyesno("🚀 Confirmar Envío INTELIGENTE", 
                                           f"¿ENVIAR {total_correos} correos REALES?\n\n"
                                           f"🎯 ESTRATEGIA: {modo}\n"
                                           f"📝 {descripcion}\n"
+                                          f"{aviso_cuota}"
                                           f"📧 Campaña: {campanas['activa']['nombre']}\n"
                                           f"📎 Adjuntos: {len(adjuntos)} archivos\n\n"
                                           f"🧠 ENVÍO INTELIGENTE ANTI-SPAM\n"
@@ -1168,7 +1263,7 @@ class EmailSenderInteligenteGUI:
             
             if respuesta:
                 self.log_mensaje(f"🚀 Confirmado - iniciando envío {modo}...")
-                self.iniciar_envio_inteligente(correos, adjuntos)
+                self.iniciar_envio_inteligente(correos, adjuntos, config)
             else:
                 self.log_mensaje("❌ Cancelado por usuario")
                 
@@ -1176,16 +1271,56 @@ class EmailSenderInteligenteGUI:
             self.log_mensaje(f"❌ Error preparando: {str(e)}")
             messagebox.showerror("Error", f"Error:\n{str(e)}")
     
-    def iniciar_envio_inteligente(self, correos, adjuntos):
-        """Envío inteligente en hilo"""
-        total = len(correos)
+    def _ofrecer_reanudacion(self, campana, config_excel) -> bool:
+        """Pregunta si reanudar la corrida pendiente de la campaña (True si se reanudó)"""
+        if not getattr(self, 'diario_envios', None) or not hasattr(self.email_sender, 'reanudar_corrida'):
+            return False
+        
+        from send_journal import CORRIDA_DESCARTADA
+        for corrida in self.diario_envios.corridas_reanudables(campana.get('id')):
+            pendientes = corrida['total'] - corrida['cursor']
+            respuesta = messagebox.askyesno("♻️ Envío sin terminar",
+                                            f"La campaña '{campana['nombre']}' tiene un envío sin terminar\n"
+                                            f"({corrida['inicio']}).\n\n"
+                                            f"📧 Enviados: {corrida['cursor']}/{corrida['total']}\n"
+                                            f"⏳ Pendientes: {pendientes}\n\n"
+                                            f"¿Reanudarlo desde donde quedó?\n"
+                                            f"(No = descartarlo y empezar de nuevo)")
+            if respuesta:
+                self.log_mensaje(f"♻️ Reanudando corrida {corrida['run_id']} ({pendientes} pendientes)")
+                self.iniciar_envio_inteligente(None, None, config_excel, run_id=corrida['run_id'],
+                                               total=pendientes)
+                return True
+            
+            self.diario_envios.finalizar_corrida(corrida['run_id'], CORRIDA_DESCARTADA)
+            self.log_mensaje(f"🗑️ Corrida {corrida['run_id']} descartada")
+        return False
+    
+    def iniciar_envio_inteligente(self, correos, adjuntos, config_excel=None, run_id=None, total=None):
+        """Envío inteligente en hilo (con run_id reanuda esa corrida del diario)"""
+        if total is None:
+            total = len(correos)
         self.log_mensaje(f"🧠 Envío inteligente: {total} correos")
         
+        # Contactos desde la base SQLite: cada envío exitoso queda marcado en el contacto
+        if hasattr(self.email_sender, 'contact_store'):
+            from contact_store import FuenteSQLite
+            fuente = getattr(self.excel_mgr, 'fuente_clientes', None)
+            self.email_sender.contact_store = fuente.store if isinstance(fuente, FuenteSQLite) else None
+        
         # Cambiar estado
         self.enviando = True
         self.btn_enviar.config(state='disabled')
         self.btn_detener.config(state='normal')
         self.btn_actualizar.config(state='disabled')
+        
+        # Control del envío: detener / pausar / reanudar sin esperar a las pausas
+        try:
+            from send_engine import ControlEnvio
+            self.control_envio = ControlEnvio()
+            self.btn_pausar.config(state='normal', text="⏸️ PAUSAR")
+        except ImportError:
+            self.control_envio = None
         self.btn_preview.config(state='disabled')
         self.btn_estrategia.config(state='disabled')
         
@@ -1206,7 +1341,25 @@ class EmailSenderInteligenteGUI:
                 self.log_mensaje("🧠 Ejecutando envío inteligente...")
                 
                 # Usar envío inteligente si está disponible
-                if hasattr(self.email_sender, 'envio_inteligente'):
+                if run_id:
+                    resultados = self.email_sender.reanudar_corrida(
+                        run_id,
+                        callback_progreso=callback_progreso,
+                        detener_callback=None if self.control_envio else detener_callback,
+                        config_excel=config_excel,
+                        control=self.control_envio
+                    )
+                elif hasattr(self.email_sender, 'cargar_configuracion_excel'):
+                    # SmartEmailSender: aplica la configuración del Excel
+                    resultados = self.email_sender.envio_inteligente(
+                        correos, 
+                        adjuntos, 
+                        callback_progreso=callback_progreso,
+                        detener_callback=None if self.control_envio else detener_callback,
+                        config_excel=config_excel,
+                        control=self.control_envio
+                    )
+                elif hasattr(self.email_sender, 'envio_inteligente'):
                     resultados = self.email_sender.envio_inteligente(
                         correos, 
                         adjuntos, 
@@ -1374,6 +1527,7 @@ class EmailSenderInteligenteGUI:
         self.enviando = False
         self.btn_enviar.config(state='normal')
         self.btn_detener.config(state='disabled')
+        self.btn_pausar.config(state='disabled', text="⏸️ PAUSAR")
         self.btn_actualizar.config(state='normal')
         self.btn_preview.config(state='normal')
         self.btn_estrategia.config(state='normal')
@@ -1400,10 +1554,28 @@ class EmailSenderInteligenteGUI:
                                           "Los enviados no se recuperan.")
             if respuesta:
                 self.enviando = False
+                if self.control_envio:
+                    self.control_envio.detener()  # Despierta al motor al instante
                 self.log_mensaje("⏹️ DETENIDO por usuario")
                 self.finalizar_envio()
                 self.label_estado.config(text="⏹️ Detenido", fg=self.colors['error'])
     
+    def pausar_reanudar_envio(self):
+        """Pausar / reanudar el envío (sigue desde el mismo correo)"""
+        if not self.enviando or not self.control_envio:
+            return
+        
+        if self.control_envio.pausado:
+            self.control_envio.reanudar()
+            self.btn_pausar.config(text="⏸️ PAUSAR")
+            self.log_mensaje("▶️ Envío REANUDADO")
+            self.label_estado.config(text="▶️ Reanudando envío...", fg=self.colors['success'])
+        else:
+            self.control_envio.pausar()
+            self.btn_pausar.config(text="▶️ REANUDAR")
+            self.log_mensaje("⏸️ Envío EN PAUSA (los correos en curso terminan)")
+            self.label_estado.config(text="⏸️ En pausa", fg=self.colors['warning'])
+    
     def on_closing(self):
         """Cerrar ventana de forma segura"""
         if self.enviando:
@@ -1413,6 +1585,8 @@ class EmailSenderInteligenteGUI:
                 return
             
             self.enviando = False
+            if self.control_envio:
+                self.control_envio.detener()
             self.log_mensaje("🔄 Cerrando - detenido")
             
             # Esperar un momento para que el hilo termine
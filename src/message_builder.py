@@ -0,0 +1,208 @@
+import base64
+import threading
+from email.header import Header
+from email.utils import formataddr, formatdate, make_msgid
+from typing import Dict, Optional, Tuple
+from uuid import uuid4
+
+from attachment_cache import CacheAdjuntos
+from template_engine import PlantillaCompilada
+
+CRLF = b'\r\n'
+
+
+def preparar_cuerpo(contenido: str):
+    """(es_html, cuerpo): texto con saltos de línea -> HTML simple; HTML -> tal cual"""
+    if '\n' in contenido and '<br>' not in contenido.lower():
+        contenido_html = contenido.replace('\n', '<br>')
+        return True, f"""
+                <html>
+                <body style="font-family: Arial, sans-serif; font-size: 12pt;">
+                {contenido_html}
+                </body>
+                </html>
+                """
+    if '<html>' in contenido.lower():
+        return True, contenido
+    return False, contenido
+
+
+def _codificar_texto(texto: str) -> bytes:
+    """Cuerpo en base64 (líneas de 76 con CRLF)"""
+    return base64.encodebytes(texto.encode('utf-8')).replace(b'\n', CRLF)
+
+
+def _codificar_encabezado(nombre: str, valor: str) -> bytes:
+    """'Nombre: valor' listo para el mensaje (RFC 2047 si no es ASCII)
+
+    Un salto de línea en el valor (p. ej. un dato del Excel en el asunto)
+    agregaría encabezados: se rechaza igual que en EmailMessage.
+    """
+    if '\r' in valor or '\n' in valor:
+        raise ValueError(f"El encabezado {nombre} no puede contener saltos de línea: {valor!r}")
+    if valor.isascii() and len(valor) < 900:
+        return f"{nombre}: {valor}".encode('ascii') + CRLF
+    codificado = Header(valor, 'utf-8', header_name=nombre).encode(linesep='\r\n')
+    return f"{nombre}: {codificado}".encode('ascii') + CRLF
+
+
+class EsqueletoMensaje:
+    """Mensaje MIME de una campaña armado una vez, con huecos por destinatario
+
+    Al construirlo se decide el formato (HTML / texto) sobre la plantilla, se
+    compila la versión HTML con sus marcadores y se codifican From y, si no
+    cambia, Subject. Los adjuntos ya vienen serializados en la caché: el
+    esqueleto los referencia sin copiarlos. Cada correo solo rellena To,
+    Subject, Date, Message-ID y los cuerpos personalizados.
+
+    El formato se decide con el texto de la plantilla: los saltos de línea de
+    los valores (NOMBRE, MENSAJE_PERSONAL...) pasan a <br> en la versión HTML.
+    """
+
+    def __init__(self, plantilla, remitente: str, nombre_remitente: str = '',
+                 adjuntos: Optional[CacheAdjuntos] = None):
+        self.plantilla = plantilla
+        self.adjuntos = adjuntos
+        self.dominio = remitente.rpartition('@')[2] or None
+
+        texto = plantilla.contenido.texto
+        self.es_html, cuerpo_html = preparar_cuerpo(texto)
+        # Texto con saltos de línea: HTML + alternativa en texto plano
+        self.con_alternativa = self.es_html and cuerpo_html != texto
+        self.html = PlantillaCompilada(cuerpo_html) if self.con_alternativa else None
+
+        remitente_txt = formataddr((nombre_remitente, remitente)) if nombre_remitente else remitente
+        self._from = _codificar_encabezado('From', remitente_txt)
+        self._subject = (None if plantilla.asunto.tiene_marcadores
+                         else _codificar_encabezado('Subject', plantilla.asunto.texto.strip()))
+
+        marca = uuid4().hex
+        self._limite_mixto = f"==_mixto_{marca}_=="
+        self._limite_alternativo = f"==_alternativo_{marca}_=="
+
+        # Adjuntos: referencias a las partes ya serializadas de la caché (sin copiarlas)
+        separador = b'--' + self._limite_mixto.encode('ascii') + CRLF
+        self._adjuntos = tuple(pedazo for adjunto in (adjuntos.adjuntos if adjuntos else [])
+                               for pedazo in (separador, adjunto.mime, CRLF))
+
+        self._encabezados_cuerpo = self._armar_encabezados()
+
+    def _armar_encabezados(self) -> Dict[str, bytes]:
+        tipo_texto = b'Content-Type: text/%s; charset="utf-8"\r\nContent-Transfer-Encoding: base64\r\n\r\n'
+        return {
+            'plain': tipo_texto % b'plain',
+            'html': tipo_texto % b'html',
+            'alternativo': (f'Content-Type: multipart/alternative; boundary="{self._limite_alternativo}"'
+                            .encode('ascii') + CRLF + CRLF),
+            'mixto': (f'Content-Type: multipart/mixed; boundary="{self._limite_mixto}"'
+                      .encode('ascii') + CRLF + CRLF)
+        }
+
+    def _cuerpo(self, contenido: str, variables: Dict[str, str]) -> bytes:
+        encabezados = self._encabezados_cuerpo
+        if not self.con_alternativa:
+            tipo = 'html' if self.es_html else 'plain'
+            return encabezados[tipo] + _codificar_texto(contenido)
+
+        valores_html = {clave: valor.replace('\n', '<br>') for clave, valor in variables.items()}
+        limite = b'--' + self._limite_alternativo.encode('ascii')
+        return b''.join((
+            encabezados['alternativo'],
+            limite, CRLF, encabezados['plain'], _codificar_texto(contenido), CRLF,
+            limite, CRLF, encabezados['html'], _codificar_texto(self.html.render(valores_html)), CRLF,
+            limite, b'--', CRLF
+        ))
+
+    def construir(self, correo: Dict) -> Tuple[bytes, int]:
+        """(bytes del mensaje, adjuntos incluidos) para un correo renderizado (a_dict)"""
+        encabezados = [
+            self._from,
+            _codificar_encabezado('To', correo['email'].strip()),
+            self._subject or _codificar_encabezado('Subject', correo['asunto'].strip()),
+            b'Date: ' + formatdate(localtime=True).encode('ascii') + CRLF,
+            b'Message-ID: ' + make_msgid(domain=self.dominio).encode('ascii') + CRLF,
+            b'MIME-Version: 1.0' + CRLF
+        ]
+        cuerpo = self._cuerpo(correo['contenido'], correo['variables'])
+
+        if not self._adjuntos:
+            return b''.join(encabezados) + cuerpo, 0
+
+        # Cuenta los usos en la caché de adjuntos (aciertos / bytes ahorrados)
+        adjuntos_agregados = len(self.adjuntos.partes_mime())
+        limite = b'--' + self._limite_mixto.encode('ascii')
+        return b''.join((
+            *encabezados, self._encabezados_cuerpo['mixto'],
+            limite, CRLF, cuerpo, CRLF,
+            *self._adjuntos,
+            limite, b'--', CRLF
+        )), adjuntos_agregados
+
+
+class ConstructorMensajes:
+    """Esqueletos por campaña (plantilla + adjuntos de la corrida), creados al primer correo"""
+
+    MAX_ESQUELETOS = 16
+
+    def __init__(self, remitente: str, nombre_remitente: str = ''):
+        self.remitente = remitente
+        self.nombre_remitente = nombre_remitente
+        self._esqueletos: Dict[tuple, EsqueletoMensaje] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def admite(correo: Dict, adjuntos) -> bool:
+        """Correo de una plantilla de campaña (a_dict) y adjuntos en caché o ninguno"""
+        return ('plantilla' in correo and 'variables' in correo and correo['email'].isascii()
+                and (not adjuntos or isinstance(adjuntos, CacheAdjuntos)))
+
+    def esqueleto(self, plantilla, adjuntos: Optional[CacheAdjuntos] = None) -> EsqueletoMensaje:
+        clave = (plantilla, id(adjuntos) if adjuntos else None)
+        with self._lock:
+            esqueleto = self._esqueletos.get(clave)
+            if esqueleto is not None and esqueleto.adjuntos is (adjuntos or None):
+                return esqueleto
+
+        esqueleto = EsqueletoMensaje(plantilla, self.remitente, self.nombre_remitente, adjuntos or None)
+        with self._lock:
+            if len(self._esqueletos) >= self.MAX_ESQUELETOS:
+                self._esqueletos.pop(next(iter(self._esqueletos)))
+            self._esqueletos[clave] = esqueleto
+        return esqueleto
+
+    def construir(self, correo: Dict, adjuntos: Optional[CacheAdjuntos] = None) -> Tuple[bytes, int]:
+        return self.esqueleto(correo['plantilla'], adjuntos).construir(correo)
+
+    def liberar(self, adjuntos: CacheAdjuntos):
+        """Descarta los esqueletos armados con esos adjuntos (la corrida terminó)"""
+        with self._lock:
+            for clave in [clave for clave, esqueleto in self._esqueletos.items() if esqueleto.adjuntos is adjuntos]:
+                del self._esqueletos[clave]
+
+
+# Función de prueba: tiempo por mensaje con el esqueleto
+if __name__ == "__main__":
+    import time
+    from email import message_from_bytes
+    from email.policy import default
+
+    from email_processor import PlantillaCorreo
+
+    plantilla = PlantillaCorreo(PlantillaCompilada("Propuesta para {EMPRESA}"),
+                                PlantillaCompilada("Hola {NOMBRE},\n\n{MENSAJE_PERSONAL}\n\nSaludos,\n{REMITENTE_NOMBRE}"),
+                                {'REMITENTE_NOMBRE': 'Ana Pérez'}, campana_id=1)
+    constructor = ConstructorMensajes('ana@empresa.com', 'Ana Pérez')
+    variables = {'NOMBRE': 'José', 'EMPRESA': 'Acme', 'MENSAJE_PERSONAL': 'Gracias por su tiempo',
+                 'REMITENTE_NOMBRE': 'Ana Pérez'}
+    correo = {'email': 'jose@acme.com', 'asunto': plantilla.asunto.render(variables),
+              'contenido': plantilla.contenido.render(variables), 'variables': variables, 'plantilla': plantilla}
+
+    datos, _ = constructor.construir(correo)
+    inicio = time.perf_counter()
+    for _ in range(10_000):
+        constructor.construir(correo)
+    por_mensaje = (time.perf_counter() - inicio) / 10_000 * 1e6
+
+    mensaje = message_from_bytes(datos, policy=default)
+    print(f"✉️ {mensaje['Subject']} -> {mensaje['To']} ({mensaje.get_content_type()})")
+    print(f"⏱️ {por_mensaje:.1f} µs por mensaje")
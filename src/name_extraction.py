@@ -0,0 +1,138 @@
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+# Separadores entre partes del nombre en la parte local del email
+PATRON_SEPARADORES = re.compile(r'[._\-0-9]+')
+
+NOMBRE_POR_DEFECTO = "Friend"
+
+
+def nombre_desde_parte_local(parte_local: str) -> str:
+    """Deriva un nombre legible de la parte local de un email ('juan.carlos' -> 'Juan Carlos')"""
+    # Tomar las primeras 2 partes y capitalizar (ignorando partes muy cortas)
+    partes = PATRON_SEPARADORES.split(parte_local)
+    nombre_partes = [parte.capitalize() for parte in partes[:2] if len(parte) > 1]
+
+    if nombre_partes:
+        return ' '.join(nombre_partes)
+    # Si no se puede extraer, usar la parte completa
+    return parte_local.capitalize()
+
+
+class ExtractorNombres:
+    """Extracción de nombres memoizada por parte local del email
+
+    LRU acotada en memoria (thread-safe) y, opcionalmente, un archivo JSON en
+    disco para reutilizar los nombres ya derivados entre ejecuciones.
+    """
+
+    VERSION = 1
+
+    def __init__(self, max_entradas: int = 100_000, archivo_cache: Optional[str] = None):
+        self.max_entradas = max_entradas
+        self.archivo_cache = archivo_cache
+        self._nombres: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._nuevos = 0
+        self.hits = 0
+        self.misses = 0
+
+        if archivo_cache:
+            self.cargar()
+
+    def extraer(self, email: str) -> str:
+        """Nombre derivado del email (calculado una sola vez por parte local)"""
+        try:
+            parte_local = email.split('@')[0]
+        except Exception:
+            return NOMBRE_POR_DEFECTO  # Fallback seguro
+
+        with self._lock:
+            nombre = self._nombres.get(parte_local)
+            if nombre is not None:
+                self._nombres.move_to_end(parte_local)
+                self.hits += 1
+                return nombre
+
+        try:
+            nombre = nombre_desde_parte_local(parte_local)
+        except Exception:
+            return NOMBRE_POR_DEFECTO
+
+        with self._lock:
+            self.misses += 1
+            self._nuevos += 1
+            self._nombres[parte_local] = nombre
+            if len(self._nombres) > self.max_entradas:
+                # Descartar el menos usado recientemente
+                self._nombres.popitem(last=False)
+        return nombre
+
+    def __len__(self) -> int:
+        return len(self._nombres)
+
+    def estadisticas(self) -> dict:
+        consultas = self.hits + self.misses
+        return {
+            'entradas': len(self._nombres),
+            'hits': self.hits,
+            'misses': self.misses,
+            'ratio_hits': round(self.hits / consultas, 3) if consultas else 0.0
+        }
+
+    def cargar(self) -> int:
+        """Carga los nombres guardados en disco (si el archivo existe y es válido)"""
+        if not self.archivo_cache or not os.path.exists(self.archivo_cache):
+            return 0
+
+        try:
+            with open(self.archivo_cache, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+            if datos.get('version') != self.VERSION:
+                return 0
+            nombres = datos.get('nombres', {})
+        except Exception as e:
+            print(f"⚠️ Caché de nombres ilegible ({os.path.basename(self.archivo_cache)}): {e}")
+            return 0
+
+        with self._lock:
+            for parte_local, nombre in list(nombres.items())[-self.max_entradas:]:
+                self._nombres.setdefault(parte_local, nombre)
+        return len(nombres)
+
+    def guardar(self) -> bool:
+        """Escribe la caché en disco si hay nombres nuevos desde la última escritura"""
+        if not self.archivo_cache or not self._nuevos:
+            return False
+
+        try:
+            carpeta = os.path.dirname(self.archivo_cache)
+            if carpeta:
+                os.makedirs(carpeta, exist_ok=True)
+
+            with self._lock:
+                datos = {'version': self.VERSION, 'nombres': dict(self._nombres)}
+                self._nuevos = 0
+
+            # Escritura atómica: archivo temporal + reemplazo
+            ruta_tmp = self.archivo_cache + '.tmp'
+            with open(ruta_tmp, 'w', encoding='utf-8') as f:
+                json.dump(datos, f, ensure_ascii=False)
+            os.replace(ruta_tmp, self.archivo_cache)
+            return True
+
+        except Exception as e:
+            print(f"⚠️ No se pudo escribir la caché de nombres: {e}")
+            return False
+
+    def limpiar(self):
+        """Vacía la caché en memoria y elimina el archivo en disco"""
+        with self._lock:
+            self._nombres.clear()
+            self._nuevos = 0
+        if self.archivo_cache and os.path.exists(self.archivo_cache):
+            os.remove(self.archivo_cache)
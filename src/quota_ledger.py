@@ -0,0 +1,146 @@
+import os
+import sqlite3
+import sys
+import threading
+from datetime import date
+from typing import Callable, Dict, Optional
+
+
+class LibroCuotas:
+    """Correos enviados por (cuenta de envío, fecha local), persistente entre ejecuciones
+
+    Cada envío reserva su lugar con un único UPSERT condicional (solo suma si
+    queda cupo), que SQLite ejecuta de forma atómica aunque varios procesos
+    usen el mismo archivo: dos instancias de la aplicación, o un reintento
+    mientras sigue una campaña, nunca superan juntas el máximo diario. Si el
+    envío falla, la reserva se libera. Consultar lo enviado hoy es una
+    búsqueda por clave primaria.
+    """
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS cuotas (
+            cuenta TEXT NOT NULL,
+            fecha TEXT NOT NULL,
+            enviados INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (cuenta, fecha)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, db_path: str = os.path.join("data", "cuotas_diarias.db"),
+                 hoy: Callable[[], date] = date.today):
+        self.db_path = db_path
+        self._hoy = hoy
+        carpeta = os.path.dirname(db_path)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+
+        # timeout: esperar (en vez de fallar) si otro proceso tiene el archivo bloqueado
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.ESQUEMA)
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cerrar()
+
+    def cerrar(self):
+        """Cerrar la conexión"""
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def clave_cuenta(cuenta: str) -> str:
+        return str(cuenta or '').strip().lower()
+
+    def _fecha(self, fecha: date = None) -> str:
+        return (fecha or self._hoy()).isoformat()
+
+    def enviados(self, cuenta: str, fecha: date = None) -> int:
+        """Correos ya contados para la cuenta en esa fecha (hoy por defecto)"""
+        with self._lock:
+            fila = self.conn.execute("SELECT enviados FROM cuotas WHERE cuenta = ? AND fecha = ?",
+                                     (self.clave_cuenta(cuenta), self._fecha(fecha))).fetchone()
+        return fila[0] if fila else 0
+
+    def disponibles(self, cuenta: str, max_diarios: int) -> int:
+        """Cuántos correos quedan hoy para la cuenta"""
+        return max(0, max_diarios - self.enviados(cuenta))
+
+    def reservar(self, cuenta: str, max_diarios: int) -> Optional[str]:
+        """Cuenta un envío si queda cupo hoy: la fecha reservada (para liberar), o None si no queda"""
+        if max_diarios <= 0:
+            return None
+        fecha = self._fecha()
+        with self._lock:
+            cursor = self.conn.execute("""
+                INSERT INTO cuotas (cuenta, fecha, enviados) VALUES (?, ?, 1)
+                ON CONFLICT (cuenta, fecha) DO UPDATE SET enviados = enviados + 1 WHERE enviados < ?
+            """, (self.clave_cuenta(cuenta), fecha, max_diarios))
+        return fecha if cursor.rowcount else None
+
+    def liberar(self, cuenta: str, fecha: str):
+        """Devuelve una reserva cuyo envío no se concretó"""
+        with self._lock:
+            self.conn.execute("UPDATE cuotas SET enviados = MAX(enviados - 1, 0) WHERE cuenta = ? AND fecha = ?",
+                              (self.clave_cuenta(cuenta), fecha))
+
+    def cuota(self, cuenta: str, max_diarios: int) -> 'CuotaDiaria':
+        return CuotaDiaria(self, cuenta, max_diarios)
+
+    def obtener_resumen(self, dias: int = 7) -> str:
+        """Resumen legible de los últimos días"""
+        filas = self.conn.execute(
+            "SELECT fecha, cuenta, enviados FROM cuotas ORDER BY fecha DESC, cuenta LIMIT ?", (dias * 10,)
+        ).fetchall()
+
+        resumen = "📅 CUOTAS DIARIAS:\n"
+        resumen += "=" * 30 + "\n"
+        resumen += f"📁 Archivo: {self.db_path}\n"
+        for fecha, cuenta, enviados in filas:
+            resumen += f"   • {fecha} {cuenta}: {enviados} enviados\n"
+        return resumen
+
+
+class CuotaDiaria:
+    """Cuota de hoy de una cuenta (lo que usa MotorEnvioAsync antes de cada envío)"""
+
+    def __init__(self, libro: LibroCuotas, cuenta: str, max_diarios: int):
+        self.libro = libro
+        self.cuenta = cuenta
+        self.max_diarios = max_diarios
+
+    def reservar(self) -> Optional[str]:
+        return self.libro.reservar(self.cuenta, self.max_diarios)
+
+    def liberar(self, reserva: str):
+        self.libro.liberar(self.cuenta, reserva)
+
+    def enviados(self) -> int:
+        return self.libro.enviados(self.cuenta)
+
+    def disponibles(self) -> int:
+        return self.libro.disponibles(self.cuenta, self.max_diarios)
+
+    def estadisticas(self) -> Dict:
+        enviados = self.enviados()
+        return {
+            'cuenta': LibroCuotas.clave_cuenta(self.cuenta),
+            'max_diarios': self.max_diarios,
+            'enviados_hoy': enviados,
+            'disponibles': max(0, self.max_diarios - enviados)
+        }
+
+
+# Función de prueba: python quota_ledger.py [cuenta max_diarios]
+if __name__ == "__main__":
+    with LibroCuotas() as libro:
+        if len(sys.argv) > 2:
+            cuota = libro.cuota(sys.argv[1], int(sys.argv[2]))
+            print(f"📅 {cuota.estadisticas()}")
+        print(libro.obtener_resumen())
@@ -0,0 +1,266 @@
+import random
+import threading
+import time
+from collections import deque
+from datetime import date
+from typing import Callable, Dict, Optional
+
+
+class LimitadorTasa:
+    """Token bucket para el ritmo de envío (correos por hora exactos)
+
+    Cada reserva avanza un horario teórico en 1/tasa (algoritmo GCRA), así
+    el tiempo que tarda cada envío ya está dentro del intervalo y el ritmo no
+    deriva. 'capacidad' es la ráfaga permitida tras estar inactivo. El jitter
+    mueve cada envío dentro de ±jitter·intervalo sin alterar el horario, por
+    lo que la tasa media se mantiene.
+
+    Topes adicionales: máximo por hora (ventana deslizante de 3600 s) y
+    máximo diario (por fecha del calendario).
+    """
+
+    VENTANA_HORA = 3600.0
+
+    def __init__(self, tasa_por_hora: float, capacidad: int = 1, jitter: float = 0.0,
+                 max_por_hora: int = None, max_diarios: int = None, enviados_hoy: int = 0,
+                 reloj: Callable[[], float] = time.monotonic, hoy: Callable[[], date] = date.today,
+                 semilla: int = None):
+        if tasa_por_hora <= 0:
+            raise ValueError(f"Tasa por hora inválida: {tasa_por_hora}")
+        self.tasa_por_hora = float(tasa_por_hora)
+        self.intervalo = self.VENTANA_HORA / self.tasa_por_hora
+        self.capacidad = max(1, int(capacidad))
+        # Hasta medio intervalo: los envíos nunca se adelantan al anterior
+        self.jitter = min(max(0.0, float(jitter)), 0.5)
+        self.max_por_hora = max_por_hora
+        self.max_diarios = max_diarios
+
+        self._reloj = reloj
+        self._hoy = hoy
+        self._random = random.Random(semilla)
+        self._lock = threading.Lock()
+
+        self._horario: Optional[float] = None   # próximo instante teórico (TAT)
+        self._ventana = deque()                  # instantes de envío de la última hora
+        self._fecha = hoy()
+        self.enviados_hoy = enviados_hoy
+        self.reservas = 0
+
+    @classmethod
+    def desde_config(cls, config: Dict, correos_por_hora: float = None, compensar_pausas: bool = True,
+                     capacidad: int = 1, jitter: float = 0.25, enviados_hoy: int = 0,
+                     **kwargs) -> 'LimitadorTasa':
+        """Limitador según config_actual de SmartEmailSender
+
+        La tasa objetivo es CORREOS_POR_HORA (MAX_CORREOS_DIARIOS / HORAS_TRABAJO).
+        Como entre lotes hay una pausa de MINUTOS_ENTRE_LOTES, dentro del lote se
+        envía algo más rápido para que lote + pausa dure exactamente lo que
+        corresponde a esa tasa (compensar_pausas); el tope por hora asegura
+        que no se supere. 'max_diarios' en kwargs reemplaza al de la configuración
+        (None: sin tope diario en el limitador).
+        """
+        if correos_por_hora is None:
+            correos_por_hora = config['MAX_CORREOS_DIARIOS'] / config['HORAS_TRABAJO']
+
+        por_lote = config.get('CORREOS_POR_LOTE', 0)
+        pausa_lote = config.get('MINUTOS_ENTRE_LOTES', 0) * 60
+        tasa = correos_por_hora
+        if compensar_pausas and por_lote and pausa_lote:
+            duracion_lote = por_lote * cls.VENTANA_HORA / correos_por_hora - pausa_lote
+            # Si la pausa ocupa todo el ciclo, la tasa queda limitada por el tope por hora
+            tasa = por_lote * cls.VENTANA_HORA / duracion_lote if duracion_lote > 0 else por_lote * 60
+
+        return cls(tasa, capacidad=capacidad, jitter=jitter,
+                   max_por_hora=max(1, int(correos_por_hora)),
+                   max_diarios=kwargs.pop('max_diarios', config.get('MAX_CORREOS_DIARIOS')),
+                   enviados_hoy=enviados_hoy, **kwargs)
+
+    def ajustar_tasa(self, tasa_por_hora: float):
+        """Cambia el ritmo desde la próxima reserva (los topes no cambian)"""
+        with self._lock:
+            self.tasa_por_hora = float(tasa_por_hora)
+            self.intervalo = self.VENTANA_HORA / self.tasa_por_hora
+
+    def _renovar_dia(self):
+        hoy = self._hoy()
+        if hoy != self._fecha:
+            self._fecha = hoy
+            self.enviados_hoy = 0
+
+    def limite_diario_alcanzado(self) -> bool:
+        with self._lock:
+            self._renovar_dia()
+            return self.max_diarios is not None and self.enviados_hoy >= self.max_diarios
+
+    def reservar(self) -> Optional[float]:
+        """Reserva el próximo envío: segundos a esperar antes de enviarlo
+
+        None si ya se alcanzó el máximo diario (no se debe enviar más hoy).
+        """
+        with self._lock:
+            self._renovar_dia()
+            if self.max_diarios is not None and self.enviados_hoy >= self.max_diarios:
+                return None
+
+            ahora = self._reloj()
+            if self._horario is None:
+                self._horario = ahora
+
+            # GCRA: se puede enviar desde horario - (capacidad - 1) intervalos
+            tolerancia = (self.capacidad - 1) * self.intervalo
+            instante = max(ahora, self._horario - tolerancia)
+            self._horario = max(self._horario, instante) + self.intervalo
+
+            if self.jitter and instante > ahora:
+                instante = max(ahora, instante + self._random.uniform(-self.jitter, self.jitter) * self.intervalo)
+
+            # Tope por hora (ventana deslizante)
+            while self._ventana and self._ventana[0] <= instante - self.VENTANA_HORA:
+                self._ventana.popleft()
+            if self.max_por_hora is not None and len(self._ventana) >= self.max_por_hora:
+                instante = max(instante, self._ventana[-self.max_por_hora] + self.VENTANA_HORA)
+                self._horario = max(self._horario, instante + self.intervalo)
+
+            self._ventana.append(instante)
+            self.enviados_hoy += 1
+            self.reservas += 1
+            return instante - ahora
+
+    def estadisticas(self) -> Dict:
+        return {
+            'tasa_por_hora': round(self.tasa_por_hora, 2),
+            'intervalo_segundos': round(self.intervalo, 2),
+            'capacidad': self.capacidad,
+            'jitter': self.jitter,
+            'max_por_hora': self.max_por_hora,
+            'max_diarios': self.max_diarios,
+            'enviados_hoy': self.enviados_hoy,
+            'reservas': self.reservas
+        }
+
+
+class ControlTasaAdaptativo:
+    """Ajuste AIMD del ritmo de un LimitadorTasa según cómo responde el servidor
+
+    Cada envío exitoso con latencia normal suma 'paso' correos/hora (aumento
+    aditivo) hasta el techo. Un fallo transitorio (4xx, timeout, servidor
+    ocupado) multiplica la tasa por factor_error y una latencia media muy por
+    encima de la habitual por factor_latencia (disminución multiplicativa).
+    Tras una bajada no se vuelve a bajar hasta pasado un intervalo, así varios
+    envíos en vuelo que fallan juntos cuentan como una sola señal.
+
+    El techo es la tasa configurada del limitador, cuyos topes por hora y
+    diario siguen aplicándose igual.
+    """
+
+    def __init__(self, limitador: LimitadorTasa, tasa_min: float = None, paso: float = None,
+                 factor_error: float = 0.5, factor_latencia: float = 0.7, umbral_latencia: float = 2.0,
+                 margen_latencia: float = 0.1, suavizado: float = 0.2, al_ajustar: Callable = None,
+                 reloj: Callable[[], float] = time.monotonic):
+        self.limitador = limitador
+        self.techo = limitador.tasa_por_hora
+        self.tasa_min = tasa_min or self.techo * 0.1
+        self.paso = paso or self.techo * 0.05
+        self.factor_error = factor_error
+        self.factor_latencia = factor_latencia
+        self.umbral_latencia = umbral_latencia
+        self.margen_latencia = margen_latencia
+        self.suavizado = suavizado
+        self.al_ajustar = al_ajustar
+        self._reloj = reloj
+        self._lock = threading.Lock()
+
+        self.latencia_media: Optional[float] = None   # media móvil exponencial
+        self.latencia_base: Optional[float] = None    # la menor media observada
+        self._ultima_bajada: Optional[float] = None
+        self.subidas = 0
+        self.bajadas = 0
+        self.tasa_minima_alcanzada = self.techo
+
+    @property
+    def tasa(self) -> float:
+        return self.limitador.tasa_por_hora
+
+    def latencia_alta(self) -> bool:
+        """Media 'umbral' veces la habitual (y al menos 'margen' segundos más: ignora el ruido de ms)"""
+        return (self.latencia_base is not None and
+                self.latencia_media > self.latencia_base * self.umbral_latencia and
+                self.latencia_media - self.latencia_base > self.margen_latencia)
+
+    def registrar(self, exitoso: bool, latencia: float = None, congestion: bool = False) -> float:
+        """Resultado de un envío -> nueva tasa (correos/hora)
+
+        congestion: el servidor pidió bajar el ritmo (fallo transitorio).
+        """
+        with self._lock:
+            if exitoso and latencia is not None:
+                if self.latencia_media is None:
+                    self.latencia_media = latencia
+                else:
+                    self.latencia_media += self.suavizado * (latencia - self.latencia_media)
+                self.latencia_base = min(self.latencia_base or self.latencia_media, self.latencia_media)
+
+            if congestion:
+                return self._bajar(self.factor_error, "fallo transitorio")
+            if exitoso and self.latencia_alta():
+                return self._bajar(self.factor_latencia, f"latencia {self.latencia_media:.2f}s")
+            if exitoso and self.tasa < self.techo:
+                self.subidas += 1
+                self._aplicar(min(self.techo, self.tasa + self.paso), None)
+            return self.tasa
+
+    def _bajar(self, factor: float, motivo: str) -> float:
+        ahora = self._reloj()
+        if self._ultima_bajada is not None and ahora - self._ultima_bajada < self.limitador.intervalo:
+            return self.tasa
+        self._ultima_bajada = ahora
+        self.bajadas += 1
+        self._aplicar(max(self.tasa_min, self.tasa * factor), motivo)
+        self.tasa_minima_alcanzada = min(self.tasa_minima_alcanzada, self.tasa)
+        return self.tasa
+
+    def _aplicar(self, tasa: float, motivo: Optional[str]):
+        anterior = self.tasa
+        if tasa == anterior:
+            return
+        self.limitador.ajustar_tasa(tasa)
+        if self.al_ajustar:
+            self.al_ajustar(anterior, tasa, motivo)
+
+    def estadisticas(self) -> Dict:
+        return {
+            'tasa_por_hora': round(self.tasa, 2),
+            'techo_por_hora': round(self.techo, 2),
+            'tasa_minima_por_hora': round(self.tasa_minima_alcanzada, 2),
+            'subidas': self.subidas,
+            'bajadas': self.bajadas,
+            'latencia_media': round(self.latencia_media, 3) if self.latencia_media is not None else None,
+            'latencia_base': round(self.latencia_base, 3) if self.latencia_base is not None else None
+        }
+
+
+# Función de prueba: 400 correos en 8 horas con reloj simulado
+if __name__ == "__main__":
+    reloj_simulado = [0.0]
+    config = {'MAX_CORREOS_DIARIOS': 400, 'HORAS_TRABAJO': 8, 'CORREOS_POR_LOTE': 50, 'MINUTOS_ENTRE_LOTES': 6}
+    limitador = LimitadorTasa.desde_config(config, reloj=lambda: reloj_simulado[0], semilla=1)
+    print(f"⏱️ {limitador.estadisticas()}")
+
+    for i in range(400):
+        espera = limitador.reservar()
+        reloj_simulado[0] += espera + 2.0   # espera + lo que tarda el envío
+        if (i + 1) % config['CORREOS_POR_LOTE'] == 0 and i < 399:
+            reloj_simulado[0] += config['MINUTOS_ENTRE_LOTES'] * 60   # pausa entre lotes
+
+    horas = reloj_simulado[0] / 3600
+    print(f"📤 400 correos en {horas:.2f} h ({400 / horas:.1f}/h) | "
+          f"siguiente reserva: {limitador.reservar()} (límite diario)")
+
+    # Servidor que limita a mitad del envío: la tasa baja a la mitad y se recupera
+    control = ControlTasaAdaptativo(LimitadorTasa(120), reloj=lambda: reloj_simulado[0])
+    for i in range(60):
+        reloj_simulado[0] += control.limitador.intervalo
+        control.registrar(exitoso=not 20 <= i < 23, latencia=0.3, congestion=20 <= i < 23)
+        if i in (19, 22, 40, 59):
+            print(f"📈 envío {i + 1}: {control.tasa:.0f}/h")
+    print(f"📊 {control.estadisticas()}")
@@ -0,0 +1,168 @@
+import heapq
+import itertools
+import random
+import smtplib
+import socket
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Errores COM de Outlook que indican "ocupado / reintentar más tarde"
+HRESULT_TRANSITORIOS = {
+    -2147418111,   # RPC_E_CALL_REJECTED (0x80010001)
+    -2147417846,   # RPC_E_SERVERCALL_RETRYLATER (0x8001010A)
+    -2147023174,   # RPC_S_SERVER_UNAVAILABLE (0x800706BA)
+    -2147023170,   # RPC_S_CALL_FAILED (0x800706BE)
+}
+
+# Pistas en el texto del error cuando no hay código (Outlook, servidores varios)
+TEXTOS_TRANSITORIOS = ('timed out', 'timeout', 'tiempo de espera', 'busy', 'ocupado',
+                       'temporar', 'try again', 'reintente', 'too many', 'rate limit', 'throttl')
+
+
+class EnvioIncierto(Exception):
+    """El envío se cortó después de que el servidor aceptó la transacción:
+    el mensaje pudo haberse entregado, así que no se reintenta"""
+
+
+def codigo_smtp(error: Exception) -> Optional[int]:
+    """Código SMTP de la respuesta (en SMTPRecipientsRefused, el peor de los destinatarios)"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused) and error.recipients:
+        return max(codigo for codigo, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code
+    return None
+
+
+def es_error_transitorio(error: Exception) -> bool:
+    """True si vale la pena reintentar el envío (timeouts, servidor ocupado, 4xx)
+
+    Permanentes: respuestas 5xx (dirección inválida, rechazo), datos del
+    correo inválidos (ValueError), cortes con la entrega en duda
+    (EnvioIncierto) y cualquier error que no se reconozca.
+    """
+    if isinstance(error, EnvioIncierto):
+        return False
+    codigo = codigo_smtp(error)
+    if codigo is not None:
+        return 400 <= codigo < 500
+    if isinstance(error, (smtplib.SMTPServerDisconnected, socket.timeout, TimeoutError, ConnectionError)):
+        return True
+    if isinstance(error, ValueError):
+        return False
+
+    hresult = getattr(error, 'hresult', None)
+    if hresult is None and error.args and isinstance(error.args[0], int):
+        hresult = error.args[0]   # pywintypes.com_error: (hresult, texto, excepinfo, argerror)
+    if hresult in HRESULT_TRANSITORIOS:
+        return True
+
+    texto = str(error).lower()
+    return any(pista in texto for pista in TEXTOS_TRANSITORIOS)
+
+
+class ProgramadorReintentos:
+    """Cola de reintentos con espera exponencial (heap por instante de vencimiento)
+
+    El intento n espera base·factor^(n-1) segundos (hasta 'espera_max'), con
+    un jitter de ±jitter sobre ese valor para que los reintentos no salgan
+    todos juntos. Tras 'max_intentos' reintentos el fallo es definitivo.
+    """
+
+    def __init__(self, max_intentos: int = 3, espera_base: float = 30.0, factor: float = 2.0,
+                 espera_max: float = 900.0, jitter: float = 0.2,
+                 reloj: Callable[[], float] = time.monotonic, semilla: int = None):
+        self.max_intentos = max(0, int(max_intentos))
+        self.espera_base = espera_base
+        self.factor = factor
+        self.espera_max = espera_max
+        self.jitter = min(max(0.0, jitter), 1.0)
+        self._reloj = reloj
+        self._random = random.Random(semilla)
+        self._lock = threading.Lock()
+
+        # (vence, secuencia, intento, correo, último resultado)
+        self._heap: List[Tuple[float, int, int, Dict, Dict]] = []
+        self._secuencia = itertools.count()
+        self.programados = 0
+        self.agotados = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __bool__(self) -> bool:
+        return bool(self._heap)
+
+    def calcular_espera(self, intento: int) -> float:
+        espera = min(self.espera_max, self.espera_base * self.factor ** (intento - 1))
+        if self.jitter:
+            espera *= 1 + self._random.uniform(-self.jitter, self.jitter)
+        return espera
+
+    def programar(self, correo: Dict, resultado: Dict, intento: int = 1) -> Optional[float]:
+        """Agenda el reintento número 'intento' de un fallo transitorio: segundos
+        de espera, o None si ya no quedan intentos (el fallo es definitivo)"""
+        with self._lock:
+            if intento > self.max_intentos:
+                self.agotados += 1
+                return None
+            espera = self.calcular_espera(intento)
+            heapq.heappush(self._heap, (self._reloj() + espera, next(self._secuencia), intento, correo, resultado))
+            self.programados += 1
+            return espera
+
+    def proximo_vencimiento(self) -> Optional[float]:
+        """Segundos hasta el próximo reintento (0 si ya venció; None si no hay)"""
+        with self._lock:
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - self._reloj())
+
+    def tomar_vencido(self) -> Optional[Tuple[Dict, int, Dict]]:
+        """(correo, número de intento, último resultado) del reintento vencido más antiguo, o None"""
+        with self._lock:
+            if self._heap and self._heap[0][0] <= self._reloj():
+                _, _, intento, correo, resultado = heapq.heappop(self._heap)
+                return correo, intento, resultado
+            return None
+
+    def devolver(self, correo: Dict, intento: int, resultado: Dict):
+        """Vuelve a encolar (ya vencido) un reintento tomado que no se llegó a enviar"""
+        with self._lock:
+            heapq.heappush(self._heap, (self._reloj(), next(self._secuencia), intento, correo, resultado))
+
+    def vaciar(self) -> List[Tuple[Dict, Dict]]:
+        """(correo, último resultado) de los reintentos que quedaron sin hacer"""
+        with self._lock:
+            pendientes = [(correo, resultado) for _, _, _, correo, resultado in sorted(self._heap)]
+            self._heap.clear()
+            return pendientes
+
+    def estadisticas(self) -> Dict:
+        return {
+            'max_intentos': self.max_intentos,
+            'programados': self.programados,
+            'agotados': self.agotados,
+            'pendientes': len(self._heap)
+        }
+
+
+# Función de prueba: clasificación y esperas de cada intento
+if __name__ == "__main__":
+    errores = [
+        smtplib.SMTPResponseException(421, b'Service not available, try later'),
+        smtplib.SMTPRecipientsRefused({'x@y.com': (550, b'No such user')}),
+        smtplib.SMTPServerDisconnected('Connection unexpectedly closed'),
+        socket.timeout('timed out'),
+        ValueError('Email del destinatario requerido'),
+        Exception(-2147417846, 'Call was rejected by callee.', None, None),
+    ]
+    for error in errores:
+        print(f"{'🔁 transitorio' if es_error_transitorio(error) else '⛔ permanente '}  {error!r}")
+
+    programador = ProgramadorReintentos(semilla=1)
+    intento = 1
+    while (espera := programador.programar({'email': 'x@y.com'}, {}, intento)) is not None:
+        print(f"   intento {intento}: {espera:.1f}s")
+        intento += 1
+    print(f"📊 {programador.estadisticas()}")
@@ -0,0 +1,499 @@
+import asyncio
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from quota_ledger import CuotaDiaria
+from rate_limiter import ControlTasaAdaptativo, LimitadorTasa
+from retry_policy import ProgramadorReintentos
+from transports import TransporteCorreo
+
+
+class TransporteAsync(ABC):
+    """Interfaz asíncrona de envío usada por MotorEnvioAsync
+
+    enviar() es una corrutina con el mismo contrato que TransporteCorreo.enviar:
+    recibe el correo renderizado, devuelve cuántos adjuntos se agregaron y lanza
+    una excepción si el envío falla.
+    """
+
+    tipo = 'base'
+
+    @abstractmethod
+    async def enviar(self, correo: Dict, adjuntos: List[str] = None) -> int:
+        """Envía un correo: adjuntos agregados (lanza excepción si falla)"""
+
+    async def cerrar(self):
+        """Liberar recursos (hilos, conexiones)"""
+
+
+class AdaptadorTransporteAsync(TransporteAsync):
+    """Usa un TransporteCorreo síncrono (Outlook, SMTP) desde asyncio
+
+    Cada envío corre en un pool de hilos del tamaño de los envíos simultáneos
+    que admite el transporte (nunca más), así el bucle de eventos nunca se
+    bloquea. Cada envío prepara y libera su hilo (iniciar_hilo / finalizar_hilo):
+    Outlook obtiene ahí un objeto COM propio de ese hilo.
+    """
+
+    def __init__(self, transporte: TransporteCorreo, hilos: int = None):
+        self.transporte = transporte
+        self.tipo = transporte.tipo
+        self.hilos = max(1, min(hilos or transporte.max_simultaneos(), transporte.max_simultaneos()))
+        self._executor = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix='envio')
+
+    def _enviar_en_hilo(self, correo: Dict, adjuntos: List[str] = None) -> int:
+        self.transporte.iniciar_hilo()
+        try:
+            return self.transporte.enviar(correo, adjuntos)
+        finally:
+            self.transporte.finalizar_hilo()
+
+    async def enviar(self, correo: Dict, adjuntos: List[str] = None) -> int:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._enviar_en_hilo, correo, adjuntos)
+
+    async def cerrar(self):
+        # El transporte (y sus conexiones) sigue siendo del sender: solo se liberan los hilos
+        self._executor.shutdown(wait=True)
+
+
+class ControlEnvio:
+    """Detener, pausar y reanudar un envío en curso desde cualquier hilo
+
+    Estado en threading.Event; quien espera (el motor, o código síncrono con
+    esperar()) se despierta en cuanto cambia el estado, sin sondeo.
+    """
+
+    def __init__(self):
+        self._detenido = threading.Event()
+        self._activo = threading.Event()   # desactivado = en pausa
+        self._activo.set()
+        self._lock = threading.Lock()
+        self._oyentes: List[Callable[[], None]] = []
+
+    @property
+    def detenido(self) -> bool:
+        return self._detenido.is_set()
+
+    @property
+    def pausado(self) -> bool:
+        return not self._activo.is_set() and not self._detenido.is_set()
+
+    def detener(self):
+        self._detenido.set()
+        self._activo.set()   # liberar a quien espera la reanudación
+        self._notificar()
+
+    def pausar(self):
+        if not self.detenido:
+            self._activo.clear()
+            self._notificar()
+
+    def reanudar(self):
+        self._activo.set()
+        self._notificar()
+
+    def suscribir(self, oyente: Callable[[], None]):
+        """oyente() se llama (desde el hilo que cambió el estado) en cada cambio"""
+        with self._lock:
+            self._oyentes.append(oyente)
+
+    def desuscribir(self, oyente: Callable[[], None]):
+        with self._lock:
+            if oyente in self._oyentes:
+                self._oyentes.remove(oyente)
+
+    def _notificar(self):
+        with self._lock:
+            oyentes = list(self._oyentes)
+        for oyente in oyentes:
+            oyente()
+
+    def esperar(self, segundos: float) -> bool:
+        """Espera síncrona que termina antes si se detiene; True si se detuvo"""
+        return self._detenido.wait(segundos)
+
+    def esperar_reanudacion(self, timeout: float = None) -> bool:
+        """Bloquea mientras esté en pausa; True si puede seguir (no detenido)"""
+        self._activo.wait(timeout)
+        return not self.detenido
+
+
+class MotorEnvioAsync:
+    """Envío con hasta 'concurrencia' correos en vuelo a la vez
+
+    Respeta la misma semántica de lotes que el envío secuencial: los lotes se
+    procesan en orden, al terminar cada lote se esperan todos sus envíos y se
+    hace la pausa 'pausa_despues' del lote. El ritmo lo marca un LimitadorTasa
+    consultado antes de INICIAR cada envío, de modo que la latencia del
+    servidor ya no suma tiempo al ritmo permitido.
+
+    El envío se controla con un ControlEnvio: al detener no se inician más
+    envíos, toda espera termina de inmediato y solo se esperan los envíos que
+    ya estaban en vuelo; en pausa no se inicia ninguno nuevo y al reanudar se
+    sigue desde el mismo correo.
+    """
+
+    # Cada cuánto se consulta detener_callback (si se usa) durante las esperas (segundos)
+    INTERVALO_SONDEO = 0.1
+    # Cada cuánto se informa el tiempo restante de una pausa (segundos)
+    AVISO_PAUSA = 10
+
+    def __init__(self, concurrencia: int = 4, logger=None, control: ControlEnvio = None):
+        self.concurrencia = max(1, int(concurrencia))
+        self.logger = logger
+        self.control = control or ControlEnvio()
+        self._cambio: Optional[asyncio.Event] = None
+        self._reiniciar_estadisticas()
+
+    def _reiniciar_estadisticas(self):
+        self.iniciados = 0
+        self.completados = 0
+        self.en_vuelo = 0
+        self.en_vuelo_max = 0
+        self.reintentados = 0
+        self.limite_diario = False
+
+    @property
+    def cancelado(self) -> bool:
+        return self.control.detenido
+
+    def cancelar(self):
+        """Detiene el envío (thread-safe)"""
+        self.control.detener()
+
+    def _debe_detener(self, detener_callback: Callable = None) -> bool:
+        if not self.control.detenido and detener_callback and detener_callback():
+            self.control.detener()
+        return self.control.detenido
+
+    async def _esperar_cambio(self, timeout: Optional[float]):
+        """Duerme hasta que cambie el estado del control (o venza el timeout)"""
+        try:
+            await asyncio.wait_for(self._cambio.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _esperar(self, segundos: float, descripcion: str = None,
+                       al_pausar: Callable = None, detener_callback: Callable = None):
+        """Pausa interrumpible; informa el tiempo restante cada AVISO_PAUSA segundos"""
+        fin = time.monotonic() + segundos
+        ultimo_aviso = None
+        while True:
+            self._cambio.clear()
+            if self._debe_detener(detener_callback):
+                return
+            restante = fin - time.monotonic()
+            if restante <= 0:
+                return
+
+            timeout = restante
+            if al_pausar and descripcion:
+                if ultimo_aviso is None or ultimo_aviso - restante >= self.AVISO_PAUSA:
+                    al_pausar(restante, descripcion)
+                    ultimo_aviso = restante
+                timeout = min(timeout, max(0.0, restante - (ultimo_aviso - self.AVISO_PAUSA)))
+            if detener_callback:
+                timeout = min(timeout, self.INTERVALO_SONDEO)
+            await self._esperar_cambio(timeout)
+
+    async def _esperar_reanudacion(self, al_pausar: Callable = None, detener_callback: Callable = None):
+        """Si el envío está en pausa, espera a que se reanude o se detenga"""
+        en_pausa = False
+        while True:
+            self._cambio.clear()
+            if self._debe_detener(detener_callback):
+                return
+            if not self.control.pausado:
+                if en_pausa and self.logger:
+                    self.logger.info("▶️ Envío reanudado")
+                return
+            if not en_pausa:
+                en_pausa = True
+                if self.logger:
+                    self.logger.info(f"⏸️ Envío en pausa ({self.iniciados} iniciados)")
+                if al_pausar:
+                    al_pausar(None, "⏸️ Envío en pausa")
+            await self._esperar_cambio(self.INTERVALO_SONDEO if detener_callback else None)
+
+    async def _enviar_uno(self, enviar: Callable[[Dict], Awaitable[Dict]], correo: Dict,
+                          semaforo: asyncio.Semaphore, al_resultado: Callable = None,
+                          reintentos: ProgramadorReintentos = None, intento: int = 0,
+                          al_reintento: Callable = None, adaptativo: ControlTasaAdaptativo = None,
+                          cuota: CuotaDiaria = None, reserva: str = None):
+        self.en_vuelo += 1
+        self.en_vuelo_max = max(self.en_vuelo_max, self.en_vuelo)
+        inicio = time.monotonic()
+        try:
+            try:
+                resultado = await enviar(correo)
+            except Exception as e:
+                resultado = {
+                    'exitoso': False,
+                    'error': str(e),
+                    'email': correo.get('email', 'desconocido'),
+                    'nombre': correo.get('nombre', 'Sin nombre'),
+                    'empresa': correo.get('empresa', '')
+                }
+            self.completados += 1
+
+            # Solo los envíos exitosos cuentan para la cuota diaria
+            if reserva is not None and not resultado.get('exitoso'):
+                cuota.liberar(reserva)
+
+            # Ritmo adaptativo: éxito y latencia, o fallo transitorio como señal de congestión
+            if adaptativo is not None:
+                adaptativo.registrar(bool(resultado.get('exitoso')), time.monotonic() - inicio,
+                                     congestion=bool(resultado.get('transitorio')))
+
+            # Fallo transitorio: vuelve a la cola con espera exponencial (no es resultado final)
+            if (reintentos is not None and not resultado.get('exitoso') and resultado.get('transitorio')
+                    and not self.control.detenido):
+                espera = reintentos.programar(correo, resultado, intento + 1)
+                if espera is not None:
+                    if al_reintento:
+                        al_reintento(resultado, correo, intento + 1, espera)
+                    return
+
+            if intento:
+                resultado['intentos'] = intento + 1
+            if al_resultado:
+                al_resultado(resultado, correo)
+        finally:
+            self.en_vuelo -= 1
+            semaforo.release()
+
+    async def ejecutar(self, correos: Iterable[Dict], lotes: List[Dict],
+                       enviar: Callable[[Dict], Awaitable[Dict]],
+                       limitador: LimitadorTasa = None,
+                       descripcion_espera: str = None,
+                       al_iniciar: Callable = None,
+                       al_resultado: Callable = None,
+                       al_pausar: Callable = None,
+                       detener_callback: Callable = None,
+                       reintentos: ProgramadorReintentos = None,
+                       al_reintento: Callable = None,
+                       adaptativo: ControlTasaAdaptativo = None,
+                       cuota: CuotaDiaria = None) -> Dict:
+        """Envía los correos lote a lote
+
+        lotes: [{'cantidad': int, 'pausa_despues': segundos, 'descripcion_pausa': str}]
+        enviar: corrutina correo -> resultado (mismo dict que SmartEmailSender.enviar_correo)
+        limitador: ritmo de envío (sin limitador, tan rápido como la concurrencia permita)
+        al_iniciar(indice, correo, numero_lote), al_resultado(resultado, correo),
+        al_pausar(segundos_restantes, descripcion) (segundos_restantes None = en pausa)
+        reintentos: cola de fallos transitorios (resultado['transitorio']); cada reintento
+        vencido sale antes que el siguiente correo nuevo, sin contar para el lote, y al
+        agotarse la lista se esperan los pendientes. al_reintento(resultado, correo,
+        intento, espera) avisa de cada reintento programado.
+        adaptativo: ajusta el ritmo del limitador con el resultado y la latencia de cada envío.
+        cuota: cuota diaria persistente de la cuenta; cada envío reserva su lugar antes de
+        salir (se libera si falla) y sin cupo se corta como con el límite diario.
+        """
+        loop = asyncio.get_running_loop()
+        self._cambio = asyncio.Event()
+
+        def despertar():
+            try:
+                loop.call_soon_threadsafe(self._cambio.set)
+            except RuntimeError:
+                pass  # El bucle ya terminó
+
+        self.control.suscribir(despertar)
+        try:
+            return await self._ejecutar_lotes(correos, lotes, enviar, limitador, descripcion_espera,
+                                              al_iniciar, al_resultado, al_pausar, detener_callback,
+                                              reintentos, al_reintento, adaptativo, cuota)
+        finally:
+            self.control.desuscribir(despertar)
+
+    async def _turno(self, semaforo: asyncio.Semaphore, limitador: LimitadorTasa,
+                     descripcion_espera: str, al_pausar: Callable, detener_callback: Callable) -> bool:
+        """Espera el turno del limitador y un hueco de concurrencia; False si hay que dejar de enviar"""
+        if limitador is not None:
+            espera = limitador.reservar()
+            if espera is None:
+                self.limite_diario = True
+                if self.logger:
+                    self.logger.warning("🛑 Límite diario alcanzado - no se envían más correos hoy")
+                return False
+            if espera > 0:
+                await self._esperar(espera, descripcion_espera, al_pausar, detener_callback)
+                # Si se pausó durante la espera, este mismo correo sale al reanudar
+                await self._esperar_reanudacion(al_pausar, detener_callback)
+
+        await semaforo.acquire()
+        if self._debe_detener(detener_callback):
+            semaforo.release()
+            return False
+        return True
+
+    def _reservar_cuota(self, cuota: CuotaDiaria, semaforo: asyncio.Semaphore) -> Optional[str]:
+        """Cuenta el envío en la cuota diaria; None (y devuelve el turno) si ya no queda cupo"""
+        reserva = cuota.reservar()
+        if reserva is None:
+            self.limite_diario = True
+            semaforo.release()
+            if self.logger:
+                self.logger.warning("🛑 Cuota diaria de la cuenta agotada - no se envían más correos hoy")
+        return reserva
+
+    async def _ejecutar_lotes(self, correos, lotes, enviar, limitador, descripcion_espera,
+                              al_iniciar, al_resultado, al_pausar, detener_callback,
+                              reintentos=None, al_reintento=None, adaptativo=None, cuota=None) -> Dict:
+        self._reiniciar_estadisticas()
+
+        semaforo = asyncio.Semaphore(self.concurrencia)
+        en_vuelo = set()
+        iterador = iter(correos)
+        agotado = False
+
+        def lanzar(correo: Dict, intento: int = 0, reserva: str = None):
+            tarea = asyncio.create_task(self._enviar_uno(enviar, correo, semaforo, al_resultado,
+                                                         reintentos, intento, al_reintento, adaptativo,
+                                                         cuota, reserva))
+            en_vuelo.add(tarea)
+            tarea.add_done_callback(en_vuelo.discard)
+
+        for numero_lote, lote in enumerate(lotes):
+            if agotado or self._debe_detener(detener_callback):
+                break
+
+            nuevos = 0
+            while True:
+                await self._esperar_reanudacion(al_pausar, detener_callback)
+                if self._debe_detener(detener_callback):
+                    break
+
+                # Un reintento vencido sale antes que el siguiente correo nuevo
+                vencido = reintentos.tomar_vencido() if reintentos else None
+                if vencido is None:
+                    if nuevos >= lote['cantidad']:
+                        break
+                    correo = next(iterador, None)
+                    if correo is None:
+                        agotado = True
+                        break
+
+                if not await self._turno(semaforo, limitador, descripcion_espera, al_pausar, detener_callback):
+                    if vencido is not None:
+                        reintentos.devolver(*vencido)   # vuelve a la cola
+                    break
+                reserva = None
+                if cuota is not None and (reserva := self._reservar_cuota(cuota, semaforo)) is None:
+                    if vencido is not None:
+                        reintentos.devolver(*vencido)
+                    break
+
+                if vencido is not None:
+                    self.reintentados += 1
+                    lanzar(*vencido[:2], reserva)
+                    continue
+
+                if al_iniciar:
+                    al_iniciar(self.iniciados, correo, numero_lote)
+                self.iniciados += 1
+                nuevos += 1
+                lanzar(correo, 0, reserva)
+
+            # Fin del lote: esperar los envíos en vuelo antes de la pausa larga
+            if en_vuelo:
+                await asyncio.gather(*en_vuelo)
+
+            if self.limite_diario:
+                break
+
+            if lote.get('pausa_despues', 0) > 0 and not agotado and not self._debe_detener(detener_callback):
+                if self.logger and lote.get('descripcion_pausa'):
+                    self.logger.info(f"⏳ {lote['descripcion_pausa']}")
+                await self._esperar(lote['pausa_despues'], lote.get('descripcion_pausa', 'Pausa entre lotes'),
+                                    al_pausar, detener_callback)
+
+        # Lista terminada: quedan los reintentos programados (y los que generen los envíos en vuelo)
+        while reintentos is not None and not self.limite_diario and not self._debe_detener(detener_callback):
+            espera = reintentos.proximo_vencimiento()
+            if espera is None:
+                if not en_vuelo:
+                    break
+                await asyncio.wait(set(en_vuelo), return_when=asyncio.FIRST_COMPLETED)
+                continue
+            if espera > 0:
+                if en_vuelo:
+                    await asyncio.wait(set(en_vuelo), timeout=espera, return_when=asyncio.FIRST_COMPLETED)
+                else:
+                    await self._esperar(espera, "🔁 Esperando reintentos", al_pausar, detener_callback)
+                continue
+
+            await self._esperar_reanudacion(al_pausar, detener_callback)
+            vencido = reintentos.tomar_vencido()
+            if vencido is None:
+                continue
+            if not await self._turno(semaforo, limitador, descripcion_espera, al_pausar, detener_callback):
+                reintentos.devolver(*vencido)
+                break
+            reserva = None
+            if cuota is not None and (reserva := self._reservar_cuota(cuota, semaforo)) is None:
+                reintentos.devolver(*vencido)
+                break
+            self.reintentados += 1
+            lanzar(*vencido[:2], reserva)
+
+        if en_vuelo:
+            await asyncio.gather(*en_vuelo)
+
+        # Reintentos que no llegaron a salir (detenido o límite diario): fallo con su último error
+        if reintentos is not None:
+            for correo, resultado in reintentos.vaciar():
+                if al_resultado:
+                    al_resultado(resultado, correo)
+
+        return self.estadisticas()
+
+    def ejecutar_sync(self, *args, **kwargs) -> Dict:
+        """ejecutar() desde código síncrono (p. ej. el hilo de envío de la GUI)"""
+        return asyncio.run(self.ejecutar(*args, **kwargs))
+
+    def estadisticas(self) -> Dict:
+        return {
+            'concurrencia': self.concurrencia,
+            'iniciados': self.iniciados,
+            'completados': self.completados,
+            'en_vuelo_max': self.en_vuelo_max,
+            'reintentados': self.reintentados,
+            'cancelado': self.cancelado,
+            'limite_diario': self.limite_diario
+        }
+
+
+# Función de prueba: 40 correos con 50 ms de latencia del servidor, 1 vs 4 en vuelo
+if __name__ == "__main__":
+    from transports import ServidorSMTPPrueba, TransporteSMTP
+
+    with ServidorSMTPPrueba(latencia=0.05) as servidor:
+        for concurrencia in (1, 4):
+            transporte = TransporteSMTP(servidor.host, servidor.puerto, remitente='prueba@localhost',
+                                        seguridad=TransporteSMTP.SEGURIDAD_NINGUNA, conexiones=concurrencia)
+            adaptador = AdaptadorTransporteAsync(transporte)
+            motor = MotorEnvioAsync(concurrencia=concurrencia)
+            correos = [{'email': f'destino{i}@ejemplo.com', 'asunto': 'Prueba', 'contenido': 'Hola'}
+                       for i in range(40)]
+
+            async def enviar(correo):
+                await adaptador.enviar(correo)
+                return {'exitoso': True, 'email': correo['email']}
+
+            async def principal():
+                try:
+                    return await motor.ejecutar(correos, [{'cantidad': len(correos), 'pausa_despues': 0}], enviar)
+                finally:
+                    await adaptador.cerrar()
+
+            inicio = time.perf_counter()
+            estadisticas = asyncio.run(principal())
+            duracion = time.perf_counter() - inicio
+            transporte.cerrar()
+            print(f"🚀 {concurrencia} en vuelo: {estadisticas['completados']} correos en {duracion:.2f}s "
+                  f"({estadisticas['completados'] / duracion:.0f}/s, máx. en vuelo {estadisticas['en_vuelo_max']})")
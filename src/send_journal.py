@@ -0,0 +1,389 @@
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from email_processor import CorreoProcesado, PlantillaCorreo
+from template_engine import PlantillaCompilada
+
+# Estados de una corrida
+CORRIDA_EN_CURSO = 'en_curso'      # si el proceso muere, queda así: se puede reanudar
+CORRIDA_DETENIDA = 'detenida'      # detenida por el usuario o por el límite diario
+CORRIDA_COMPLETADA = 'completada'
+CORRIDA_DESCARTADA = 'descartada'
+
+CORRIDAS_REANUDABLES = (CORRIDA_EN_CURSO, CORRIDA_DETENIDA)
+
+# Estados de un destinatario dentro de la corrida
+ESTADO_PENDIENTE = 'pendiente'
+ESTADO_ENVIANDO = 'enviando'
+ESTADO_ENVIADO = 'enviado'
+ESTADO_FALLIDO = 'fallido'
+ESTADO_INCIERTO = 'incierto'       # estaba en vuelo cuando se cortó: no se reenvía
+ESTADO_REINTENTO = 'reintento'     # falló de forma transitoria y espera su reintento: se reenvía al reanudar
+
+
+class CorreosDiario:
+    """Correos pendientes de una corrida, leídos del diario bajo demanda
+
+    Primero salen los que quedaron esperando un reintento (posiciones antes
+    del cursor) y luego, en orden, los que siguen desde el cursor; len() es
+    la cantidad de pendientes al momento de crearlo.
+    """
+
+    def __init__(self, diario: 'DiarioEnvios', run_id: str, desde: int, total: int,
+                 plantilla: Optional[PlantillaCorreo], reintentos: List[int] = ()):
+        self.diario = diario
+        self.run_id = run_id
+        self.desde = desde
+        self.total = total
+        self.plantilla = plantilla
+        self.reintentos = list(reintentos)
+
+    def __iter__(self) -> Iterator:
+        filas = itertools.chain(self.diario._filas_en(self.run_id, self.reintentos),
+                                self.diario._filas_desde(self.run_id, self.desde))
+        for posicion, indice, email, nombre, empresa, mensaje, asunto, contenido in filas:
+            if asunto is None and self.plantilla is not None:
+                yield CorreoProcesado(indice, email, nombre, empresa, mensaje, self.plantilla)
+            else:
+                # Correo ya renderizado (lista de diccionarios)
+                yield {'indice': indice, 'email': email, 'nombre': nombre, 'empresa': empresa,
+                       'asunto': asunto or '', 'contenido': contenido or '', 'estado': ESTADO_PENDIENTE,
+                       'campana_id': self.plantilla.campana_id if self.plantilla else None}
+
+    def posicion(self, orden: int) -> int:
+        """Posición en el diario del correo número 'orden' (desde 0) de este recorrido"""
+        if orden < len(self.reintentos):
+            return self.reintentos[orden]
+        return self.desde + orden - len(self.reintentos)
+
+    def __len__(self) -> int:
+        return max(0, self.total - self.desde) + len(self.reintentos)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+
+class DiarioEnvios:
+    """Diario de envíos a prueba de cortes (SQLite en modo WAL)
+
+    Al iniciar una corrida se guarda el plan completo (un registro compacto
+    por destinatario) y luego cada transición (enviando -> enviado/fallido)
+    se confirma en el momento, junto con un registro en 'eventos' que solo
+    crece. El cursor de la corrida es la posición del primer destinatario que
+    nunca se empezó a enviar: reanudar es leer una fila y seguir desde ahí
+    (más los que esperaban un reintento). La conexión se comparte entre
+    hilos, así que todo acceso pasa por un lock.
+    """
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS corridas (
+            run_id TEXT PRIMARY KEY,
+            campana_id TEXT,
+            estado TEXT NOT NULL,
+            inicio TEXT NOT NULL,
+            actualizado TEXT NOT NULL,
+            total INTEGER NOT NULL,
+            cursor INTEGER NOT NULL DEFAULT 0,
+            datos TEXT NOT NULL DEFAULT '{}'
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS destinatarios (
+            run_id TEXT NOT NULL,
+            posicion INTEGER NOT NULL,
+            indice INTEGER,
+            email TEXT NOT NULL,
+            nombre TEXT NOT NULL DEFAULT '',
+            empresa TEXT NOT NULL DEFAULT '',
+            mensaje_personal TEXT NOT NULL DEFAULT '',
+            asunto TEXT,
+            contenido TEXT,
+            estado TEXT NOT NULL,
+            fecha TEXT,
+            error TEXT,
+            PRIMARY KEY (run_id, posicion)
+        ) WITHOUT ROWID;
+
+        CREATE INDEX IF NOT EXISTS destinatarios_estado ON destinatarios (run_id, estado);
+
+        CREATE TABLE IF NOT EXISTS eventos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT NOT NULL,
+            posicion INTEGER NOT NULL,
+            estado TEXT NOT NULL,
+            fecha TEXT NOT NULL,
+            detalle TEXT
+        );
+    """
+
+    # Filas leídas por consulta al recorrer los pendientes
+    TAMANO_PAGINA = 500
+
+    def __init__(self, db_path: str = os.path.join("data", "diario_envios.db")):
+        self.db_path = db_path
+        carpeta = os.path.dirname(db_path)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.ESQUEMA)
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cerrar()
+
+    def cerrar(self):
+        """Cerrar la conexión"""
+        with self._lock:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _ahora() -> str:
+        return datetime.now().isoformat(timespec='seconds')
+
+    @staticmethod
+    def _clave_campana(campana_id) -> Optional[str]:
+        if campana_id is None:
+            return None
+        if isinstance(campana_id, float) and campana_id.is_integer():
+            campana_id = int(campana_id)
+        return str(campana_id).strip()
+
+    # --- Corridas -----------------------------------------------------------
+
+    def iniciar_corrida(self, correos: Iterable, campana_id=None, datos: Dict = None) -> str:
+        """Guarda el plan de envío (todos los destinatarios, en orden) y devuelve el run_id
+
+        Los CorreoProcesado se guardan sin renderizar (la plantilla de la
+        campaña va una sola vez en 'datos'); los diccionarios, tal cual.
+        """
+        run_id = datetime.now().strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:6]
+        datos = dict(datos or {})
+        ahora = self._ahora()
+        primero = {}
+
+        def filas():
+            for posicion, correo in enumerate(correos):
+                if isinstance(correo, CorreoProcesado):
+                    if not primero:
+                        primero['plantilla'] = correo.plantilla
+                    asunto = contenido = None
+                    mensaje = correo.mensaje_personal
+                else:
+                    asunto, contenido = correo.get('asunto', ''), correo.get('contenido', '')
+                    mensaje = correo.get('mensaje_personal', '')
+                yield (run_id, posicion, correo.get('indice'), correo.get('email', ''),
+                       correo.get('nombre', '') or '', correo.get('empresa', '') or '', mensaje or '',
+                       asunto, contenido, ESTADO_PENDIENTE)
+
+        with self._lock, self.conn:
+            self.conn.executemany("""
+                INSERT INTO destinatarios (run_id, posicion, indice, email, nombre, empresa,
+                                           mensaje_personal, asunto, contenido, estado)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, filas())
+            total = self.conn.execute("SELECT COUNT(*) FROM destinatarios WHERE run_id = ?",
+                                      (run_id,)).fetchone()[0]
+
+            plantilla = primero.get('plantilla')
+            if plantilla is not None:
+                datos['plantilla'] = {
+                    'asunto': plantilla.asunto.texto,
+                    'contenido': plantilla.contenido.texto,
+                    'variables_remitente': plantilla.variables_remitente,
+                    'campana_id': plantilla.campana_id
+                }
+                if campana_id is None:
+                    campana_id = plantilla.campana_id
+
+            self.conn.execute("""
+                INSERT INTO corridas (run_id, campana_id, estado, inicio, actualizado, total, cursor, datos)
+                VALUES (?, ?, ?, ?, ?, ?, 0, ?)
+            """, (run_id, self._clave_campana(campana_id), CORRIDA_EN_CURSO, ahora, ahora, total,
+                  json.dumps(datos, ensure_ascii=False, default=str)))
+        return run_id
+
+    def obtener_corrida(self, run_id: str) -> Optional[Dict]:
+        with self._lock:
+            fila = self.conn.execute("""
+                SELECT run_id, campana_id, estado, inicio, actualizado, total, cursor, datos
+                FROM corridas WHERE run_id = ?
+            """, (run_id,)).fetchone()
+            if fila is None:
+                return None
+            reintentos = self.conn.execute("SELECT COUNT(*) FROM destinatarios WHERE run_id = ? AND estado = ?",
+                                           (run_id, ESTADO_REINTENTO)).fetchone()[0]
+        claves = ('run_id', 'campana_id', 'estado', 'inicio', 'actualizado', 'total', 'cursor', 'datos')
+        corrida = dict(zip(claves, fila))
+        corrida['datos'] = json.loads(corrida['datos'] or '{}')
+        corrida['reintentos'] = reintentos
+        corrida['pendientes'] = corrida['total'] - corrida['cursor'] + reintentos
+        return corrida
+
+    def corridas_reanudables(self, campana_id=None) -> List[Dict]:
+        """Corridas cortadas o detenidas que aún tienen destinatarios sin enviar (o por reintentar)"""
+        consulta = """
+            SELECT run_id FROM corridas c WHERE estado IN (?, ?)
+            AND (cursor < total OR EXISTS (SELECT 1 FROM destinatarios d
+                                           WHERE d.run_id = c.run_id AND d.estado = ?))
+        """
+        parametros = [*CORRIDAS_REANUDABLES, ESTADO_REINTENTO]
+        if campana_id is not None:
+            consulta += " AND campana_id = ?"
+            parametros.append(self._clave_campana(campana_id))
+        consulta += " ORDER BY inicio DESC"
+        with self._lock:
+            filas = self.conn.execute(consulta, parametros).fetchall()
+        return [self.obtener_corrida(fila[0]) for fila in filas]
+
+    def reanudar(self, run_id: str) -> Dict:
+        """Prepara una corrida para seguir: {'corrida', 'correos', 'inciertos'} o {'error'}
+
+        Los que estaban 'enviando' al cortarse pasan a 'incierto' (pudieron
+        haberse entregado) y no se reenvían; se sigue desde el cursor.
+        """
+        corrida = self.obtener_corrida(run_id)
+        if corrida is None:
+            return {'error': f"No existe la corrida {run_id}"}
+        if corrida['estado'] not in CORRIDAS_REANUDABLES:
+            return {'error': f"La corrida {run_id} está {corrida['estado']}"}
+
+        ahora = self._ahora()
+        with self._lock, self.conn:
+            inciertos = [fila[0] for fila in self.conn.execute(
+                "SELECT posicion FROM destinatarios WHERE run_id = ? AND estado = ?", (run_id, ESTADO_ENVIANDO))]
+            for posicion in inciertos:
+                self._transicion(run_id, posicion, ESTADO_INCIERTO, ahora, 'en vuelo al cortarse')
+            self.conn.execute("UPDATE corridas SET estado = ?, actualizado = ? WHERE run_id = ?",
+                              (CORRIDA_EN_CURSO, ahora, run_id))
+
+        corrida['estado'] = CORRIDA_EN_CURSO
+        return {'corrida': corrida, 'correos': self.correos_pendientes(run_id, corrida), 'inciertos': len(inciertos)}
+
+    def correos_pendientes(self, run_id: str, corrida: Dict = None) -> CorreosDiario:
+        """Destinatarios desde el cursor, como correos listos para enviar"""
+        corrida = corrida or self.obtener_corrida(run_id)
+        plantilla = None
+        datos_plantilla = corrida['datos'].get('plantilla')
+        if datos_plantilla:
+            plantilla = PlantillaCorreo(PlantillaCompilada(datos_plantilla['asunto']),
+                                        PlantillaCompilada(datos_plantilla['contenido']),
+                                        datos_plantilla['variables_remitente'],
+                                        datos_plantilla['campana_id'])
+        with self._lock:
+            reintentos = [fila[0] for fila in self.conn.execute(
+                "SELECT posicion FROM destinatarios WHERE run_id = ? AND estado = ? ORDER BY posicion",
+                (run_id, ESTADO_REINTENTO))]
+        return CorreosDiario(self, run_id, corrida['cursor'], corrida['total'], plantilla, reintentos)
+
+    _COLUMNAS_CORREO = "posicion, indice, email, nombre, empresa, mensaje_personal, asunto, contenido"
+
+    def _filas_en(self, run_id: str, posiciones: List[int]):
+        """Filas del plan en esas posiciones (búsqueda por clave primaria)"""
+        for posicion in posiciones:
+            with self._lock:
+                fila = self.conn.execute(f"SELECT {self._COLUMNAS_CORREO} FROM destinatarios "
+                                         f"WHERE run_id = ? AND posicion = ?", (run_id, posicion)).fetchone()
+            if fila is not None:
+                yield fila
+
+    def _filas_desde(self, run_id: str, desde: int):
+        """Filas del plan desde 'desde', por páginas (búsqueda por clave primaria)"""
+        while True:
+            with self._lock:
+                filas = self.conn.execute(f"""
+                    SELECT {self._COLUMNAS_CORREO}
+                    FROM destinatarios WHERE run_id = ? AND posicion >= ?
+                    ORDER BY posicion LIMIT ?
+                """, (run_id, desde, self.TAMANO_PAGINA)).fetchall()
+            yield from filas
+            if len(filas) < self.TAMANO_PAGINA:
+                return
+            desde = filas[-1][0] + 1
+
+    def finalizar_corrida(self, run_id: str, estado: str = CORRIDA_COMPLETADA):
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE corridas SET estado = ?, actualizado = ? WHERE run_id = ?",
+                              (estado, self._ahora(), run_id))
+
+    # --- Transiciones ---------------------------------------------------------
+
+    def _transicion(self, run_id: str, posicion: int, estado: str, fecha: str, detalle: str = None):
+        self.conn.execute("INSERT INTO eventos (run_id, posicion, estado, fecha, detalle) VALUES (?, ?, ?, ?, ?)",
+                          (run_id, posicion, estado, fecha, detalle))
+        self.conn.execute("UPDATE destinatarios SET estado = ?, fecha = ?, error = ? WHERE run_id = ? AND posicion = ?",
+                          (estado, fecha, detalle if estado != ESTADO_ENVIADO else None, run_id, posicion))
+
+    def registrar_inicio(self, run_id: str, posicion: int):
+        """El destinatario en 'posicion' empieza a enviarse (avanza el cursor)"""
+        ahora = self._ahora()
+        with self._lock, self.conn:
+            self._transicion(run_id, posicion, ESTADO_ENVIANDO, ahora)
+            self.conn.execute("UPDATE corridas SET cursor = MAX(cursor, ?), actualizado = ? WHERE run_id = ?",
+                              (posicion + 1, ahora, run_id))
+
+    def registrar_resultado(self, run_id: str, posicion: int, exitoso: bool, error: str = None):
+        with self._lock, self.conn:
+            self._transicion(run_id, posicion, ESTADO_ENVIADO if exitoso else ESTADO_FALLIDO,
+                             self._ahora(), None if exitoso else (error or 'Error desconocido'))
+
+    def registrar_reintento(self, run_id: str, posicion: int, error: str = None):
+        """Fallo transitorio en espera de reintento: no se entregó, así que al reanudar se reenvía"""
+        with self._lock, self.conn:
+            self._transicion(run_id, posicion, ESTADO_REINTENTO, self._ahora(), error or 'Error transitorio')
+
+    # --- Consultas ------------------------------------------------------------
+
+    def conteo_estados(self, run_id: str) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.conn.execute(
+                "SELECT estado, COUNT(*) FROM destinatarios WHERE run_id = ? GROUP BY estado", (run_id,)).fetchall())
+
+    def destinatarios_en_estado(self, run_id: str, estado: str) -> List[Dict]:
+        """Destinatarios de la corrida en un estado (p. ej. fallidos para reintentar)"""
+        with self._lock:
+            filas = self.conn.execute("""
+                SELECT posicion, email, nombre, empresa, fecha, error FROM destinatarios
+                WHERE run_id = ? AND estado = ? ORDER BY posicion
+            """, (run_id, estado)).fetchall()
+        claves = ('posicion', 'email', 'nombre', 'empresa', 'fecha', 'error')
+        return [dict(zip(claves, fila)) for fila in filas]
+
+    def obtener_resumen(self, run_id: str = None) -> str:
+        """Resumen legible de una corrida (o de las corridas reanudables)"""
+        resumen = "📒 DIARIO DE ENVÍOS:\n"
+        resumen += "=" * 30 + "\n"
+        resumen += f"📁 Archivo: {self.db_path}\n"
+
+        corridas = [self.obtener_corrida(run_id)] if run_id else self.corridas_reanudables()
+        if not corridas or corridas[0] is None:
+            return resumen + "✅ Sin corridas pendientes\n"
+
+        for corrida in corridas:
+            conteo = self.conteo_estados(corrida['run_id'])
+            resumen += (f"🧾 {corrida['run_id']} (campaña {corrida['campana_id']}, {corrida['estado']}): "
+                        f"{corrida['cursor']}/{corrida['total']} iniciados | "
+                        f"✅ {conteo.get(ESTADO_ENVIADO, 0)} ❌ {conteo.get(ESTADO_FALLIDO, 0)} "
+                        f"🔁 {conteo.get(ESTADO_REINTENTO, 0)} "
+                        f"❔ {conteo.get(ESTADO_INCIERTO, 0) + conteo.get(ESTADO_ENVIANDO, 0)}\n")
+        return resumen
+
+
+# Función de prueba: python send_journal.py [RUN_ID]
+if __name__ == "__main__":
+    with DiarioEnvios() as diario:
+        print(diario.obtener_resumen(sys.argv[1] if len(sys.argv) > 1 else None))
@@ -0,0 +1,143 @@
+import os
+import sqlite3
+import sys
+from datetime import datetime
+from typing import Dict, Iterable, List, Set
+
+import pandas as pd
+
+from email_validation import normalizar_emails
+
+
+class HistorialEnvios:
+    """Registro persistente de envíos exitosos por (campaña, email normalizado)
+
+    La clave primaria compuesta hace que saber si un email ya recibió una
+    campaña sea una búsqueda en índice, sin releer los CSV de reportes/,
+    aunque el historial tenga millones de filas.
+    """
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS envios (
+            campana_id TEXT NOT NULL,
+            email_normalizado TEXT NOT NULL,
+            fecha TEXT NOT NULL,
+            PRIMARY KEY (campana_id, email_normalizado)
+        ) WITHOUT ROWID;
+    """
+
+    # Parámetros por consulta IN (...) (por debajo del límite de SQLite)
+    TAMANO_CONSULTA = 900
+
+    def __init__(self, db_path: str = os.path.join("data", "historial_envios.db")):
+        self.db_path = db_path
+        carpeta = os.path.dirname(db_path)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.ESQUEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cerrar()
+
+    def cerrar(self):
+        """Cerrar la conexión"""
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def clave_campana(campana_id) -> str:
+        """ID de campaña como texto estable (el 1.0 que a veces entrega pandas -> '1')"""
+        if isinstance(campana_id, float) and campana_id.is_integer():
+            campana_id = int(campana_id)
+        return str(campana_id).strip()
+
+    def registrar(self, campana_id, email: str, fecha: datetime = None):
+        """Registra un envío exitoso (se llama tras cada correo enviado)"""
+        self.registrar_lote(campana_id, [email], fecha)
+
+    def registrar_lote(self, campana_id, emails: Iterable[str], fecha: datetime = None) -> int:
+        """Registra varios envíos exitosos de una campaña (se conserva la primera fecha)"""
+        fecha_txt = (fecha or datetime.now()).isoformat(timespec='seconds')
+        campana_txt = self.clave_campana(campana_id)
+        normalizados = [email for email in normalizar_emails(emails).tolist() if email]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO envios (campana_id, email_normalizado, fecha) VALUES (?, ?, ?)",
+                ((campana_txt, email, fecha_txt) for email in normalizados)
+            )
+        return len(normalizados)
+
+    def ya_enviados(self, campana_id, emails_normalizados: List[str]) -> Set[str]:
+        """Cuáles de estos emails (ya normalizados) recibieron la campaña"""
+        campana_txt = self.clave_campana(campana_id)
+        enviados = set()
+        for inicio in range(0, len(emails_normalizados), self.TAMANO_CONSULTA):
+            lote = emails_normalizados[inicio:inicio + self.TAMANO_CONSULTA]
+            marcadores = ','.join('?' * len(lote))
+            enviados.update(fila[0] for fila in self.conn.execute(
+                f"SELECT email_normalizado FROM envios "
+                f"WHERE campana_id = ? AND email_normalizado IN ({marcadores})",
+                [campana_txt, *lote]
+            ))
+        return enviados
+
+    def fue_enviado(self, campana_id, email: str) -> bool:
+        email_normalizado = normalizar_emails([email])[0]
+        return email_normalizado in self.ya_enviados(campana_id, [email_normalizado])
+
+    def contar(self, campana_id=None) -> int:
+        if campana_id is None:
+            return self.conn.execute("SELECT COUNT(*) FROM envios").fetchone()[0]
+        return self.conn.execute("SELECT COUNT(*) FROM envios WHERE campana_id = ?",
+                                 (self.clave_campana(campana_id),)).fetchone()[0]
+
+    def importar_csv_exitosos(self, ruta: str, campana_id) -> Dict:
+        """Carga un *_EXITOSOS.csv de reportes/ (envíos anteriores al historial)"""
+        try:
+            df = pd.read_csv(ruta, dtype=str, keep_default_na=False, encoding='utf-8')
+            if 'Email' not in df.columns:
+                return {'error': f"{os.path.basename(ruta)} no tiene columna 'Email'"}
+
+            antes = self.contar(campana_id)
+            # Conservar la hora de envío original cuando se puede interpretar
+            fechas = pd.to_datetime(df.get('Hora_Envio', pd.Series('', index=df.index)), errors='coerce')
+            for fecha, grupo in df['Email'].groupby(fechas.dt.floor('s'), dropna=False):
+                self.registrar_lote(campana_id, grupo.tolist(),
+                                    None if pd.isna(fecha) else fecha.to_pydatetime())
+        except Exception as e:
+            return {'error': f"Error importando {os.path.basename(ruta)}: {str(e)}"}
+
+        return {'leidos': len(df), 'nuevos': self.contar(campana_id) - antes}
+
+    def obtener_resumen(self) -> str:
+        """Resumen legible del historial"""
+        por_campana = self.conn.execute(
+            "SELECT campana_id, COUNT(*), MAX(fecha) FROM envios GROUP BY campana_id ORDER BY campana_id"
+        ).fetchall()
+
+        resumen = "📜 HISTORIAL DE ENVÍOS:\n"
+        resumen += "=" * 30 + "\n"
+        resumen += f"📁 Archivo: {self.db_path}\n"
+        resumen += f"📧 Total envíos registrados: {sum(fila[1] for fila in por_campana)}\n"
+        for campana_id, cantidad, ultimo in por_campana:
+            resumen += f"   • Campaña {campana_id}: {cantidad} (último: {ultimo})\n"
+        return resumen
+
+
+# Función de prueba / importación manual:
+#   python sent_history.py reportes/..._EXITOSOS.csv ID_CAMPAÑA
+if __name__ == "__main__":
+    with HistorialEnvios() as historial:
+        if len(sys.argv) > 2:
+            print(f"📥 Importando {sys.argv[1]} (campaña {sys.argv[2]})...")
+            print(f"   Resultado: {historial.importar_csv_exitosos(sys.argv[1], sys.argv[2])}")
+        print(historial.obtener_resumen())
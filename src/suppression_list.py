@@ -0,0 +1,175 @@
+import os
+import sqlite3
+import sys
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from contact_sources import normalizar_columnas
+from email_validation import normalizar_emails
+
+# Motivos de supresión
+MOTIVO_BAJA = 'baja'
+MOTIVO_REBOTE = 'rebote'
+MOTIVO_LISTA_NEGRA = 'lista_negra'
+
+MOTIVOS_SUPRESION = (MOTIVO_BAJA, MOTIVO_REBOTE, MOTIVO_LISTA_NEGRA)
+
+
+class ListaSupresion:
+    """Emails que nunca deben recibir correos (bajas, rebotes, lista negra)
+
+    Índice persistente en SQLite: el email normalizado es la clave primaria,
+    así cada consulta es una búsqueda en el índice (O(log n)). Las consultas
+    se hacen por lotes con buscar() para filtrar listas grandes.
+    """
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS supresiones (
+            email_normalizado TEXT PRIMARY KEY,
+            motivo TEXT NOT NULL,
+            origen TEXT NOT NULL DEFAULT '',
+            fecha TEXT NOT NULL
+        ) WITHOUT ROWID;
+    """
+
+    # Parámetros por consulta IN (...) (por debajo del límite de SQLite)
+    TAMANO_CONSULTA = 900
+
+    def __init__(self, db_path: str = os.path.join("data", "supresion.db")):
+        self.db_path = db_path
+        carpeta = os.path.dirname(db_path)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.ESQUEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cerrar()
+
+    def cerrar(self):
+        """Cerrar la conexión"""
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+    def agregar(self, emails: Iterable[str], motivo: str = MOTIVO_BAJA, origen: str = '') -> int:
+        """Suprime una lista de emails (si ya estaban, se actualiza motivo y fecha)"""
+        if motivo not in MOTIVOS_SUPRESION:
+            raise ValueError(f"Motivo de supresión desconocido: {motivo}")
+
+        normalizados = [email for email in normalizar_emails(emails).tolist() if '@' in email]
+        ahora = datetime.now().isoformat(timespec='seconds')
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO supresiones (email_normalizado, motivo, origen, fecha)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(email_normalizado) DO UPDATE SET
+                    motivo = excluded.motivo,
+                    origen = excluded.origen,
+                    fecha = excluded.fecha
+            """, ((email, motivo, origen, ahora) for email in normalizados))
+        return len(normalizados)
+
+    def importar(self, ruta: str, motivo: str = MOTIVO_BAJA) -> Dict:
+        """Importa emails desde un CSV o xlsx (columna 'Email'; 'Motivo' opcional por fila)"""
+        try:
+            extension = os.path.splitext(ruta)[1].lower()
+            if extension in ('.xlsx', '.xlsm'):
+                df = pd.read_excel(ruta, dtype=str)
+            elif extension in ('.csv', '.txt'):
+                df = pd.read_csv(ruta, dtype=str, keep_default_na=False, sep=None,
+                                 engine='python', encoding='utf-8-sig')
+            else:
+                return {'error': f"Formato de lista de supresión no soportado: {ruta}"}
+
+            df = normalizar_columnas(df)
+            if 'Email' not in df.columns:
+                return {'error': f"{os.path.basename(ruta)} no tiene columna 'Email'"}
+
+            # Motivo por fila si el archivo lo trae; si no, el indicado
+            if 'Motivo' in df.columns:
+                motivos = df['Motivo'].fillna('').str.strip().str.lower()
+                motivos = motivos.where(motivos.isin(MOTIVOS_SUPRESION), motivo)
+            else:
+                motivos = pd.Series(motivo, index=df.index)
+
+            origen = os.path.basename(ruta)
+            importados = {}
+            for motivo_fila, grupo in df['Email'].groupby(motivos):
+                importados[motivo_fila] = self.agregar(grupo.tolist(), motivo_fila, origen)
+
+        except Exception as e:
+            return {'error': f"Error importando lista de supresión: {str(e)}"}
+
+        return {
+            'importados': sum(importados.values()),
+            'por_motivo': importados,
+            'total': self.contar()
+        }
+
+    def eliminar(self, emails: Iterable[str]) -> int:
+        """Quita emails de la lista (p. ej. un contacto que vuelve a suscribirse)"""
+        with self.conn:
+            cursor = self.conn.executemany(
+                "DELETE FROM supresiones WHERE email_normalizado = ?",
+                ((email,) for email in normalizar_emails(emails).tolist())
+            )
+        return cursor.rowcount
+
+    def buscar(self, emails_normalizados: List[str]) -> Dict[str, str]:
+        """Emails suprimidos de la lista dada -> motivo (espera emails ya normalizados)"""
+        encontrados = {}
+        for inicio in range(0, len(emails_normalizados), self.TAMANO_CONSULTA):
+            lote = emails_normalizados[inicio:inicio + self.TAMANO_CONSULTA]
+            marcadores = ','.join('?' * len(lote))
+            encontrados.update(self.conn.execute(
+                f"SELECT email_normalizado, motivo FROM supresiones WHERE email_normalizado IN ({marcadores})",
+                lote
+            ).fetchall())
+        return encontrados
+
+    def motivo(self, email: str) -> Optional[str]:
+        """Motivo de supresión de un email, o None si puede recibir correos"""
+        email_normalizado = normalizar_emails([email])[0]
+        return self.buscar([email_normalizado]).get(email_normalizado)
+
+    def contar(self, motivo: str = None) -> int:
+        if motivo is None:
+            return self.conn.execute("SELECT COUNT(*) FROM supresiones").fetchone()[0]
+        return self.conn.execute("SELECT COUNT(*) FROM supresiones WHERE motivo = ?", (motivo,)).fetchone()[0]
+
+    def conteo_por_motivo(self) -> Dict[str, int]:
+        return dict(self.conn.execute("SELECT motivo, COUNT(*) FROM supresiones GROUP BY motivo").fetchall())
+
+    def obtener_resumen(self) -> str:
+        """Resumen legible de la lista de supresión"""
+        por_motivo = self.conteo_por_motivo()
+
+        resumen = "🚫 LISTA DE SUPRESIÓN:\n"
+        resumen += "=" * 30 + "\n"
+        resumen += f"📁 Archivo: {self.db_path}\n"
+        resumen += f"📧 Total suprimidos: {sum(por_motivo.values())}\n"
+        for i, motivo in enumerate(MOTIVOS_SUPRESION):
+            rama = "└─" if i == len(MOTIVOS_SUPRESION) - 1 else "├─"
+            resumen += f"   {rama} {motivo}: {por_motivo.get(motivo, 0)}\n"
+        return resumen
+
+
+# Función de prueba / importación manual:
+#   python suppression_list.py archivo.xlsx|archivo.csv [baja|rebote|lista_negra]
+if __name__ == "__main__":
+    with ListaSupresion() as lista:
+        if len(sys.argv) > 1:
+            motivo = sys.argv[2] if len(sys.argv) > 2 else MOTIVO_BAJA
+            print(f"📥 Importando {sys.argv[1]} ({motivo})...")
+            print(f"   Resultado: {lista.importar(sys.argv[1], motivo)}")
+        print(lista.obtener_resumen())
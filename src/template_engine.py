@@ -0,0 +1,115 @@
+import hashlib
+import re
+import threading
+from typing import Dict, List, Tuple
+
+# Marcadores soportados en asunto y contenido de las campañas
+VARIABLES_CONOCIDAS = (
+    'NOMBRE',
+    'EMPRESA',
+    'MENSAJE_PERSONAL',
+    'REMITENTE_NOMBRE',
+    'REMITENTE_EMAIL',
+    'EMPRESA_REMITENTE'
+)
+
+# {NOMBRE}, {EMPRESA}... (solo mayúsculas, así no choca con llaves de CSS/HTML)
+PATRON_MARCADOR = re.compile(r'\{([A-Z][A-Z0-9_]*)\}')
+
+
+def hash_plantilla(texto: str) -> str:
+    """SHA-256 del contenido de una plantilla (clave de caché)"""
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+class PlantillaCompilada:
+    """Plantilla parseada una sola vez en segmentos literales y huecos
+
+    Renderizar un destinatario es rellenar los huecos y hacer un único
+    ''.join, en lugar de un str.replace completo por cada variable.
+    """
+
+    __slots__ = ('texto', 'hash', '_partes', '_huecos', 'variables', 'desconocidas')
+
+    def __init__(self, texto: str, variables_conocidas=VARIABLES_CONOCIDAS, hash_texto: str = None):
+        self.texto = texto
+        self.hash = hash_texto or hash_plantilla(texto)
+
+        partes: List[str] = []
+        huecos: List[Tuple[int, str]] = []
+        desconocidas: List[str] = []
+        conocidas = set(variables_conocidas)
+        literal = []
+        inicio = 0
+
+        for coincidencia in PATRON_MARCADOR.finditer(texto):
+            variable = coincidencia.group(1)
+            literal.append(texto[inicio:coincidencia.start()])
+            inicio = coincidencia.end()
+
+            if variable in conocidas:
+                partes.append(''.join(literal))
+                literal = []
+                huecos.append((len(partes), variable))
+                partes.append('')
+            else:
+                # Marcador desconocido: se deja tal cual en el texto
+                literal.append(coincidencia.group(0))
+                if variable not in desconocidas:
+                    desconocidas.append(variable)
+
+        literal.append(texto[inicio:])
+        partes.append(''.join(literal))
+
+        self._partes = partes
+        self._huecos = tuple(huecos)
+        self.variables = frozenset(variable for _, variable in huecos)
+        self.desconocidas = tuple(desconocidas)
+
+    @property
+    def tiene_marcadores(self) -> bool:
+        return bool(self._huecos)
+
+    def render(self, valores: Dict[str, str]) -> str:
+        """Rellena los huecos con los valores (deben ser str) y une el resultado"""
+        if not self._huecos:
+            return self.texto
+        partes = self._partes.copy()
+        for posicion, variable in self._huecos:
+            partes[posicion] = valores.get(variable, '')
+        return ''.join(partes)
+
+
+class CachePlantillas:
+    """Plantillas compiladas indexadas por hash de contenido (acotada, thread-safe)"""
+
+    def __init__(self, max_entradas: int = 64):
+        self.max_entradas = max_entradas
+        self._plantillas: Dict[str, PlantillaCompilada] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def obtener(self, texto: str) -> PlantillaCompilada:
+        """Devuelve la plantilla compilada, compilándola (y avisando de marcadores
+        desconocidos) solo la primera vez que se ve ese contenido"""
+        clave = hash_plantilla(texto)
+
+        with self._lock:
+            plantilla = self._plantillas.get(clave)
+            if plantilla is not None:
+                self.hits += 1
+                return plantilla
+
+        plantilla = PlantillaCompilada(texto, hash_texto=clave)
+        if plantilla.desconocidas:
+            marcadores = ', '.join('{' + v + '}' for v in plantilla.desconocidas)
+            print(f"⚠️  Marcadores desconocidos en plantilla (se dejan sin reemplazar): {marcadores}")
+
+        with self._lock:
+            self.misses += 1
+            if len(self._plantillas) >= self.max_entradas:
+                # Descartar la más antigua (orden de inserción)
+                self._plantillas.pop(next(iter(self._plantillas)))
+            self._plantillas[clave] = plantilla
+        return plantilla
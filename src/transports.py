@@ -0,0 +1,556 @@
+import mimetypes
+import os
+import queue
+import smtplib
+import socket
+import socketserver
+import threading
+import time
+from abc import ABC, abstractmethod
+from email.message import EmailMessage
+from email.utils import formataddr, make_msgid
+from typing import Dict, List, Optional
+
+from attachment_cache import CacheAdjuntos
+from message_builder import ConstructorMensajes, preparar_cuerpo
+from retry_policy import EnvioIncierto
+
+# Outlook (COM) solo existe en Windows con pywin32 instalado
+try:
+    import pythoncom
+    import win32com.client
+except ImportError:
+    pythoncom = None
+    win32com = None
+
+
+class TransporteCorreo(ABC):
+    """Interfaz de envío: SmartEmailSender usa el transporte configurado
+
+    enviar() recibe el correo ya renderizado (email, asunto, contenido) y
+    devuelve cuántos adjuntos se agregaron; los errores se lanzan como
+    excepciones para que el sender los registre como fallidos.
+    """
+
+    tipo = 'base'
+
+    def __init__(self):
+        self.conectado = False
+
+    @abstractmethod
+    def conectar(self) -> Dict:
+        """{'exitoso': bool, 'mensaje': str, 'cuenta': str, ...}"""
+
+    @abstractmethod
+    def enviar(self, correo: Dict, adjuntos: List[str] = None) -> int:
+        """Envía un correo: adjuntos agregados (lanza excepción si falla)"""
+
+    def max_simultaneos(self) -> int:
+        """Cuántos envíos admite a la vez (MotorEnvioAsync no usa más)"""
+        return 1
+
+    def iniciar_hilo(self):
+        """Preparar el hilo que va a enviar (p. ej. inicializar COM)"""
+
+    def finalizar_hilo(self):
+        """Liberar lo preparado en iniciar_hilo"""
+
+    def cerrar(self):
+        """Cerrar conexiones abiertas"""
+        self.conectado = False
+
+    def liberar_adjuntos(self, adjuntos: CacheAdjuntos):
+        """Soltar lo que se haya guardado de los adjuntos de una corrida que terminó"""
+
+    def describir(self) -> str:
+        return self.tipo
+
+    def firma(self) -> tuple:
+        """Identifica la configuración del transporte (para saber si cambió)"""
+        return (self.tipo,)
+
+
+class TransporteOutlook(TransporteCorreo):
+    """Envío a través de Outlook por COM (solo Windows)
+
+    Un objeto COM solo sirve en el hilo (apartamento) donde se creó: 'outlook'
+    es el del hilo que conectó, y cada hilo que envía (iniciar_hilo /
+    finalizar_hilo) obtiene el suyo. Outlook envía de a un correo a la vez.
+    """
+
+    tipo = 'outlook'
+
+    def __init__(self, logger=None):
+        super().__init__()
+        self.outlook = None
+        self.cuenta = ''
+        self.logger = logger
+        self._hilo_conexion = None
+        self._por_hilo = threading.local()
+
+    def _log(self, mensaje: str):
+        if self.logger:
+            self.logger.info(mensaje)
+
+    def conectar(self) -> Dict:
+        if win32com is None:
+            self.conectado = False
+            return {
+                'exitoso': False,
+                'mensaje': 'Outlook no disponible: falta pywin32 (win32com) o no es Windows'
+            }
+
+        pythoncom.CoInitialize()
+
+        self.outlook = self._obtener_outlook(avisar=True)
+        self._hilo_conexion = threading.get_ident()
+
+        namespace = self.outlook.GetNamespace("MAPI")
+        namespace.GetDefaultFolder(6)
+
+        accounts = namespace.Accounts
+        if accounts.Count == 0:
+            raise Exception("No hay cuentas configuradas en Outlook")
+
+        cuenta_principal = accounts.Item(1)
+        self.cuenta = getattr(cuenta_principal, 'SmtpAddress', cuenta_principal.DisplayName)
+        self.conectado = True
+
+        return {
+            'exitoso': True,
+            'mensaje': f'Conectado a Outlook correctamente',
+            'cuenta': self.cuenta,
+            'total_cuentas': accounts.Count
+        }
+
+    def _obtener_outlook(self, avisar: bool = False):
+        """Outlook.Application para el hilo actual (COM ya inicializado)"""
+        try:
+            outlook = win32com.client.GetActiveObject("Outlook.Application")
+            if avisar:
+                self._log("✅ Conectado a instancia existente")
+        except Exception:
+            outlook = win32com.client.Dispatch("Outlook.Application")
+            if avisar:
+                self._log("✅ Nueva instancia creada")
+        return outlook
+
+    def _outlook_del_hilo(self):
+        """El objeto Outlook usable desde este hilo (el de conectar() solo en su hilo)"""
+        if threading.get_ident() == self._hilo_conexion:
+            return self.outlook
+        outlook = getattr(self._por_hilo, 'outlook', None)
+        if outlook is None:
+            outlook = self._por_hilo.outlook = self._obtener_outlook()
+        return outlook
+
+    def enviar(self, correo: Dict, adjuntos: List[str] = None) -> int:
+        mail = self._outlook_del_hilo().CreateItem(0)
+        mail.To = correo['email'].strip()
+        mail.Subject = correo['asunto'].strip()
+
+        es_html, cuerpo = preparar_cuerpo(correo['contenido'])
+        if es_html:
+            mail.HTMLBody = cuerpo
+        else:
+            mail.Body = cuerpo
+
+        adjuntos_agregados = 0
+        for ruta_adjunto in adjuntos or []:
+            if os.path.exists(ruta_adjunto):
+                try:
+                    mail.Attachments.Add(ruta_adjunto)
+                    adjuntos_agregados += 1
+                    self._log(f"📎 Adjunto: {os.path.basename(ruta_adjunto)}")
+                except Exception as attach_error:
+                    if self.logger:
+                        self.logger.warning(f"⚠️ No se pudo adjuntar {ruta_adjunto}: {attach_error}")
+
+        mail.Send()
+        return adjuntos_agregados
+
+    def iniciar_hilo(self):
+        if pythoncom is not None:
+            pythoncom.CoInitialize()
+            self._por_hilo.nivel = getattr(self._por_hilo, 'nivel', 0) + 1
+
+    def finalizar_hilo(self):
+        if pythoncom is not None:
+            # El objeto del hilo se suelta antes de cerrar su apartamento COM
+            self._por_hilo.nivel = getattr(self._por_hilo, 'nivel', 1) - 1
+            if self._por_hilo.nivel <= 0:
+                self._por_hilo.outlook = None
+            try:
+                pythoncom.CoUninitialize()
+            except Exception:
+                pass
+
+    def describir(self) -> str:
+        return f"Outlook ({self.cuenta or 'sin conectar'})"
+
+
+class _ConexionSMTP:
+    """Conexión SMTP autenticada del pool + momento de su último uso
+
+    'transaccion' se activa cuando el envío en curso ya pasó MAIL FROM: desde
+    ahí un corte pudo haber entregado el mensaje.
+    """
+
+    __slots__ = ('smtp', 'ultimo_uso', 'transaccion')
+
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.ultimo_uso = time.monotonic()
+        self.transaccion = False
+
+        mail = smtp.mail
+
+        def mail_marcado(*args, **kwargs):
+            respuesta = mail(*args, **kwargs)
+            self.transaccion = True
+            return respuesta
+
+        # sendmail / send_message llaman a self.mail: así se sabe en qué etapa se cortó
+        smtp.mail = mail_marcado
+
+
+class TransporteSMTP(TransporteCorreo):
+    """Envío por SMTP con un pool de conexiones autenticadas reutilizadas
+
+    Cada conexión se reutiliza entre correos; si estuvo inactiva más de
+    'keepalive' segundos se comprueba con NOOP antes de usarla, y si el
+    servidor la cerró antes de aceptar MAIL FROM se reconecta y se reintenta
+    el envío una vez. Un corte más adelante (RCPT / DATA) no se reenvía: el
+    mensaje pudo haber llegado, y se informa como EnvioIncierto.
+    """
+
+    tipo = 'smtp'
+
+    SEGURIDAD_STARTTLS = 'STARTTLS'
+    SEGURIDAD_SSL = 'SSL'
+    SEGURIDAD_NINGUNA = 'NINGUNA'
+
+    def __init__(self, servidor: str, puerto: int = 587, usuario: str = '', password: str = '',
+                 remitente: str = '', nombre_remitente: str = '', seguridad: str = SEGURIDAD_STARTTLS,
+                 conexiones: int = 2, keepalive: float = 30.0, timeout: float = 30.0, logger=None):
+        super().__init__()
+        self.servidor = servidor
+        self.puerto = int(puerto)
+        self.usuario = usuario
+        self.password = password
+        self.remitente = remitente or usuario
+        self.nombre_remitente = nombre_remitente
+        self.seguridad = (seguridad or self.SEGURIDAD_NINGUNA).upper()
+        self.conexiones = max(1, int(conexiones))
+        self.keepalive = keepalive
+        self.timeout = timeout
+        self.logger = logger
+
+        self._pool: "queue.LifoQueue[_ConexionSMTP]" = queue.LifoQueue()
+        self._abiertas = 0
+        self._lock = threading.Lock()
+        self.reconexiones = 0
+        # Esqueleto MIME por campaña: cada correo solo rellena sus campos
+        self.constructor = ConstructorMensajes(self.remitente, self.nombre_remitente)
+
+    def _log(self, mensaje: str):
+        if self.logger:
+            self.logger.info(mensaje)
+
+    def _abrir(self) -> _ConexionSMTP:
+        """Nueva conexión SMTP (TLS y login según configuración)"""
+        if self.seguridad == self.SEGURIDAD_SSL:
+            smtp = smtplib.SMTP_SSL(self.servidor, self.puerto, timeout=self.timeout)
+        else:
+            smtp = smtplib.SMTP(self.servidor, self.puerto, timeout=self.timeout)
+            if self.seguridad == self.SEGURIDAD_STARTTLS:
+                smtp.starttls()
+        if self.usuario and self.password:
+            smtp.login(self.usuario, self.password)
+        return _ConexionSMTP(smtp)
+
+    @staticmethod
+    def _cerrar_conexion(conexion: _ConexionSMTP):
+        try:
+            conexion.smtp.quit()
+        except Exception:
+            try:
+                conexion.smtp.close()
+            except Exception:
+                pass
+
+    def _tomar(self) -> _ConexionSMTP:
+        """Conexión del pool (o una nueva si el pool no llegó a su tamaño)"""
+        while True:
+            try:
+                conexion = self._pool.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    crear = self._abiertas < self.conexiones
+                    if crear:
+                        self._abiertas += 1
+                if crear:
+                    try:
+                        return self._abrir()
+                    except Exception:
+                        with self._lock:
+                            self._abiertas -= 1
+                        raise
+                conexion = self._pool.get(timeout=self.timeout)
+
+            # Keepalive: las conexiones inactivas se verifican antes de usarlas
+            if time.monotonic() - conexion.ultimo_uso < self.keepalive or self._sigue_viva(conexion):
+                return conexion
+            self._descartar(conexion)
+
+    def _devolver(self, conexion: _ConexionSMTP):
+        conexion.ultimo_uso = time.monotonic()
+        self._pool.put(conexion)
+
+    def _descartar(self, conexion: _ConexionSMTP):
+        self._cerrar_conexion(conexion)
+        with self._lock:
+            self._abiertas -= 1
+
+    @staticmethod
+    def _sigue_viva(conexion: _ConexionSMTP) -> bool:
+        try:
+            return conexion.smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    def conectar(self) -> Dict:
+        """Abre (y deja en el pool) una conexión para validar servidor y credenciales"""
+        try:
+            self._devolver(self._tomar())
+        except Exception:
+            self.conectado = False
+            raise
+        self.conectado = True
+        return {
+            'exitoso': True,
+            'mensaje': f'Conectado a {self.servidor}:{self.puerto} por SMTP',
+            'cuenta': self.remitente,
+            'total_cuentas': 1
+        }
+
+    def construir_mensaje(self, correo: Dict, adjuntos: List[str] = None):
+        """EmailMessage listo para enviar + cantidad de adjuntos agregados"""
+        mensaje = EmailMessage()
+        mensaje['From'] = formataddr((self.nombre_remitente, self.remitente)) if self.nombre_remitente else self.remitente
+        mensaje['To'] = correo['email'].strip()
+        mensaje['Subject'] = correo['asunto'].strip()
+        mensaje['Message-ID'] = make_msgid(domain=self.remitente.rpartition('@')[2] or None)
+
+        es_html, cuerpo = preparar_cuerpo(correo['contenido'])
+        mensaje.set_content(cuerpo, subtype='html' if es_html else 'plain')
+
+        # Adjuntos de la corrida ya codificados: se comparten, sin leer ni codificar de nuevo
+        if isinstance(adjuntos, CacheAdjuntos):
+            partes = adjuntos.partes_mime()
+            if partes:
+                mensaje.make_mixed()
+                for parte in partes:
+                    mensaje.attach(parte)
+            return mensaje, len(partes)
+
+        adjuntos_agregados = 0
+        for ruta_adjunto in adjuntos or []:
+            if not os.path.exists(ruta_adjunto):
+                continue
+            tipo, _ = mimetypes.guess_type(ruta_adjunto)
+            principal, secundario = (tipo or 'application/octet-stream').split('/', 1)
+            with open(ruta_adjunto, 'rb') as f:
+                mensaje.add_attachment(f.read(), maintype=principal, subtype=secundario,
+                                       filename=os.path.basename(ruta_adjunto))
+            adjuntos_agregados += 1
+        return mensaje, adjuntos_agregados
+
+    def enviar(self, correo: Dict, adjuntos: List[str] = None) -> int:
+        if ConstructorMensajes.admite(correo, adjuntos):
+            datos, adjuntos_agregados = self.constructor.construir(correo, adjuntos)
+            entregar = lambda smtp: smtp.sendmail(self.remitente, [correo['email'].strip()], datos)
+        else:
+            mensaje, adjuntos_agregados = self.construir_mensaje(correo, adjuntos)
+            entregar = lambda smtp: smtp.send_message(mensaje)
+
+        for intento in range(2):
+            conexion = self._tomar()
+            conexion.transaccion = False
+            try:
+                entregar(conexion.smtp)
+            except (smtplib.SMTPServerDisconnected, ConnectionError, socket.timeout, OSError) as e:
+                self._descartar(conexion)
+                if conexion.transaccion:
+                    raise EnvioIncierto(f"Conexión SMTP cortada durante el envío, pudo haberse entregado: {e}") from e
+                # Conexión caída antes de empezar: reintentar una vez con otra nueva
+                if intento:
+                    raise
+                self.reconexiones += 1
+                self._log(f"🔄 Conexión SMTP perdida ({e}), reconectando...")
+                continue
+            except smtplib.SMTPException:
+                # Rechazo del servidor (destinatario, contenido...): la conexión sirve
+                self._devolver(conexion)
+                raise
+            except Exception:
+                self._descartar(conexion)
+                raise
+            self._devolver(conexion)
+            return adjuntos_agregados
+
+    def max_simultaneos(self) -> int:
+        # Una conexión del pool por envío en vuelo
+        return self.conexiones
+
+    def cerrar(self):
+        while True:
+            try:
+                self._descartar(self._pool.get_nowait())
+            except queue.Empty:
+                break
+        self.conectado = False
+
+    def liberar_adjuntos(self, adjuntos: CacheAdjuntos):
+        self.constructor.liberar(adjuntos)
+
+    def describir(self) -> str:
+        return f"SMTP {self.servidor}:{self.puerto} ({self.conexiones} conexiones, {self.remitente})"
+
+    def firma(self) -> tuple:
+        return (self.tipo, self.servidor, self.puerto, self.usuario, self.password,
+                self.remitente, self.nombre_remitente, self.seguridad, self.conexiones)
+
+
+def crear_transporte(config: Optional[Dict] = None, logger=None) -> TransporteCorreo:
+    """Transporte según CONFIGURACION.xlsx: Transporte = Outlook (defecto) o SMTP
+
+    Campos SMTP: SMTP_Servidor, SMTP_Puerto, SMTP_Usuario, SMTP_Password (o la
+    variable de entorno EMAIL_SMTP_PASSWORD), SMTP_Seguridad (STARTTLS, SSL o
+    NINGUNA) y SMTP_Conexiones. El remitente es Tu_Email / Tu_Nombre.
+    """
+    config = config or {}
+    if str(config.get('Transporte', 'Outlook')).strip().upper() != 'SMTP':
+        return TransporteOutlook(logger=logger)
+
+    def valor(campo, defecto=''):
+        dato = config.get(campo, defecto)
+        return defecto if dato is None or str(dato).strip() in ('', 'nan') else dato
+
+    return TransporteSMTP(
+        servidor=str(valor('SMTP_Servidor', 'localhost')).strip(),
+        puerto=int(float(valor('SMTP_Puerto', 587))),
+        usuario=str(valor('SMTP_Usuario')).strip(),
+        password=str(valor('SMTP_Password', os.environ.get('EMAIL_SMTP_PASSWORD', ''))),
+        remitente=str(valor('Tu_Email')).strip(),
+        nombre_remitente=str(valor('Tu_Nombre')).strip(),
+        seguridad=str(valor('SMTP_Seguridad', TransporteSMTP.SEGURIDAD_STARTTLS)),
+        conexiones=int(float(valor('SMTP_Conexiones', 2))),
+        logger=logger
+    )
+
+
+class _ManejadorSMTPPrueba(socketserver.StreamRequestHandler):
+    """Sesión SMTP mínima: acepta todo y cuenta los mensajes recibidos"""
+
+    def _responder(self, linea: str):
+        self.wfile.write((linea + '\r\n').encode('ascii'))
+
+    def handle(self):
+        servidor = self.server.servidor_prueba
+        self._responder('220 localhost servidor SMTP de prueba')
+
+        while True:
+            linea = self.rfile.readline()
+            if not linea:
+                return
+            comando = linea.decode('utf-8', 'replace').strip()
+            verbo = comando[:4].upper()
+
+            if verbo == 'EHLO':
+                self._responder('250-localhost')
+                self._responder('250 8BITMIME')
+            elif verbo in ('HELO', 'MAIL', 'RCPT', 'RSET', 'NOOP'):
+                self._responder('250 OK')
+            elif verbo == 'DATA':
+                self._responder('354 Fin con <CRLF>.<CRLF>')
+                tamano = 0
+                while True:
+                    dato = self.rfile.readline()
+                    if not dato or dato in (b'.\r\n', b'.\n'):
+                        break
+                    tamano += len(dato)
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+                servidor._registrar(tamano)
+                self._responder('250 OK mensaje aceptado')
+            elif verbo == 'QUIT':
+                self._responder('221 Bye')
+                return
+            else:
+                self._responder('502 Comando no implementado')
+
+
+class _ServidorTCP(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class ServidorSMTPPrueba:
+    """Servidor SMTP local que descarta los mensajes (para probar sin red)
+
+    Sustituto sin dependencias de aiosmtpd / smtpd DebuggingServer:
+        with ServidorSMTPPrueba() as servidor:
+            TransporteSMTP('127.0.0.1', servidor.puerto, seguridad='NINGUNA')
+
+    'latencia' (segundos) demora la respuesta a cada DATA, como un servidor real.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', puerto: int = 0, latencia: float = 0.0):
+        self._servidor = _ServidorTCP((host, puerto), _ManejadorSMTPPrueba)
+        self._servidor.servidor_prueba = self
+        self.host, self.puerto = self._servidor.server_address[:2]
+        self.latencia = latencia
+        self._lock = threading.Lock()
+        self._hilo = None
+        self.mensajes_recibidos = 0
+        self.bytes_recibidos = 0
+
+    def _registrar(self, tamano: int):
+        with self._lock:
+            self.mensajes_recibidos += 1
+            self.bytes_recibidos += tamano
+
+    def iniciar(self) -> 'ServidorSMTPPrueba':
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *args):
+        self.detener()
+
+
+# Función de prueba: envío SMTP contra el servidor local de prueba
+if __name__ == "__main__":
+    with ServidorSMTPPrueba() as servidor:
+        transporte = TransporteSMTP(servidor.host, servidor.puerto, remitente='prueba@localhost',
+                                    seguridad=TransporteSMTP.SEGURIDAD_NINGUNA)
+        print(f"🔌 {transporte.conectar()['mensaje']}")
+
+        inicio = time.perf_counter()
+        for i in range(200):
+            transporte.enviar({'email': f'destino{i}@ejemplo.com',
+                               'asunto': f'Prueba {i}',
+                               'contenido': 'Hola,\nmensaje de prueba'})
+        duracion = time.perf_counter() - inicio
+        transporte.cerrar()
+
+        print(f"📤 {servidor.mensajes_recibidos} mensajes en {duracion:.2f}s "
+              f"({servidor.mensajes_recibidos / duracion:.0f}/s)")
@@ -0,0 +1,46 @@
+import os
+from email import message_from_bytes
+from email.policy import default
+
+from attachment_cache import CacheAdjuntos
+from message_builder import ConstructorMensajes
+from test_message_builder import correo
+from transports import TransporteSMTP
+
+
+def adjuntos(tmp_path):
+    ruta = tmp_path / 'catalogo.pdf'
+    ruta.write_bytes(os.urandom(300 * 1024))
+    return ruta, CacheAdjuntos([str(ruta)])
+
+
+def contenido_adjunto(datos):
+    mensaje = message_from_bytes(datos, policy=default)
+    return [(parte.get_filename(), parte.get_content()) for parte in mensaje.iter_attachments()]
+
+
+def test_esqueleto_y_email_message_llevan_el_mismo_adjunto(tmp_path):
+    ruta, cache = adjuntos(tmp_path)
+    with cache:
+        datos, agregados = ConstructorMensajes('ana@empresa.com').construir(correo('Acme'), cache)
+        mensaje, _ = TransporteSMTP('localhost', remitente='ana@empresa.com').construir_mensaje(
+            {'email': 'jose@acme.com', 'asunto': 'Hola', 'contenido': 'Texto'}, cache)
+
+        assert agregados == 1
+        assert contenido_adjunto(datos) == [('catalogo.pdf', ruta.read_bytes())]
+        assert contenido_adjunto(mensaje.as_bytes()) == [('catalogo.pdf', ruta.read_bytes())]
+        # Solo la parte serializada queda en memoria (base64 ~ 4/3 del archivo)
+        assert cache.estadisticas()['bytes_en_memoria'] < 1.4 * ruta.stat().st_size
+
+
+def test_liberar_descarta_los_esqueletos_de_la_corrida(tmp_path):
+    _, cache = adjuntos(tmp_path)
+    constructor = ConstructorMensajes('ana@empresa.com')
+    constructor.construir(correo('Acme'), cache)
+    constructor.construir(correo('Acme'))
+
+    constructor.liberar(cache)
+    cache.cerrar()
+
+    assert [esqueleto.adjuntos for esqueleto in constructor._esqueletos.values()] == [None]
+    assert cache.estadisticas()['bytes_en_memoria'] == 0
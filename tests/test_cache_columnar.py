@@ -0,0 +1,45 @@
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from cache_columnar import CacheColumnar
+
+
+def hoja():
+    return pd.DataFrame({
+        'EMPRESA': ['Acme', 'Café Ñandú', '', '日本語 株式会社'],
+        'MIXTA': ['texto', 12, 3.5, None],
+        'ACTIVO': [True, False, True, None],
+        'CANTIDAD': np.array([1, 2, 3, 4], dtype=np.int64)
+    })
+
+
+def test_ida_y_vuelta_con_textos_utf8_y_tipos_mezclados(tmp_path):
+    excel = tmp_path / 'clientes.xlsx'
+    excel.write_bytes(b'contenido')
+    cache = CacheColumnar(str(tmp_path / '.cache'))
+
+    assert cache.guardar(str(excel), 'Hoja1', hoja())
+    df = cache.cargar(str(excel), 'Hoja1')
+
+    assert df['EMPRESA'].tolist() == hoja()['EMPRESA'].tolist()
+    assert df['MIXTA'].tolist()[:3] == ['texto', 12, 3.5] and pd.isna(df['MIXTA'].iloc[3])
+    assert df['ACTIVO'].tolist()[:3] == [True, False, True]
+    assert df['CANTIDAD'].dtype == np.int64 and df['CANTIDAD'].tolist() == [1, 2, 3, 4]
+    assert cache.hits == 1
+
+
+def test_archivo_comprimido_y_sin_relleno_de_ancho_fijo(tmp_path):
+    excel = tmp_path / 'clientes.xlsx'
+    excel.write_bytes(b'contenido')
+    cache = CacheColumnar(str(tmp_path / '.cache'))
+    textos = ['x' * 200] + ['a'] * 999
+    cache.guardar(str(excel), 'Hoja1', pd.DataFrame({'NOMBRE': textos}))
+
+    ruta = cache._ruta_cache(str(excel), 'Hoja1')
+    with zipfile.ZipFile(ruta) as archivo:
+        assert all(info.compress_type == zipfile.ZIP_DEFLATED for info in archivo.infolist())
+    with np.load(ruta) as datos:
+        assert datos['v0'].nbytes == sum(len(t) for t in textos)   # UTF-8, no 200 * 4 bytes por valor
+        assert datos['o0'].tolist()[:3] == [0, 200, 201]
@@ -0,0 +1,29 @@
+from email import message_from_bytes
+from email.policy import default
+
+import pytest
+
+from email_processor import PlantillaCorreo
+from message_builder import ConstructorMensajes
+from template_engine import PlantillaCompilada
+
+
+def correo(empresa):
+    plantilla = PlantillaCorreo(PlantillaCompilada("Hola {EMPRESA}"), PlantillaCompilada("Texto para {EMPRESA}"),
+                                {'REMITENTE_NOMBRE': 'Ana'}, campana_id=1)
+    variables = {'EMPRESA': empresa}
+    return {'email': 'jose@acme.com', 'asunto': plantilla.asunto.render(variables),
+            'contenido': plantilla.contenido.render(variables), 'variables': variables, 'plantilla': plantilla}
+
+
+def test_asunto_personalizado():
+    datos, _ = ConstructorMensajes('ana@empresa.com', 'Ana').construir(correo('Acme'))
+    mensaje = message_from_bytes(datos, policy=default)
+    assert mensaje['Subject'] == 'Hola Acme'
+    assert mensaje['To'] == 'jose@acme.com'
+
+
+@pytest.mark.parametrize('empresa', ['Acme\r\nBcc: victima@x.com', 'Acme\nBcc: victima@x.com', 'Acmé\rX: y'])
+def test_asunto_con_salto_de_linea_se_rechaza(empresa):
+    with pytest.raises(ValueError):
+        ConstructorMensajes('ana@empresa.com', 'Ana').construir(correo(empresa))
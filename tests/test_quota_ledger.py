@@ -0,0 +1,76 @@
+import asyncio
+from datetime import date
+
+from quota_ledger import LibroCuotas
+from send_engine import MotorEnvioAsync
+
+
+class Hoy:
+    def __init__(self, fecha):
+        self.fecha = fecha
+
+    def __call__(self):
+        return self.fecha
+
+
+def test_reservar_hasta_el_maximo_y_liberar(tmp_path):
+    with LibroCuotas(str(tmp_path / 'cuotas.db'), hoy=Hoy(date(2026, 3, 2))) as libro:
+        reservas = [libro.reservar('Ana@Empresa.com ', 3) for _ in range(3)]
+
+        assert reservas == ['2026-03-02'] * 3
+        assert libro.reservar('ana@empresa.com', 3) is None   # el UPSERT no toca ninguna fila
+        assert libro.enviados('ana@empresa.com') == 3
+        assert libro.disponibles('ana@empresa.com', 3) == 0
+
+        libro.liberar('ana@empresa.com', reservas[0])
+        assert libro.disponibles('ana@empresa.com', 3) == 1
+        assert libro.reservar('ana@empresa.com', 3) == '2026-03-02'
+        assert libro.reservar('ana@empresa.com', 3) is None
+
+
+def test_cada_cuenta_y_cada_dia_tienen_su_cuota(tmp_path):
+    hoy = Hoy(date(2026, 3, 2))
+    with LibroCuotas(str(tmp_path / 'cuotas.db'), hoy=hoy) as libro:
+        assert libro.reservar('ana@empresa.com', 1) == '2026-03-02'
+        assert libro.reservar('ana@empresa.com', 1) is None
+        assert libro.reservar('luis@empresa.com', 1) == '2026-03-02'
+
+        hoy.fecha = date(2026, 3, 3)
+        assert libro.enviados('ana@empresa.com') == 0
+        reserva = libro.reservar('ana@empresa.com', 1)
+        assert reserva == '2026-03-03'
+
+        # Liberar una reserva de ayer no devuelve cupo de hoy
+        libro.liberar('ana@empresa.com', '2026-03-02')
+        assert libro.enviados('ana@empresa.com') == 1
+        assert libro.enviados('ana@empresa.com', date(2026, 3, 2)) == 0
+
+
+def test_sin_maximo_no_se_reserva_y_liberar_no_baja_de_cero(tmp_path):
+    with LibroCuotas(str(tmp_path / 'cuotas.db')) as libro:
+        assert libro.reservar('ana@empresa.com', 0) is None
+        fecha = libro.reservar('ana@empresa.com', 5)
+        libro.liberar('ana@empresa.com', fecha)
+        libro.liberar('ana@empresa.com', fecha)
+        assert libro.enviados('ana@empresa.com') == 0
+
+
+def test_el_motor_se_detiene_al_agotar_la_cuota_y_no_cuenta_fallidos(tmp_path):
+    with LibroCuotas(str(tmp_path / 'cuotas.db')) as libro:
+        libro.reservar('ana@empresa.com', 5)   # un envío de otra ejecución de hoy
+        cuota = libro.cuota('ana@empresa.com', 5)
+        motor = MotorEnvioAsync(concurrencia=1)
+        correos = [{'email': f'u{i}@ejemplo.com'} for i in range(10)]
+        resultados = []
+
+        async def enviar(correo):
+            return {'exitoso': correo['email'] != 'u1@ejemplo.com', 'email': correo['email']}
+
+        estadisticas = asyncio.run(motor.ejecutar(
+            correos, [{'cantidad': len(correos), 'pausa_despues': 0}], enviar,
+            al_resultado=lambda resultado, correo: resultados.append(resultado), cuota=cuota))
+
+        assert estadisticas['limite_diario']
+        assert [r['exitoso'] for r in resultados] == [True, False, True, True, True]
+        assert cuota.estadisticas()['enviados_hoy'] == 5
+        assert cuota.disponibles() == 0
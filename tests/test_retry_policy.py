@@ -0,0 +1,79 @@
+import asyncio
+import smtplib
+
+from retry_policy import ProgramadorReintentos, es_error_transitorio
+from send_engine import MotorEnvioAsync
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def test_clasificacion_de_errores():
+    assert es_error_transitorio(smtplib.SMTPResponseException(421, b'try later'))
+    assert es_error_transitorio(smtplib.SMTPServerDisconnected('closed'))
+    assert not es_error_transitorio(smtplib.SMTPRecipientsRefused({'x@y.com': (550, b'no such user')}))
+    assert not es_error_transitorio(ValueError('Email del destinatario requerido'))
+
+
+def test_reintento_vence_se_devuelve_y_se_agota():
+    reloj = Reloj()
+    programador = ProgramadorReintentos(max_intentos=2, espera_base=10, factor=2, jitter=0, reloj=reloj)
+    correo, resultado = {'email': 'a@b.com'}, {'exitoso': False, 'error': '421'}
+
+    assert programador.programar(correo, resultado, 1) == 10
+    assert programador.tomar_vencido() is None
+    assert programador.proximo_vencimiento() == 10
+
+    reloj.ahora = 10
+    vencido = programador.tomar_vencido()
+    assert vencido == (correo, 1, resultado)
+
+    # Tomado pero sin turno para salir: vuelve a la cola ya vencido
+    programador.devolver(*vencido)
+    assert programador.proximo_vencimiento() == 0
+    assert programador.tomar_vencido() == (correo, 1, resultado)
+
+    assert programador.programar(correo, resultado, 2) == 20
+    assert programador.programar(correo, resultado, 3) is None
+    assert programador.estadisticas() == {'max_intentos': 2, 'programados': 2, 'agotados': 1, 'pendientes': 1}
+
+
+def test_vaciar_entrega_los_pendientes_en_orden_de_vencimiento():
+    reloj = Reloj()
+    programador = ProgramadorReintentos(espera_base=10, jitter=0, reloj=reloj)
+    programador.programar({'email': 'tarde@b.com'}, {'error': 'b'}, 2)
+    programador.programar({'email': 'pronto@b.com'}, {'error': 'a'}, 1)
+
+    pendientes = programador.vaciar()
+
+    assert [correo['email'] for correo, _ in pendientes] == ['pronto@b.com', 'tarde@b.com']
+    assert len(programador) == 0
+
+
+def test_detener_con_reintentos_pendientes_los_informa_como_fallidos():
+    motor = MotorEnvioAsync(concurrencia=2)
+    reintentos = ProgramadorReintentos(max_intentos=3, espera_base=60, jitter=0)
+    correos = [{'email': f'u{i}@ejemplo.com'} for i in range(3)]
+    finales = []
+
+    async def enviar(correo):
+        return {'exitoso': False, 'transitorio': True, 'error': '421 ocupado', 'email': correo['email']}
+
+    def al_reintento(resultado, correo, intento, espera):
+        if len(reintentos) == len(correos):
+            motor.cancelar()
+
+    estadisticas = asyncio.run(motor.ejecutar(
+        correos, [{'cantidad': len(correos), 'pausa_despues': 0}], enviar,
+        al_resultado=lambda resultado, correo: finales.append(resultado),
+        reintentos=reintentos, al_reintento=al_reintento))
+
+    assert estadisticas['cancelado']
+    assert sorted(resultado['email'] for resultado in finales) == [correo['email'] for correo in correos]
+    assert all(resultado['error'] == '421 ocupado' for resultado in finales)
+    assert len(reintentos) == 0
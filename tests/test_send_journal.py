@@ -0,0 +1,145 @@
+import smtplib
+import threading
+
+from send_engine import ControlEnvio
+from send_journal import (CORRIDA_COMPLETADA, CORRIDA_DETENIDA, CORRIDA_EN_CURSO, ESTADO_ENVIADO,
+                          ESTADO_FALLIDO, ESTADO_INCIERTO, ESTADO_PENDIENTE, ESTADO_REINTENTO, DiarioEnvios)
+from transports import TransporteCorreo
+
+
+def correos(cantidad):
+    return [{'indice': i, 'email': f'u{i}@ejemplo.com', 'nombre': f'N{i}', 'empresa': 'Acme',
+             'asunto': 'Hola', 'contenido': 'Texto'} for i in range(cantidad)]
+
+
+def test_reanudar_sigue_desde_el_cursor_y_marca_inciertos(tmp_path):
+    with DiarioEnvios(str(tmp_path / 'diario.db')) as diario:
+        run_id = diario.iniciar_corrida(correos(5), campana_id=1)
+        diario.registrar_inicio(run_id, 0)
+        diario.registrar_resultado(run_id, 0, True)
+        diario.registrar_inicio(run_id, 1)
+        diario.registrar_resultado(run_id, 1, False, 'rechazado')
+        diario.registrar_inicio(run_id, 2)   # corte con el correo 2 en vuelo
+
+        reanudacion = diario.reanudar(run_id)
+
+        assert reanudacion['inciertos'] == 1
+        assert reanudacion['corrida']['cursor'] == 3
+        assert reanudacion['corrida']['estado'] == CORRIDA_EN_CURSO
+        assert [correo['email'] for correo in reanudacion['correos']] == ['u3@ejemplo.com', 'u4@ejemplo.com']
+        assert len(reanudacion['correos']) == 2
+        assert diario.conteo_estados(run_id) == {ESTADO_ENVIADO: 1, ESTADO_FALLIDO: 1, ESTADO_INCIERTO: 1,
+                                                 ESTADO_PENDIENTE: 2}
+        assert [d['posicion'] for d in diario.destinatarios_en_estado(run_id, ESTADO_INCIERTO)] == [2]
+
+
+def test_reintento_pendiente_se_reenvia_al_reanudar(tmp_path):
+    with DiarioEnvios(str(tmp_path / 'diario.db')) as diario:
+        run_id = diario.iniciar_corrida(correos(3), campana_id=1)
+        for posicion in range(3):
+            diario.registrar_inicio(run_id, posicion)
+        diario.registrar_reintento(run_id, 1, '421 ocupado')   # corte esperando el reintento
+        diario.registrar_resultado(run_id, 2, True)
+
+        assert [c['pendientes'] for c in diario.corridas_reanudables(1)] == [1]
+        reanudacion = diario.reanudar(run_id)
+
+        assert reanudacion['inciertos'] == 1   # solo el 0, que sí estaba en vuelo
+        assert [correo['email'] for correo in reanudacion['correos']] == ['u1@ejemplo.com']
+        assert reanudacion['correos'].posicion(0) == 1
+        assert diario.conteo_estados(run_id) == {ESTADO_INCIERTO: 1, ESTADO_REINTENTO: 1, ESTADO_ENVIADO: 1}
+
+
+def test_escrituras_desde_varios_hilos(tmp_path):
+    with DiarioEnvios(str(tmp_path / 'diario.db')) as diario:
+        run_id = diario.iniciar_corrida(correos(200), campana_id=1)
+
+        def enviar(desde):
+            for posicion in range(desde, 200, 4):
+                diario.registrar_inicio(run_id, posicion)
+                diario.registrar_resultado(run_id, posicion, True)
+
+        hilos = [threading.Thread(target=enviar, args=(i,)) for i in range(4)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        assert diario.conteo_estados(run_id) == {ESTADO_ENVIADO: 200}
+        assert diario.obtener_corrida(run_id)['cursor'] == 200
+
+
+def test_corrida_completada_no_se_ofrece_ni_se_reanuda(tmp_path):
+    with DiarioEnvios(str(tmp_path / 'diario.db')) as diario:
+        run_id = diario.iniciar_corrida(correos(2), campana_id=1)
+        diario.registrar_inicio(run_id, 0)
+        assert [c['run_id'] for c in diario.corridas_reanudables(1)] == [run_id]
+
+        diario.finalizar_corrida(run_id, CORRIDA_COMPLETADA)
+
+        assert diario.corridas_reanudables(1) == []
+        assert 'error' in diario.reanudar(run_id)
+
+
+class TransporteNulo(TransporteCorreo):
+    tipo = 'nulo'
+
+    def conectar(self):
+        self.conectado = True
+        return {'exitoso': True, 'mensaje': 'ok', 'cuenta': 'prueba@ejemplo.com'}
+
+    def enviar(self, correo, adjuntos=None):
+        return 0
+
+
+def test_adjunto_faltante_no_deja_corrida_en_el_diario(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from email_sender import SmartEmailSender
+
+    with DiarioEnvios(str(tmp_path / 'diario.db')) as diario:
+        sender = SmartEmailSender(transporte=TransporteNulo(), diario_envios=diario)
+        resultado = sender.envio_inteligente(correos(3), [str(tmp_path / 'no_existe.pdf')])
+
+        assert 'Adjuntos faltantes' in resultado['error']
+        assert diario.corridas_reanudables() == []
+
+
+class TransporteOcupado(TransporteNulo):
+    """Rechaza de forma transitoria a u1 mientras 'ocupado'; detiene el envío al segundo entregado"""
+
+    def __init__(self, control):
+        super().__init__()
+        self.control = control
+        self.ocupado = True
+        self.entregados = []
+
+    def enviar(self, correo, adjuntos=None):
+        if self.ocupado and correo['email'] == 'u1@ejemplo.com':
+            raise smtplib.SMTPServerDisconnected('421 ocupado')
+        self.entregados.append(correo['email'])
+        if len(self.entregados) == 2:
+            self.control.detener()
+        return 0
+
+
+def test_detener_con_reintento_en_espera_deja_la_corrida_para_reanudar(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from email_sender import SmartEmailSender
+
+    control = ControlEnvio()
+    transporte = TransporteOcupado(control)
+    with DiarioEnvios(str(tmp_path / 'diario.db')) as diario:
+        sender = SmartEmailSender(transporte=transporte, diario_envios=diario)
+        sender.config_actual.update(MAX_CORREOS_DIARIOS=100000, HORAS_TRABAJO=1, RITMO_ADAPTATIVO=False)
+        sender.envio_inteligente(correos(3), [], control=control)
+
+        corrida = diario.corridas_reanudables()[0]
+        assert corrida['estado'] == CORRIDA_DETENIDA
+        assert diario.conteo_estados(corrida['run_id']) == {ESTADO_ENVIADO: 2, ESTADO_REINTENTO: 1}
+
+        transporte.ocupado = False
+        sender.reanudar_corrida(corrida['run_id'])
+
+        assert transporte.entregados == ['u0@ejemplo.com', 'u2@ejemplo.com', 'u1@ejemplo.com']
+        assert diario.conteo_estados(corrida['run_id']) == {ESTADO_ENVIADO: 3}
+        assert diario.corridas_reanudables() == []
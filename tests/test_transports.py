@@ -0,0 +1,73 @@
+import smtplib
+import socket
+
+import pytest
+
+from retry_policy import EnvioIncierto, es_error_transitorio
+from transports import ServidorSMTPPrueba, TransporteSMTP, _ConexionSMTP
+
+
+class SMTPFalso:
+    """Conexión que se corta antes de MAIL FROM ('antes') o durante DATA ('data')"""
+
+    def __init__(self, registro, corte=None):
+        self.registro = registro
+        self.corte = corte
+
+    def mail(self, remitente, opciones=()):
+        if self.corte == 'antes':
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        return 250, b'OK'
+
+    def sendmail(self, remitente, destinatarios, datos):
+        self.mail(remitente)
+        self.registro.append(destinatarios)
+        if self.corte == 'data':
+            raise socket.timeout('timed out')
+        return {}
+
+    def send_message(self, mensaje):
+        return self.sendmail(mensaje['From'], [mensaje['To']], mensaje.as_bytes())
+
+    def quit(self):
+        pass
+
+
+def transporte_con(conexiones):
+    transporte = TransporteSMTP('127.0.0.1', 25, remitente='ana@empresa.com',
+                                seguridad=TransporteSMTP.SEGURIDAD_NINGUNA)
+    transporte._abrir = lambda: _ConexionSMTP(conexiones.pop(0))
+    return transporte
+
+
+
+def test_corte_antes_de_la_transaccion_reconecta_y_envia_una_vez():
+    entregas = []
+    transporte = transporte_con([SMTPFalso(entregas, 'antes'), SMTPFalso(entregas)])
+
+    transporte.enviar({'email': 'jose@acme.com', 'asunto': 'Hola', 'contenido': 'Texto'})
+
+    assert entregas == [['jose@acme.com']]
+    assert transporte.reconexiones == 1
+
+
+def test_corte_durante_data_no_reenvia_ni_se_reintenta():
+    entregas = []
+    transporte = transporte_con([SMTPFalso(entregas, 'data'), SMTPFalso(entregas)])
+
+    with pytest.raises(EnvioIncierto) as error:
+        transporte.enviar({'email': 'jose@acme.com', 'asunto': 'Hola', 'contenido': 'Texto'})
+
+    assert entregas == [['jose@acme.com']]
+    assert transporte.reconexiones == 0
+    assert not es_error_transitorio(error.value)
+
+
+def test_envio_real_contra_el_servidor_de_prueba():
+    with ServidorSMTPPrueba() as servidor:
+        transporte = TransporteSMTP(servidor.host, servidor.puerto, remitente='ana@empresa.com',
+                                    seguridad=TransporteSMTP.SEGURIDAD_NINGUNA)
+        for i in range(3):
+            transporte.enviar({'email': f'u{i}@acme.com', 'asunto': 'Hola', 'contenido': 'Texto'})
+        transporte.cerrar()
+    assert servidor.mensajes_recibidos == 3